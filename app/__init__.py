@@ -18,7 +18,8 @@ def create_app(config_name='default'):
     # 初始化 SQLAlchemy
     db.init_app(app)
     
-    # 初始化数据库连接池
+    # 初始化数据库连接池，大小和取连接超时取自 SQLALCHEMY_POOL_SIZE / SQLALCHEMY_POOL_TIMEOUT
+    db_manager.init_app(app)
     with app.app_context():
         # 预热连接池，创建初始连接
         db_manager.warm_up()
@@ -31,6 +32,9 @@ def create_app(config_name='default'):
     from app.core.controllers.file_controller import file_bp
     app.register_blueprint(file_bp, url_prefix='/api/file')
 
+    from app.core.controllers.database_controller import database_bp
+    app.register_blueprint(database_bp, url_prefix='/api/database')
+
     with app.app_context():
         db.create_all()
 
@@ -0,0 +1,16 @@
+# AliExpress 模块配置
+import os
+
+from app.core.config.file_storage_config import BASE_UPLOAD_PATH, UPLOAD_FOLDERS
+
+# 导入文件的临时存放目录
+UPLOAD_FOLDER = UPLOAD_FOLDERS['temp']
+
+# 后台导入任务配置
+IMPORT_JOB_WORKERS = 2                    # 同时执行的导入任务数
+IMPORT_JOB_MAX_PENDING = 20               # 排队等待的导入任务上限
+IMPORT_JOB_RETENTION_SECONDS = 24 * 3600  # 已结束任务结果的保留时间
+
+# 导入暂存配置：数据库不可用时转换好的批次保留在暂存目录，数据库恢复后由后台线程重放
+IMPORT_SPOOL_FOLDER = os.path.join(BASE_UPLOAD_PATH, 'spool', 'mabang_order')  # 不要放在会被清理的临时目录
+IMPORT_SPOOL_REPLAY_INTERVAL = 60         # 重放检查间隔（秒）
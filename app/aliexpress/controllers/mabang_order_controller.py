@@ -1,17 +1,40 @@
+import hashlib
 import os
-from flask import request, Blueprint
+import shutil
+import uuid
+from datetime import datetime
+import click
+from flask import request, Blueprint, Response
 from werkzeug.utils import secure_filename
 from app.aliexpress.services.mabang_order_service import MabangOrderService
+from app.aliexpress.services.mabang_order_profit_service import MabangOrderProfitService
+from app.aliexpress.services.mabang_order_partition_service import MabangOrderPartitionService
 from app.common.utils.response_helper import ResponseHelper
-from app.aliexpress.app_config import UPLOAD_FOLDER
+from app.core.services.job_manager import JobManager
+from app.core.services.metrics import metrics
+from app.core.services.spool import ReplayWorker
+from app.aliexpress.app_config import (
+    UPLOAD_FOLDER, IMPORT_JOB_WORKERS, IMPORT_JOB_MAX_PENDING, IMPORT_JOB_RETENTION_SECONDS,
+    IMPORT_SPOOL_REPLAY_INTERVAL
+)
 
 # 创建蓝图
-mabang_order_bp = Blueprint('aliexpress/mabang/order', __name__, url_prefix='/api/aliexpress/mabang/order')
+mabang_order_bp = Blueprint(
+    'aliexpress/mabang/order', __name__, url_prefix='/api/aliexpress/mabang/order', cli_group='mabang'
+)
 
 class MabangOrderController:
     """马帮ERP订单控制器"""
     
     _service = MabangOrderService()
+    _profit_service = MabangOrderProfitService()
+    _jobs = JobManager(
+        max_workers=IMPORT_JOB_WORKERS,
+        max_pending=IMPORT_JOB_MAX_PENDING,
+        retention_seconds=IMPORT_JOB_RETENTION_SECONDS
+    )
+    # 数据库恢复后将导入时暂存的批次写入数据库
+    _spool_replay = ReplayWorker(_service.replay_spool, interval=IMPORT_SPOOL_REPLAY_INTERVAL)
     
     @staticmethod
     @mabang_order_bp.route('/import', methods=['POST'])
@@ -19,16 +42,46 @@ class MabangOrderController:
         """处理订单导入请求
         
         接收上传的Excel文件，验证并导入马帮ERP订单数据。
+        多工作表的Excel文件和包含多个Excel文件的 zip 压缩包按工作表/文件并行导入。
+        
+        Form Parameters:
+            file: Excel文件或 zip 压缩包
+            batch_size (int): 每个事务写入的订单数，可选
+            stream (bool): 是否流式读取xlsx，可选，默认按文件大小自动选择，多工作表和压缩包不支持
+            mode (str): 导入模式，insert（默认）、upsert 或 load_data
+            async (bool): 是否后台导入，可选，默认 false
+            force (bool): 是否强制重新导入已成功导入过的相同文件，可选，默认 false
+            incremental (bool): 是否增量导入，跳过按 类别+店铺 水位线已导入的行，可选，默认 false，
+                多工作表和压缩包不支持
+            dedupe (str): 重复检测模式，off（默认）、report 或 drop，load_data 模式不支持；
+                只检测本次上传内的重复行（单个文件内，或压缩包/多工作表文件的各文件、工作表之间），
+                不与之前上传导入的订单比较
         
         Returns:
             Response: JSON响应
-                成功: {'code': 200, 'msg': '订单导入成功', 'data': {'total': 导入数量, 'skipped': 跳过数量}}
+                成功: {'code': 200, 'msg': '订单导入成功', 'data': {'total': 总行数, 'success': 成功数, 'error': 失败数, ...}}
+                    upsert 模式额外返回 inserted/updated/unchanged/duplicate，load_data 模式额外返回 staged/duplicate，
+                    增量导入额外返回 skipped，
+                    付款时间早于已归档月份的订单行不导入，返回 archived_skipped，
+                    metrics 为各阶段耗时、吞吐量和峰值内存；
+                    多工作表和压缩包额外返回 file_count/failed_files/files（每个工作表/文件的导入结果），
+                    重复检测额外返回 suspected_duplicates/confirmed_duplicates/duplicate_samples
+                后台导入: {'code': 200, 'msg': '导入任务已提交', 'data': {'job_id': 任务ID}}
+                重复文件: {'code': 200, 'msg': '文件已导入过', 'data': {'file_name', 'mode', 'imported_at', 'summary'}}
                 失败: {'code': 500, 'msg': 错误信息}
                 
         Note:
-            - 仅支持 .xls 和 .xlsx 格式的文件
+            - 仅支持 .xls、.xlsx 和 .zip 格式的文件，压缩包中的Excel文件不解压到磁盘
+            - 多工作表和压缩包按 工作表名、压缩包内文件名、上传文件名 依次判断每个工作表的类别
+            - 重复检测按 订单编号+SKU 发现本次导入中跨类别重复的订单行（如同时出现在全托管和半托管导出中），
+              drop 模式丢弃后出现的重复行
             - 文件会被临时保存后自动删除
-            - 自动跳过已存在的订单
+            - upsert 模式按 订单编号+SKU+类别 更新已存在的订单，内容未变化的订单直接跳过
+            - load_data 模式通过 LOAD DATA LOCAL INFILE 一次载入，需要 MySQL 开启 local_infile，失败时自动回退到 insert
+            - 后台导入通过 /import/<job_id> 查询进度和结果
+            - 按文件内容哈希识别重复上传，已成功导入过的文件直接返回上次的导入结果
+            - 导入中途数据库不可用时，剩余订单写入本地暂存文件并返回 spooled（暂存的订单数），
+              数据库恢复后由后台线程自动写入，无需重新上传
         """
         try:
             # 检查是否有文件
@@ -42,21 +95,40 @@ class MabangOrderController:
                 return ResponseHelper.error(msg='未选择文件')
                 
             # 检查文件扩展名
-            if not file.filename.endswith(('.xls', '.xlsx')):
-                return ResponseHelper.error(msg='只支持Excel文件')
+            if not file.filename.lower().endswith(('.xls', '.xlsx', '.zip')):
+                return ResponseHelper.error(msg='只支持Excel文件或zip压缩包')
                 
-            # 保存文件
-            filename = file.filename
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            
-            try:
-                # 导入订单
-                success, result = MabangOrderController._service.import_orders_from_excel(file_path)
-            finally:
-                # 确保临时文件被删除
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+            # 保存文件，每次上传使用独立目录，保留原文件名用于判断订单类别
+            file_path, file_hash = MabangOrderController._save_upload(file)
+            
+            # 相同内容的文件已成功导入过时直接返回上次的结果
+            if request.form.get('force', '').lower() not in ('1', 'true'):
+                ledger = MabangOrderController._service.get_import_ledger(file_hash)
+                if ledger is not None:
+                    MabangOrderController._remove_upload(file_path)
+                    return ResponseHelper.success(msg='文件已导入过', data=ledger)
+            
+            stream = request.form.get('stream')
+            import_options = {
+                'batch_size': request.form.get('batch_size', type=int),
+                'stream': None if stream is None else stream.lower() in ('1', 'true'),
+                'mode': request.form.get('mode', MabangOrderService.ImportMode.INSERT),
+                'file_hash': file_hash,
+                'incremental': request.form.get('incremental', '').lower() in ('1', 'true'),
+                'dedupe': request.form.get('dedupe', MabangOrderService.DedupeMode.OFF)
+            }
+            
+            if request.form.get('async', '').lower() in ('1', 'true'):
+                success, result = MabangOrderController._jobs.submit(
+                    MabangOrderController._import_upload, file_path, **import_options
+                )
+                if not success:
+                    MabangOrderController._remove_upload(file_path)
+                    return ResponseHelper.error(msg=result)
+                return ResponseHelper.success(msg='导入任务已提交', data={'job_id': result})
+            
+            # 导入订单，确保临时文件被删除
+            success, result = MabangOrderController._import_upload(file_path, **import_options)
             
             if not success:
                 return ResponseHelper.error(msg=result)
@@ -65,44 +137,114 @@ class MabangOrderController:
             
         except Exception as e:
             return ResponseHelper.error(msg=f'订单导入失败: {str(e)}')
+
+    @staticmethod
+    @mabang_order_bp.route('/import/<job_id>', methods=['GET'])
+    def get_import_job(job_id):
+        """查询后台导入任务
+        
+        Returns:
+            Response: JSON响应
+                成功: {'code': 200, 'data': {'job_id', 'status', 'progress': {'rows_parsed', 'rows_written', 'errors'},
+                       'result': 导入结果, 'msg': 错误信息, 'created_at', 'started_at', 'finished_at'}}
+                失败: {'code': 404, 'msg': '导入任务不存在或已过期'}
+        """
+        job = MabangOrderController._jobs.get(job_id)
+        if job is None:
+            return ResponseHelper.error(msg='导入任务不存在或已过期', code=404)
+        return ResponseHelper.success(msg='获取导入任务成功', data=job)
+
+    @staticmethod
+    @mabang_order_bp.route('/metrics', methods=['GET'])
+    def get_import_metrics():
+        """查询导入性能指标
+        
+        返回当前进程内最近的导入记录及累计值，用于定位慢导入的瓶颈阶段和跟踪版本间的性能变化。
+        
+        Returns:
+            Response: JSON响应
+                成功: {'code': 200, 'data': {'mabang_order_import': {'count', 'rows', 'seconds', 'rows_per_sec',
+                       'recent': [{'file', 'category', 'mode', 'stream', 'rows', 'recorded_at',
+                                   'metrics': {'total_seconds', 'rows_per_sec', 'peak_memory_mb', 'stages'}}]}}}
+        """
+        return ResponseHelper.success(msg='获取导入指标成功', data=metrics.snapshot('mabang_order_import'))
+
+    @staticmethod
+    def _save_upload(file) -> tuple:
+        """将上传文件保存到独立的临时目录，保存的同时计算内容哈希
+        
+        Returns:
+            tuple: (文件路径, 文件内容 SHA-256)
+        """
+        upload_dir = os.path.join(UPLOAD_FOLDER, uuid.uuid4().hex)
+        os.makedirs(upload_dir, exist_ok=True)
+        file_path = os.path.join(upload_dir, os.path.basename(file.filename))
+        digest = hashlib.sha256()
+        with open(file_path, 'wb') as f:
+            for chunk in iter(lambda: file.stream.read(1024 * 1024), b''):
+                digest.update(chunk)
+                f.write(chunk)
+        return file_path, digest.hexdigest()
+
+    @staticmethod
+    def _remove_upload(file_path: str):
+        """删除上传的临时文件及其目录"""
+        shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+
+    @staticmethod
+    def _import_upload(file_path: str, on_progress=None, **import_options) -> tuple:
+        """导入上传的文件，完成后删除临时文件
+        
+        多工作表的Excel文件和 zip 压缩包按工作表/文件并行导入，不支持流式读取和增量导入。
+        """
+        try:
+            service = MabangOrderController._service
+            if not service.is_bundle(file_path):
+                return service.import_orders_from_excel(file_path, on_progress=on_progress, **import_options)
+            if import_options.get('incremental'):
+                return False, '多工作表文件和压缩包不支持增量导入'
+            return service.import_orders_from_bundle(
+                file_path,
+                batch_size=import_options.get('batch_size'),
+                mode=import_options.get('mode', MabangOrderService.ImportMode.INSERT),
+                on_progress=on_progress,
+                file_hash=import_options.get('file_hash'),
+                dedupe=import_options.get('dedupe', MabangOrderService.DedupeMode.OFF)
+            )
+        finally:
+            MabangOrderController._remove_upload(file_path)
             
     @staticmethod
     @mabang_order_bp.route('/list', methods=['GET'])
     def list_orders():
         """获取订单列表
         
-        支持分页查询马帮ERP订单列表。
+        支持分页查询马帮ERP订单列表，按付款时间倒序。
         
         Query Parameters:
-            page (int): 页码，默认1
+            page (int): 页码，默认1，传入 cursor 时忽略
             page_size (int): 每页记录数，默认10
+            cursor (str): 上一页返回的 next_cursor，使用游标分页，深度翻页时推荐使用
+            category (str): 订单类别
+            store (str): 店铺名
+            start_date (str): 付款开始时间，需与 end_date 同时传入
+            end_date (str): 付款结束时间
             
         Returns:
             Response: JSON响应
-                成功: {'code': 200, 'msg': '获取订单列表成功', 'data': [...]}
+                成功: {'code': 200, 'msg': '获取订单列表成功',
+                       'data': {'rows': [...], 'page_size': 10, 'has_more': true, 'next_cursor': '...'}}
                 失败: {'code': 500, 'msg': 错误信息}
         """
         try:
             page = int(request.args.get('page', 1))
             page_size = int(request.args.get('page_size', 10))
-            category = request.args.get('category', '')
-            store = request.args.get('store', '')
-            start_date = request.args.get('start_date', '')
-            end_date = request.args.get('end_date', '')
-            
-            # 构建查询条件
-            filters = {}
-            if category:
-                filters['category'] = category
-            if store:
-                filters['store'] = store
-            if start_date and end_date:
-                filters['payment_time'] = (start_date, end_date, 'BETWEEN')
             
             success, result = MabangOrderController._service.list_orders(
                 page=page,
                 page_size=page_size,
-                filters=filters
+                filters=MabangOrderController._get_order_filters(),
+                cursor=request.args.get('cursor')
             )
             
             if not success:
@@ -113,10 +255,82 @@ class MabangOrderController:
         except Exception as e:
             return ResponseHelper.error(msg=f'获取订单列表失败: {str(e)}')
 
+    @staticmethod
+    @mabang_order_bp.route('/export', methods=['GET'])
+    def export_orders():
+        """导出订单
+        
+        使用服务端游标边查询边输出，以分块传输的方式返回文件，导出行数不受内存限制。
+        xlsx 同样边生成边输出，超过单个工作表行数上限时拆分为多个工作表。
+        客户端中途断开时断开数据库连接，不再读取剩余结果。
+        
+        Query Parameters:
+            format (str): 导出格式，csv（默认）或 xlsx
+            category (str): 订单类别
+            store (str): 店铺名
+            start_date (str): 付款开始时间，需与 end_date 同时传入
+            end_date (str): 付款结束时间
+            
+        Returns:
+            Response: 文件下载响应，表头与导入文件相同
+                失败: {'code': 500, 'msg': 错误信息}
+        """
+        try:
+            file_format = request.args.get('format', MabangOrderService.ExportFormat.CSV).lower()
+            success, result = MabangOrderController._service.export_orders(
+                filters=MabangOrderController._get_order_filters(),
+                file_format=file_format
+            )
+            
+            if not success:
+                return ResponseHelper.error(msg=result)
+            
+            mimetypes = {
+                MabangOrderService.ExportFormat.CSV: 'text/csv; charset=utf-8',
+                MabangOrderService.ExportFormat.XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            }
+            file_name = f"mabang_orders_{datetime.now().strftime('%Y%m%d%H%M%S')}.{file_format}"
+            return Response(
+                result,
+                mimetype=mimetypes[file_format],
+                headers={'Content-Disposition': f'attachment; filename={file_name}'}
+            )
+            
+        except Exception as e:
+            return ResponseHelper.error(msg=f'导出订单失败: {str(e)}')
+
+    @staticmethod
+    def _get_order_filters() -> dict:
+        """从查询参数构建订单列表和导出共用的查询条件"""
+        category = request.args.get('category', '')
+        store = request.args.get('store', '')
+        start_date = request.args.get('start_date', '')
+        end_date = request.args.get('end_date', '')
+        
+        filters = {}
+        if category:
+            filters['category'] = category
+        if store:
+            filters['store'] = store
+        if start_date and end_date:
+            filters['payment_time'] = (start_date, end_date, 'BETWEEN')
+        return filters
+
     @staticmethod
     @mabang_order_bp.route('/import-directory', methods=['POST'])
     def import_orders_from_directory():
-        """从目录导入订单数据"""
+        """从目录导入订单数据
+        
+        目录下的Excel文件在多个进程中并行解析，结果包含每个文件的导入统计和汇总。
+        
+        JSON Parameters:
+            directory_path (str): 目录路径
+            category (str): 订单类别，可选，为空时按文件名判断每个文件的类别
+            batch_size (int): 每个事务写入的订单数，可选
+            mode (str): 导入模式，insert（默认）、upsert 或 load_data
+            dedupe (str): 重复检测模式，off（默认）、report 或 drop，检测本目录内跨文件的重复订单行，
+                不与之前导入的订单比较，load_data 模式不支持
+        """
         try:
             data = request.get_json()
             directory_path = data.get('directory_path')
@@ -125,15 +339,15 @@ class MabangOrderController:
             if not directory_path:
                 return ResponseHelper.error(msg='请指定目录路径')
                 
-            if not category:
-                return ResponseHelper.error(msg='请指定订单类别')
-                
             if not os.path.exists(directory_path):
                 return ResponseHelper.error(msg='目录不存在')
                 
             success, result = MabangOrderController._service.import_orders_from_directory(
                 directory_path=directory_path,
-                category=category
+                category=category,
+                batch_size=data.get('batch_size'),
+                mode=data.get('mode', MabangOrderService.ImportMode.INSERT),
+                dedupe=data.get('dedupe', MabangOrderService.DedupeMode.OFF)
             )
             
             if not success:
@@ -142,4 +356,118 @@ class MabangOrderController:
             return ResponseHelper.success(msg='批量导入成功', data=result)
             
         except Exception as e:
-            return ResponseHelper.error(msg=f'批量导入失败: {str(e)}') 
\ No newline at end of file
+            return ResponseHelper.error(msg=f'批量导入失败: {str(e)}')
+
+    @staticmethod
+    @mabang_order_bp.route('/profit/report', methods=['GET'])
+    def get_profit_report():
+        """利润报表
+        
+        从利润日汇总表查询，不扫描订单明细。
+        
+        Query Parameters:
+            group_by (str): 分组维度，逗号分隔，可选 date/store/category/country/sku，默认 store
+            start_date (str): 开始日期 YYYY-MM-DD
+            end_date (str): 结束日期 YYYY-MM-DD
+            store/category/country/sku (str): 维度筛选条件
+            limit (int): 最多返回的分组数，默认1000
+            
+        Returns:
+            Response: JSON响应
+                成功: {'code': 200, 'msg': '获取利润报表成功', 'data': [{分组维度..., 'order_count', 'quantity',
+                       'rmb_amount', 'order_profit', 'profit_rate', ...}]}
+                失败: {'code': 500, 'msg': 错误信息}
+        """
+        try:
+            group_by = [item.strip() for item in request.args.get('group_by', 'store').split(',') if item.strip()]
+            filters = {
+                key: request.args.get(key)
+                for key in ('start_date', 'end_date', 'store', 'category', 'country', 'sku')
+                if request.args.get(key)
+            }
+            success, result = MabangOrderController._profit_service.get_profit_report(
+                group_by=group_by,
+                filters=filters,
+                limit=request.args.get('limit', 1000, type=int)
+            )
+            
+            if not success:
+                return ResponseHelper.error(msg=result)
+                
+            return ResponseHelper.success(msg='获取利润报表成功', data=result)
+            
+        except Exception as e:
+            return ResponseHelper.error(msg=f'获取利润报表失败: {str(e)}')
+
+
+@mabang_order_bp.before_app_request
+def start_spool_replay():
+    """处理请求时启动暂存批次重放线程，已启动时直接返回
+
+    只在提供服务的进程中启动，flask 命令行等不处理请求的进程不启动后台线程
+    """
+    MabangOrderController._spool_replay.start()
+
+
+@mabang_order_bp.cli.command('rebuild-profit-rollup')
+@click.option('--start-date', default=None, help='开始日期 YYYY-MM-DD，默认为订单最早付款日期')
+@click.option('--end-date', default=None, help='结束日期 YYYY-MM-DD（包含），默认为订单最晚付款日期')
+def rebuild_profit_rollup(start_date, end_date):
+    """从订单明细重建利润日汇总，用于历史数据回填
+
+    Usage:
+        flask mabang rebuild-profit-rollup --start-date 2024-01-01 --end-date 2024-12-31
+    """
+    success, result = MabangOrderController._profit_service.rebuild(start_date, end_date)
+    if not success:
+        raise click.ClickException(result)
+    click.echo(f'利润汇总重建完成，共 {result} 天')
+
+
+@mabang_order_bp.cli.command('backfill-sku-lines')
+@click.option('--batch-size', default=None, type=int, help='每个事务处理的订单行数')
+def backfill_sku_lines(batch_size):
+    """从订单的 SKU明细 回填 order_sku_line 子表
+
+    Usage:
+        flask mabang backfill-sku-lines
+    """
+    success, result = MabangOrderController._service.rebuild_sku_lines(batch_size)
+    if not success:
+        raise click.ClickException(result)
+    click.echo(f"SKU明细回填完成，共 {result['orders']} 个订单行，失败 {result['errors']} 块")
+
+
+@mabang_order_bp.cli.command('replay-spool')
+def replay_spool():
+    """将导入时暂存的批次写入数据库，通常由后台线程自动执行
+
+    Usage:
+        flask mabang replay-spool
+    """
+    success, result = MabangOrderController._service.replay_spool()
+    if not success:
+        raise click.ClickException(result)
+    click.echo(
+        f"暂存批次重放完成，共 {result['files']} 个文件、{result['batches']} 个批次，"
+        f"成功 {result['success']} 个订单行，失败 {result['error']} 个"
+    )
+
+
+@mabang_order_bp.cli.command('maintain-partitions')
+@click.option('--months-ahead', default=None, type=int, help='提前创建的月份数（不含当月）')
+@click.option('--retention-months', default=None, type=int, help='订单表保留的月份数（含当月），更早的月份移入归档表')
+@click.option('--dry-run', is_flag=True, help='只列出将要创建和归档的分区')
+def maintain_partitions(months_ahead, retention_months, dry_run):
+    """创建未来月份的订单分区并归档超过保留期的分区，建议每天定时执行
+
+    Usage:
+        flask mabang maintain-partitions --months-ahead 3 --retention-months 24
+    """
+    success, result = MabangOrderPartitionService().maintain(months_ahead, retention_months, dry_run)
+    if not success:
+        raise click.ClickException(result)
+    prefix = '（预览）' if dry_run else ''
+    click.echo(f"{prefix}新建分区: {', '.join(result['created']) or '无'}")
+    for item in result['archived']:
+        click.echo(f"{prefix}归档分区 {item['partition']}: {item['rows']} 行")
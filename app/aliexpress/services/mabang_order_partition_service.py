@@ -0,0 +1,254 @@
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+
+from app.core.services.db import db
+
+
+class MabangOrderPartitionService:
+    """马帮订单分区维护服务
+
+    订单表按付款时间做月度 RANGE 分区（见 sql/mabang_erp_order_list_partitioning.sql）：
+    p_null 存放付款时间为空的行，pYYYYMM 为各月份，p_future 接收已建分区之后的数据。
+    维护时从 p_future 拆分出未来月份的分区，并将超过保留期的月份移入压缩归档表后删除分区。
+    """
+
+    def __init__(self):
+        self.table = 'mabang_erp_order_list'
+        self.archive_table = 'mabang_erp_order_list_archive'
+        # 始终保留的分区，不参与拆分和归档
+        self.null_partition = 'p_null'
+        self.future_partition = 'p_future'
+        # 默认提前创建的月份数和保留的月份数
+        self.months_ahead = 3
+        self.retention_months = 24
+        # 归档时每个事务复制的行数
+        self.archive_batch_size = 10000
+
+    def maintain(self, months_ahead: int = None, retention_months: int = None, dry_run: bool = False) -> tuple:
+        """创建未来月份的分区并归档超过保留期的分区
+
+        Args:
+            months_ahead: 提前创建的月份数（不含当月），默认使用 self.months_ahead
+            retention_months: 订单表保留的月份数（含当月），默认使用 self.retention_months
+            dry_run: 只返回将要执行的操作，不修改数据
+
+        Returns:
+            tuple: (是否成功, {'created': 新建的分区名列表, 'archived': [{'partition', 'rows'}]}/错误信息)
+        """
+        months_ahead = self.months_ahead if months_ahead is None else months_ahead
+        retention_months = self.retention_months if retention_months is None else retention_months
+        if months_ahead < 0 or retention_months < 1:
+            return False, '提前创建的月份数不能为负数，保留的月份数至少为 1'
+
+        try:
+            success, partitions = self.get_partitions()
+            if not success:
+                return False, partitions
+
+            this_month = date.today().replace(day=1)
+            success, created = self._split_future(partitions, self._add_months(this_month, months_ahead + 1), dry_run)
+            if not success:
+                return False, created
+
+            if not dry_run and created:
+                success, partitions = self.get_partitions()
+                if not success:
+                    return False, partitions
+            cutoff = self._add_months(this_month, 1 - retention_months)
+            archived = []
+            for partition in partitions:
+                upper = partition['upper']
+                if partition['name'] in (self.null_partition, self.future_partition) or upper is None or upper > cutoff:
+                    continue
+                if dry_run:
+                    archived.append({'partition': partition['name'], 'rows': partition['rows']})
+                    continue
+                success, rows = self._archive_partition(partition['name'])
+                if not success:
+                    return False, rows
+                archived.append({'partition': partition['name'], 'rows': rows})
+            return True, {'created': created, 'archived': archived}
+
+        except Exception as e:
+            logging.error(f"维护订单分区失败: {str(e)}")
+            return False, f'维护订单分区失败: {str(e)}'
+
+    def get_partitions(self) -> tuple:
+        """查询订单表的分区
+
+        Returns:
+            tuple: (是否成功, [{'name', 'upper': 分区上界日期（不含）/None, 'rows': 估算行数}]/错误信息)，
+                按分区顺序排列，p_future 的上界为 None
+        """
+        success, results = db.execute_sql(
+            "SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS description, TABLE_ROWS AS table_rows "
+            "FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY PARTITION_ORDINAL_POSITION",
+            (self.table,)
+        )
+        if not success:
+            return False, results
+        if not results or results[0]['name'] is None:
+            return False, f"{self.table} 未分区，请先执行 sql/mabang_erp_order_list_partitioning.sql"
+        return True, [
+            {
+                'name': record['name'],
+                'upper': self._to_date(record['description']),
+                'rows': record['table_rows'] or 0
+            }
+            for record in results
+        ]
+
+    def _split_future(self, partitions: List[Dict], until: date, dry_run: bool) -> tuple:
+        """从 p_future 拆分出上界不超过 until 的月份分区
+
+        p_future 中已有数据时（首次维护），从其中最早付款时间的月份开始拆分，
+        REORGANIZE 会把这些数据移入对应月份；之后的维护 p_future 为空，拆分只修改分区定义。
+
+        Returns:
+            tuple: (是否成功, 新建的分区名列表/错误信息)
+        """
+        names = [partition['name'] for partition in partitions]
+        if self.future_partition not in names:
+            return False, f"{self.table} 缺少 {self.future_partition} 分区"
+        bounds = [partition['upper'] for partition in partitions if partition['name'] != self.null_partition]
+        last_upper = max((bound for bound in bounds if bound is not None), default=None)
+
+        if last_upper is None:
+            # 首次维护，从 p_future 中最早的数据开始
+            success, results = db.execute_sql(
+                f"SELECT MIN(payment_time) AS first_time FROM {self.table} PARTITION ({self.future_partition})"
+            )
+            if not success:
+                return False, results
+            first_time = results[0]['first_time'] if results else None
+            start = (first_time.date() if first_time else date.today()).replace(day=1)
+        else:
+            start = last_upper
+
+        months = []
+        month = start
+        while month < until:
+            months.append(month)
+            month = self._add_months(month, 1)
+        if not months:
+            return True, []
+
+        definitions = ', '.join(
+            f"PARTITION {self._partition_name(month)} VALUES LESS THAN (TO_DAYS('{self._add_months(month, 1)}'))"
+            for month in months
+        )
+        created = [self._partition_name(month) for month in months]
+        if dry_run:
+            return True, created
+        success, result = db.execute_sql(
+            f"ALTER TABLE {self.table} REORGANIZE PARTITION {self.future_partition} INTO "
+            f"({definitions}, PARTITION {self.future_partition} VALUES LESS THAN MAXVALUE)",
+            fetch=False
+        )
+        if not success:
+            return False, result
+        logging.info(f"已创建订单分区: {', '.join(created)}")
+        return True, created
+
+    def get_archive_cutoff(self) -> tuple:
+        """查询已归档的付款时间上界
+
+        分区按整月归档，归档表中最晚付款时间所在月份的下一个月第一天之前的订单都已移出订单表。
+        导入时跳过早于该日期的订单行，避免累计导出重新导入已归档的订单，见 MabangOrderService._skip_archived。
+
+        Returns:
+            tuple: (是否成功, 上界日期（不含）/None（尚未归档）/错误信息)
+        """
+        success, results = db.execute_sql(f"SELECT MAX(payment_time) AS last_time FROM {self.archive_table}")
+        if not success:
+            return False, results
+        last_time = results[0]['last_time'] if results else None
+        if last_time is None:
+            return True, None
+        return True, self._add_months(last_time.date().replace(day=1), 1)
+
+    def _archive_partition(self, partition: str) -> tuple:
+        """将一个分区的数据复制到归档表，核对无遗漏后删除分区
+
+        先按 id 分批复制，每批一个事务，复制期间不阻塞导入；之后锁住订单表和归档表，
+        补复制分批复制期间新写入的行、核对并删除分区，核对与删除之间不会再有写入。
+        归档表中已有相同订单行（自然键和付款时间均相同）时不再复制，重新导入后再次归档的订单不会在归档表中重复；
+        INSERT IGNORE 跳过 id 已在归档表中的行，中途失败后重新执行会跳过已复制的行。
+
+        Returns:
+            tuple: (是否成功, 归档的行数/错误信息)
+        """
+        last_id = 0
+        while True:
+            with db.transaction() as cursor:
+                cursor.execute(
+                    f"SELECT MAX(id) AS upper_id FROM "
+                    f"(SELECT id FROM {self.table} PARTITION ({partition}) WHERE id > %s ORDER BY id LIMIT %s) batch",
+                    (last_id, self.archive_batch_size)
+                )
+                upper_id = cursor.fetchone()['upper_id']
+                if upper_id is None:
+                    break
+                cursor.execute(self._get_copy_sql(partition) + " AND o.id <= %s", (last_id, upper_id))
+            last_id = upper_id
+
+        with db.transaction() as cursor:
+            # 语句中使用的每个别名都需要单独加锁
+            cursor.execute(
+                f"LOCK TABLES {self.table} WRITE, {self.table} AS o READ, "
+                f"{self.archive_table} WRITE, {self.archive_table} AS a READ"
+            )
+            try:
+                cursor.execute(self._get_copy_sql(partition), (last_id,))
+                cursor.execute(
+                    f"SELECT COUNT(*) AS total, "
+                    f"SUM(NOT EXISTS (SELECT 1 FROM {self.archive_table} a WHERE a.id = o.id) "
+                    f"AND NOT EXISTS (SELECT 1 FROM {self.archive_table} a WHERE {self._same_order_condition()})) "
+                    f"AS missing FROM {self.table} PARTITION ({partition}) o"
+                )
+                result = cursor.fetchone()
+                total, missing = result['total'], result['missing'] or 0
+                if missing:
+                    return False, f"分区 {partition} 有 {missing} 行未写入归档表，未删除分区"
+                cursor.execute(f"ALTER TABLE {self.table} DROP PARTITION {partition}")
+            finally:
+                # UNLOCK TABLES 同时提交补复制的行；连接已断开时锁随会话释放
+                cursor.execute("UNLOCK TABLES")
+        logging.info(f"已归档订单分区 {partition}，共 {total} 行")
+        return True, total
+
+    def _get_copy_sql(self, partition: str) -> str:
+        """复制分区中 id 大于参数、且归档表中没有相同订单行的行"""
+        return (
+            f"INSERT IGNORE INTO {self.archive_table} SELECT o.* FROM {self.table} PARTITION ({partition}) o "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {self.archive_table} a WHERE {self._same_order_condition()}) "
+            f"AND o.id > %s"
+        )
+
+    @staticmethod
+    def _same_order_condition() -> str:
+        """归档表中的行 a 与订单行 o 是同一订单行：自然键相同且付款时间相同（均为空也视为相同）"""
+        return "a.order_id = o.order_id AND a.sku = o.sku AND a.category = o.category AND a.payment_time <=> o.payment_time"
+
+    @staticmethod
+    def _partition_name(month: date) -> str:
+        return f"p{month:%Y%m}"
+
+    @staticmethod
+    def _add_months(month: date, months: int) -> date:
+        """月份加减，month 为当月第一天"""
+        index = month.year * 12 + month.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def _to_date(description: Optional[str]) -> Optional[date]:
+        """将 RANGE 分区的上界（TO_DAYS 值）转换为日期，MAXVALUE 返回 None"""
+        if description is None or description == 'MAXVALUE':
+            return None
+        days = int(description)
+        # TO_DAYS('0000-01-01') = 1，date.toordinal('0001-01-01') = 1，相差 365 天
+        if days <= 366:
+            return date.min
+        return date.fromordinal(days - 365)
@@ -0,0 +1,209 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from app.core.services.db import db
+
+
+class MabangOrderProfitService:
+    """马帮订单利润汇总服务
+
+    维护 日期 × 店铺 × 类别 × 国家 × SKU 粒度的利润日汇总表，
+    报表直接查询汇总表，无需扫描订单明细。
+    """
+
+    def __init__(self):
+        self.table = 'mabang_order_profit_daily'
+        self.order_table = 'mabang_erp_order_list'
+        # 需要汇总的金额字段
+        self.amount_fields = [
+            'rmb_amount', 'order_profit', 'platform_fee_rmb', 'ad_cost_rmb',
+            'vat_fee_rmb', 'shipping_revenue', 'actual_shipping'
+        ]
+        # 报表可用的分组维度 -> 汇总表列名
+        self.dimensions = {
+            'date': 'stat_date',
+            'store': 'store',
+            'category': 'category',
+            'country': 'country',
+            'sku': 'sku'
+        }
+        # 增量重算时每条语句覆盖的最大天数
+        self.refresh_window_days = 31
+        # 全量重建时每个事务覆盖的天数
+        self.rebuild_window_days = 31
+
+    def refresh_slices(self, slices: Iterable[Tuple[str, str, str]]) -> tuple:
+        """按 日期 + 店铺 + 类别 从订单明细重算汇总
+
+        重算而不是累加，因此对插入、更新导入都适用，重复执行结果不变。
+        切片按付款日期分为不超过 refresh_window_days 天的时间段，每个时间段在一个事务中
+        用一条 DELETE 和一条 INSERT ... SELECT 重算该时间段内涉及的全部 店铺+类别，
+        语句数与切片数无关；时间段内其他日期的这些 店铺+类别 也会一并重算，结果不变。
+
+        Args:
+            slices: (付款日期 YYYY-MM-DD, 店铺名, 类别) 集合，店铺为空时使用空字符串
+
+        Returns:
+            tuple: (是否成功, 重算的切片数/错误信息)
+        """
+        slices = {item for item in slices if item[2] is not None}
+        try:
+            for window_start, window_end, pairs in self._group_slices(slices):
+                placeholders = ', '.join(['(%s, %s)'] * len(pairs))
+                pair_params = tuple(value for pair in pairs for value in pair)
+                with db.transaction() as cursor:
+                    cursor.execute(
+                        f"DELETE FROM {self.table} WHERE stat_date >= %s AND stat_date < %s "
+                        f"AND (category, store) IN ({placeholders})",
+                        (window_start, window_end) + pair_params
+                    )
+                    cursor.execute(
+                        self._aggregate_sql(
+                            f"payment_time >= %s AND payment_time < %s "
+                            f"AND (category, COALESCE(store, '')) IN ({placeholders})"
+                        ),
+                        (window_start, window_end) + pair_params
+                    )
+            return True, len(slices)
+        except Exception as e:
+            logging.error(f"重算利润汇总失败: {str(e)}")
+            return False, f'重算利润汇总失败: {str(e)}'
+
+    def _group_slices(self, slices: Iterable[Tuple[str, str, str]]) -> List[Tuple[date, date, List[Tuple[str, str]]]]:
+        """将切片按付款日期分为不超过 refresh_window_days 天的时间段
+
+        Returns:
+            List[Tuple[date, date, List[Tuple[str, str]]]]: [(开始日期, 结束日期（不含）, [(类别, 店铺名)])]
+        """
+        windows = []
+        for stat_date, store, category in sorted(slices):
+            day = datetime.strptime(stat_date, '%Y-%m-%d').date()
+            if not windows or day >= windows[-1][0] + timedelta(days=self.refresh_window_days):
+                windows.append([day, day, set()])
+            windows[-1][1] = day
+            windows[-1][2].add((category, store))
+        return [(start, last + timedelta(days=1), sorted(pairs)) for start, last, pairs in windows]
+
+    def rebuild(self, start_date: str = None, end_date: str = None) -> tuple:
+        """全量重建指定日期范围的利润汇总，用于回填历史数据
+
+        Args:
+            start_date: 开始日期 YYYY-MM-DD，默认为订单最早付款日期
+            end_date: 结束日期 YYYY-MM-DD（包含），默认为订单最晚付款日期
+
+        Returns:
+            tuple: (是否成功, 重建的天数/错误信息)
+        """
+        try:
+            if not start_date or not end_date:
+                success, results = db.execute_sql(
+                    f"SELECT MIN(payment_time) AS first_time, MAX(payment_time) AS last_time FROM {self.order_table}"
+                )
+                if not success:
+                    return False, results
+                if not results or results[0]['first_time'] is None:
+                    return True, 0
+                start_date = start_date or str(results[0]['first_time'])[:10]
+                end_date = end_date or str(results[0]['last_time'])[:10]
+
+            first_day = datetime.strptime(start_date, '%Y-%m-%d').date()
+            last_day = datetime.strptime(end_date, '%Y-%m-%d').date()
+            if first_day > last_day:
+                return False, '开始日期不能晚于结束日期'
+
+            window_start = first_day
+            while window_start <= last_day:
+                window_end = min(window_start + timedelta(days=self.rebuild_window_days), last_day + timedelta(days=1))
+                with db.transaction() as cursor:
+                    cursor.execute(
+                        f"DELETE FROM {self.table} WHERE stat_date >= %s AND stat_date < %s",
+                        (window_start, window_end)
+                    )
+                    cursor.execute(
+                        self._aggregate_sql("payment_time >= %s AND payment_time < %s"),
+                        (window_start, window_end)
+                    )
+                logging.info(f"已重建利润汇总: {window_start} ~ {window_end - timedelta(days=1)}")
+                window_start = window_end
+            return True, (last_day - first_day).days + 1
+        except Exception as e:
+            logging.error(f"重建利润汇总失败: {str(e)}")
+            return False, f'重建利润汇总失败: {str(e)}'
+
+    def get_profit_report(self, group_by: List[str], filters: Dict = None, limit: int = 1000) -> tuple:
+        """从汇总表查询利润报表
+
+        Args:
+            group_by: 分组维度，可选 date/store/category/country/sku
+            filters: 查询条件，支持 start_date、end_date 以及各维度的等值条件
+            limit: 最多返回的分组数，按订单利润倒序
+
+        Returns:
+            tuple: (是否成功, 报表行列表/错误信息)
+
+        Note:
+            order_count 为各 SKU 订单数之和，一个订单包含多个 SKU 时会在 SKU 以上粒度重复计数。
+        """
+        try:
+            invalid = [dimension for dimension in group_by if dimension not in self.dimensions]
+            if invalid:
+                return False, f"不支持的分组维度: {', '.join(invalid)}"
+
+            filters = dict(filters or {})
+            conditions = {}
+            start_date = filters.pop('start_date', None)
+            end_date = filters.pop('end_date', None)
+            if start_date and end_date:
+                conditions['stat_date'] = (start_date, end_date, 'BETWEEN')
+            elif start_date:
+                conditions['stat_date'] = (start_date, '>=')
+            elif end_date:
+                conditions['stat_date'] = (end_date, '<=')
+            for dimension, value in filters.items():
+                if dimension not in self.dimensions:
+                    return False, f"不支持的筛选条件: {dimension}"
+                conditions[self.dimensions[dimension]] = value
+
+            group_columns = [self.dimensions[dimension] for dimension in group_by]
+            select_columns = group_columns + [
+                'SUM(order_count) AS order_count',
+                'SUM(line_count) AS line_count',
+                'SUM(quantity) AS quantity'
+            ] + [f"SUM({field}) AS {field}" for field in self.amount_fields] + [
+                'SUM(order_profit) / NULLIF(SUM(rmb_amount), 0) AS profit_rate'
+            ]
+
+            query = db.query()\
+                .select(*select_columns)\
+                .from_table(self.table)\
+                .where(**conditions)
+            if group_columns:
+                query.group_by(*group_columns)
+            success, results = query\
+                .order_by('order_profit', desc=True)\
+                .limit(limit)\
+                .execute()
+            if not success:
+                return False, results
+            for row in results:
+                if isinstance(row.get('stat_date'), date):
+                    row['stat_date'] = row['stat_date'].isoformat()
+            return True, results
+
+        except Exception as e:
+            return False, f'查询利润报表失败: {str(e)}'
+
+    def _aggregate_sql(self, where: str) -> str:
+        """生成从订单明细汇总写入汇总表的 SQL"""
+        amount_columns = ', '.join(self.amount_fields)
+        amount_sums = ', '.join(f"COALESCE(SUM({field}), 0)" for field in self.amount_fields)
+        group_expressions = "DATE(payment_time), COALESCE(store, ''), category, COALESCE(country, ''), COALESCE(sku, '')"
+        return (
+            f"INSERT INTO {self.table} "
+            f"(stat_date, store, category, country, sku, order_count, line_count, quantity, {amount_columns}) "
+            f"SELECT {group_expressions}, COUNT(DISTINCT order_id), COUNT(*), COALESCE(SUM(quantity), 0), {amount_sums} "
+            f"FROM {self.order_table} "
+            f"WHERE {where} AND payment_time IS NOT NULL AND category IS NOT NULL "
+            f"GROUP BY {group_expressions}"
+        )
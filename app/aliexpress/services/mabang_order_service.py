@@ -1,15 +1,47 @@
 from app.core.services.db import db
+from app.core.services.bloom_filter import BloomFilter
+from app.core.services.database_manager import DatabaseUnavailableError, PoolTimeoutError
+from app.core.services.metrics import StageTimer, metrics
+from app.core.services.spool import Spool
+from app.core.services.xlsx_writer import XlsxStreamWriter
+from app.aliexpress.app_config import IMPORT_SPOOL_FOLDER
+from app.aliexpress.services.mabang_order_partition_service import MabangOrderPartitionService
+from app.aliexpress.services.mabang_order_profit_service import MabangOrderProfitService
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional, Tuple
+from openpyxl import load_workbook
+from werkzeug.wsgi import ClosingIterator
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
 import re
+from datetime import date
 from decimal import Decimal
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import get_context
+from itertools import chain, repeat
+import base64
+import csv
+import hashlib
+import io
+import json
+import logging
 import os
 import math
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from xml.etree import ElementTree
 
 
 class MabangOrderService:
     """马帮ERP订单服务类"""
 
+    # 进程内所有导入共用的数据库写入名额，见 _get_write_slots
+    _write_slots = None
+    _write_slots_size = 0
+    _write_slots_lock = threading.Lock()
+
     # 订单类别常量
     class Category:
         """订单类别枚举"""
@@ -30,8 +62,89 @@ class MabangOrderService:
                 cls.HALF_WAREHOUSE
             ]
 
+    # 导入模式常量
+    class ImportMode:
+        """导入模式枚举"""
+        INSERT = 'insert'  # 直接插入
+        UPSERT = 'upsert'  # 按自然键插入或更新，跳过未变化的行
+        LOAD_DATA = 'load_data'  # 转换为 TSV 后通过 LOAD DATA LOCAL INFILE 一次载入，失败时回退到 insert
+
+        @classmethod
+        def get_all_modes(cls) -> List[str]:
+            """获取所有导入模式"""
+            return [cls.INSERT, cls.UPSERT, cls.LOAD_DATA]
+
+    # 重复检测模式常量
+    class DedupeMode:
+        """重复检测模式枚举
+
+        检测范围为一次导入（一个文件、一个压缩包或一个目录），不同请求分别上传的文件之间不检测，
+        见 _new_dedupe_filter
+        """
+        OFF = 'off'  # 不检测
+        REPORT = 'report'  # 检测并在导入结果中报告，重复行照常写入
+        DROP = 'drop'  # 检测并丢弃重复行
+
+        @classmethod
+        def get_all_modes(cls) -> List[str]:
+            """获取所有重复检测模式"""
+            return [cls.OFF, cls.REPORT, cls.DROP]
+
+    # 导出格式常量
+    class ExportFormat:
+        """导出格式枚举"""
+        CSV = 'csv'
+        XLSX = 'xlsx'
+
+        @classmethod
+        def get_all_formats(cls) -> List[str]:
+            """获取所有导出格式"""
+            return [cls.CSV, cls.XLSX]
+
     def __init__(self):
         self.table = 'mabang_erp_order_list'
+        # 导入台账表，按文件内容哈希记录已成功导入的文件
+        self.ledger_table = 'mabang_order_import_ledger'
+        # 增量导入水位线表，按 类别+店铺 记录已导入的最晚付款时间
+        self.watermark_table = 'mabang_order_import_watermark'
+        # SKU明细子表，导入时将 sku_details 解析为每个 SKU 一行，按 sku 建索引
+        self.sku_line_table = 'order_sku_line'
+        self.sku_line_columns = ['order_id', 'category', 'order_sku', 'line_no', 'sku', 'quantity']
+        # SKU明细中的单项，如 SKU001*2、SKU001×2、SKU001 x 2、SKU001(2)，未写数量时为 1
+        self.sku_item_patterns = [
+            re.compile(r'^(?P<sku>.+?)\s*(?:[*×]|\s[xX]\s)\s*(?P<quantity>\d+)$'),
+            re.compile(r'^(?P<sku>.+?)\s*[(（]\s*(?P<quantity>\d+)\s*[)）]$')
+        ]
+        # 利润日汇总，导入后按涉及的 日期+店铺+类别 增量重算
+        self.profit_service = MabangOrderProfitService()
+        # 分区归档，导入时跳过付款时间早于已归档月份的订单行，见 _skip_archived
+        self.partition_service = MabangOrderPartitionService()
+        # 批量写入时每个事务包含的订单数
+        self.batch_size = 1000
+        # 导入结果中最多返回的错误信息条数
+        self.max_error_msgs = 10
+        # 超过该大小的 xlsx 文件自动使用流式读取（字节）
+        self.stream_threshold = 50 * 1024 * 1024
+        # 目录导入时的解析进程数和数据库写入线程数，写入线程数为空时按连接池大小确定，见 _get_db_writers
+        self.max_parse_workers = os.cpu_count() or 1
+        self.max_db_writers = None
+        # 压缩包中单个Excel文件和全部Excel文件解压后的大小上限（字节），按 zip 目录中记录的大小检查，
+        # 读取时解压出的数据不会超过记录的大小
+        self.bundle_member_max_bytes = 512 * 1024 * 1024
+        self.bundle_total_max_bytes = 2 * 1024 * 1024 * 1024
+        # 导出时每次向响应写出的行数
+        self.export_chunk_rows = 1000
+        # 订单行自然键，对应唯一索引 uk_order_sku_category（分区后加入了 payment_time，
+        # 付款时间为空的行不受唯一索引约束，写入时另行去重，见 _exclude_null_payment_duplicates）
+        self.natural_key = ('order_id', 'sku', 'category')
+        # 重复检测的键（订单编号 + SKU），同一订单行出现在不同类别的导出中即为重复
+        self.dedupe_key = ('order_id', 'sku')
+        # 重复检测的布隆过滤器容量和误判率，容量 200 万时约占 2.3MB，超过容量只会增加确认查询
+        self.dedupe_capacity = 2000000
+        self.dedupe_error_rate = 0.01
+        # 写入数据库前批次先追加到暂存文件，数据库不可用时保留等待 replay_spool 重放；
+        # 每块一次序列化和 fsync，约占导入耗时的 10%，为空时不使用暂存
+        self.spool_dir = IMPORT_SPOOL_FOLDER
         # 文件名与订单类别的映射规则
         self.category_patterns = {
             # 全托管-仓发
@@ -174,6 +287,110 @@ class MabangOrderService:
             print(f"处理数据出错: {str(e)}")
             return None
 
+    def _process_dataframe(self, df: pd.DataFrame, category: str) -> List[Dict]:
+        """按列批量处理整个 DataFrame
+
+        与逐行调用 _process_row_data 的结果完全一致，但按列完成字段映射、
+        类型转换、PON 交易过滤和 NaN 处理，避免 iterrows 的逐行开销。
+
+        Args:
+            df: 已去除列名空白的订单 DataFrame
+            category: 订单类别
+
+        Returns:
+            List[Dict]: 处理后的订单数据列表（已跳过 PON 交易和无订单编号的行）
+        """
+        category = category[1] if isinstance(category, tuple) else category
+        if df.empty:
+            return []
+
+        # 使用与 iterrows 相同的数据源，保证每个单元格的 Python 类型一致
+        values = df.values
+        # 重复列名时与 row.to_dict() 一致，保留最后一列
+        column_index = {name: i for i, name in enumerate(df.columns)}
+
+        def column(excel_field: str) -> Optional[np.ndarray]:
+            index = column_index.get(excel_field)
+            return None if index is None else values[:, index]
+
+        # 跳过PON开头的交易编号，以及订单编号为空的行
+        order_ids = column('订单编号')
+        if order_ids is None:
+            return []
+        keep = np.fromiter((bool(v) for v in order_ids), dtype=bool, count=len(order_ids))
+        transaction_ids = column('交易编号')
+        if transaction_ids is not None:
+            keep &= ~np.fromiter(
+                (str(v).startswith('PON') for v in transaction_ids),
+                dtype=bool,
+                count=len(transaction_ids)
+            )
+        if not keep.any():
+            return []
+
+        row_count = int(keep.sum())
+        db_fields = []
+        converted_columns = []
+        for excel_field, db_field in self.field_mapping.items():
+            db_fields.append(db_field)
+            raw = column(excel_field)
+            if raw is None:
+                converted_columns.append([None] * row_count)
+                continue
+            converted_columns.append(self._convert_column(raw[keep], db_field))
+
+        # 与逐行处理的最终检查保持一致
+        category_value = None if pd.isna(category) else category
+        fields = ['category'] + db_fields
+        return [
+            dict(zip(fields, row))
+            for row in zip(repeat(category_value, row_count), *converted_columns)
+        ]
+
+    def _convert_column(self, raw: np.ndarray, db_field: str) -> List[Any]:
+        """按字段类型转换一整列数据，NaN 统一转换为 None"""
+        result = np.full(len(raw), None, dtype=object)
+        not_na = np.flatnonzero(~pd.isna(raw))
+        if not len(not_na):
+            return result.tolist()
+
+        special_fields = self.field_types['special_fields']
+        if db_field in self.field_types['decimal_fields']:
+            convert = self._get_decimal
+        elif db_field in self.field_types['int_fields']:
+            convert = self._get_int
+        elif db_field in special_fields:
+            convert = special_fields[db_field]
+        else:
+            convert = self._to_text
+
+        # 导出中的金额、重量、店铺名等大量重复，同一列内相同的值只转换一次
+        cache = {}
+
+        def convert_cached(value):
+            if value == 0:
+                # 0.0 与 -0.0 相等但转换结果不同，不走缓存
+                return convert(value)
+            key = (value.__class__, value)
+            try:
+                return cache[key]
+            except KeyError:
+                cache[key] = converted_value = convert(value)
+                return converted_value
+
+        converted = np.empty(len(not_na), dtype=object)
+        converted[:] = [convert_cached(value) for value in raw[not_na]]
+        converted[pd.isna(converted)] = None
+        result[not_na] = converted
+        return result.tolist()
+
+    @staticmethod
+    def _to_text(value: Any) -> Optional[str]:
+        """转换为去除首尾空白的字符串"""
+        if isinstance(value, str):
+            return value.strip() or None
+        return str(value)
+
     def _clean_order_data(self, data):
         """清理订单数据，处理特殊值
         
@@ -198,9 +415,48 @@ class MabangOrderService:
                 cleaned[key] = value
         return cleaned
 
-    def import_orders_from_excel(self, file_path: str) -> tuple:
-        """从Excel文件导入订单数据"""
+    def import_orders_from_excel(
+            self,
+            file_path: str,
+            batch_size: int = None,
+            stream: bool = None,
+            mode: str = ImportMode.INSERT,
+            on_progress: Callable[[Dict], None] = None,
+            file_hash: str = None,
+            incremental: bool = False,
+            dedupe: str = DedupeMode.OFF
+    ) -> tuple:
+        """从Excel文件导入订单数据
+
+        Args:
+            file_path: Excel文件路径
+            batch_size: 每个事务写入的订单数，默认使用 self.batch_size
+            stream: 是否流式读取（仅支持 xlsx），默认在文件超过 self.stream_threshold 时启用
+            mode: 导入模式，见 ImportMode；upsert 模式按自然键更新已存在的订单；
+                load_data 模式将全部订单写入临时 TSV 后一次载入，失败时按 insert 模式重新导入
+            on_progress: 进度回调，每写入一块后以 rows_parsed/rows_written/errors 调用
+            file_hash: 文件内容哈希，全部订单写入成功后记入导入台账
+            incremental: 是否增量导入。马帮导出是累计的，增量导入时按 类别+店铺 的水位线
+                跳过已导入的行：早于水位线的行在转换前丢弃，等于水位线的行按内容指纹去重，
+                全部订单写入成功后推进水位线。已导入订单的后续变化不会被导入，需要时使用全量导入
+            dedupe: 重复检测模式，见 DedupeMode 和 _check_duplicates，只检测本文件内的重复行，load_data 模式不支持
+
+        Returns:
+            tuple: (是否成功, 导入结果/错误信息)，导入结果的 metrics 为各阶段
+                （read_header/read/process/write/rollup/watermark）耗时、吞吐量和峰值内存，
+                同时记入指标登记表 mabang_order_import。导入中途数据库不可用时，剩余批次写入暂存文件，
+                导入结果的 spooled 为暂存的订单数、spool_file 为暂存文件，数据库恢复后由 replay_spool 写入。
+                付款时间早于已归档月份的订单行不导入，计入 archived_skipped，见 _skip_archived
+        """
+        workbook = None
+        timer = None
         try:
+            if mode not in self.ImportMode.get_all_modes():
+                return False, f"不支持的导入模式: {mode}"
+            success, seen_keys = self._new_dedupe_filter(mode, dedupe)
+            if not success:
+                return False, seen_keys
+
             # 从文件名判断类别
             success, category = self._get_category_from_filename(file_path)
             if not success:
@@ -210,46 +466,1865 @@ class MabangOrderService:
             if isinstance(category, tuple):
                 category = category[1]
             
-            df = pd.read_excel(file_path)
-            df.columns = df.columns.str.strip()
-            
-            # 处理每一行数据
-            success_count = 0
-            error_count = 0
-            error_msgs = []
+            batch_size = batch_size or self.batch_size
+            if stream is None:
+                stream = os.path.getsize(file_path) > self.stream_threshold
+            if stream and not file_path.lower().endswith('.xlsx'):
+                # openpyxl 不支持 xls，回退到一次性读取
+                stream = False
+
+            timer = StageTimer()
+            # 写入任何数据之前先检查表头，xlsx 的表头和数据共用一个只读工作簿
+            with timer.stage('read_header'):
+                if file_path.lower().endswith('.xlsx'):
+                    workbook = self._open_workbook(file_path)
+                header = self._read_excel_header(file_path, workbook)
+            missing_columns = self._get_missing_columns(header)
+            if '订单编号' in missing_columns:
+                return False, f"缺少必需列: 订单编号，文件中共缺少以下列: {', '.join(missing_columns)}"
+            if missing_columns:
+                logging.warning(f"{os.path.basename(file_path)} 缺少列: {', '.join(missing_columns)}，对应字段将导入为空")
+
+            if stream:
+                batches = timer.iterate('read', self._read_excel_batches(file_path, batch_size, workbook))
+            else:
+                with timer.stage('read'):
+                    batches = [self._read_excel(file_path, header, workbook)]
+                timer.add_rows('read', len(batches[0]))
             
-            for _, row in df.iterrows():
-                try:
-                    # 转换为字典并处理数据
-                    order_data = self._process_row_data(row.to_dict(), category)
-                    if not order_data:
-                        continue
-                    
-                    # 不需要再次清理数据，因为 _process_row_data 已经处理过了
-                    # 删除这行: order_data = self._clean_order_data(order_data)
-                    
-                    # 保存到数据库
-                    success = db.create(self.table, data=order_data)
-                    if success:
-                        success_count += 1
-                    else:
-                        error_count += 1
-                        error_msgs.append(f"保存失败: {order_data.get('order_id')}")
-                        
-                except Exception as e:
-                    error_count += 1
-                    error_msgs.append(str(e))
+            summary = self._new_summary(mode, dedupe)
+            if missing_columns:
+                summary['missing_columns'] = missing_columns
+            if incremental:
+                success, watermarks = self._get_watermarks(category)
+                if not success:
+                    return False, watermarks
+                summary['skipped'] = 0  # 水位线之前已导入的行数
+                watermark_state = {}
+            archive_cutoff = self._get_archive_cutoff()
+            rollup_slices = set()
+            load_file = self._open_load_file() if mode == self.ImportMode.LOAD_DATA else None
+            line_file = self._open_load_file() if mode == self.ImportMode.LOAD_DATA else None
+            spool = None if load_file else self._create_spool(mode, file_path)
+            # load_data 模式下付款时间为空的订单行在载入成功后按 insert 写入，见 _load_orders
+            null_payment_orders = []
+            try:
+                for df in batches:
+                    summary['total'] += len(df)
+                    self._report_progress(summary, on_progress)
+                    # 按列批量转换数据
+                    with timer.stage('process', rows=len(df)):
+                        if incremental:
+                            orders, skipped = self._process_incremental(df, category, watermarks)
+                            summary['skipped'] += skipped
+                            self._track_watermarks(watermark_state, orders)
+                        else:
+                            orders = self._process_dataframe(df, category)
+                        orders = self._skip_archived(orders, summary, archive_cutoff)
+                        rollup_slices |= self._get_rollup_slices(orders)
+                    with timer.stage('write', rows=len(orders)):
+                        if load_file:
+                            null_flags = self._get_null_payment_flags(orders)
+                            null_payment_orders.extend(
+                                order_data for order_data, is_null in zip(orders, null_flags) if is_null
+                            )
+                            orders = [order_data for order_data, is_null in zip(orders, null_flags) if not is_null]
+                            self._write_load_file(load_file, orders)
+                            self._write_load_file(line_file, self._get_sku_lines(orders), self.sku_line_columns)
+                            summary['staged'] += len(orders)
+                        else:
+                            self._save_orders(
+                                orders, batch_size, summary, mode, on_progress, dedupe, seen_keys, spool,
+                                rollup_slices
+                            )
+
+                if load_file:
+                    load_file.close()
+                    line_file.close()
+                    with timer.stage('write'):
+                        success, result = self._bulk_load(
+                            load_file.name, line_file.name, summary['staged'], summary
+                        )
+                    if not success:
+                        # 载入在一个事务中完成，失败时没有写入任何数据，按逐块插入重新导入
+                        logging.warning(f"LOAD DATA 导入失败，回退到 insert 模式: {result}")
+                        success, fallback_summary = self.import_orders_from_excel(
+                            file_path, batch_size, stream, self.ImportMode.INSERT, on_progress, file_hash, incremental,
+                            dedupe
+                        )
+                        if success:
+                            fallback_summary['load_data_fallback'] = result
+                        return success, fallback_summary
+                    with timer.stage('write'):
+                        if null_payment_orders:
+                            self._save_orders(null_payment_orders, batch_size, summary, self.ImportMode.INSERT)
+                    self._report_progress(summary, on_progress)
+            finally:
+                if load_file:
+                    self._remove_load_file(load_file)
+                    self._remove_load_file(line_file)
+                if spool is not None:
+                    spool.finish()
+            # 数据库不可用时不重算汇总，由重放按暂存文件中的全部批次重算
+            if not summary.get('spooled'):
+                with timer.stage('rollup'):
+                    self._refresh_profit_rollup(rollup_slices)
+
+            # 存在失败或暂存的订单时不推进水位线，允许重新导入
+            if incremental and summary['error'] == 0 and not summary.get('spooled'):
+                with timer.stage('watermark'):
+                    self._save_watermarks(category, watermarks, watermark_state)
+            summary['metrics'] = timer.result(summary['total'])
+            metrics.record('mabang_order_import', {
+                'file': os.path.basename(file_path),
+                'category': category,
+                'mode': mode,
+                'stream': stream,
+                'rows': summary['total'],
+                'metrics': summary['metrics']
+            })
+            # 存在失败或暂存的订单时不记入台账，允许重新导入
+            if file_hash and summary['error'] == 0 and not summary.get('spooled'):
+                self._record_import_ledger(file_hash, file_path, category, mode, summary)
+            return True, summary
             
+        except Exception as e:
+            return False, f'导入失败: {str(e)}'
+        finally:
+            if timer is not None:
+                timer.stop()
+            if workbook is not None:
+                workbook.close()
+
+    def list_orders(
+            self,
+            page: int = 1,
+            page_size: int = 10,
+            filters: Dict = None,
+            cursor: str = None
+    ) -> tuple:
+        """分页查询订单列表，按付款时间、ID 倒序
+
+        传入 cursor 时使用游标（keyset）分页，从上一页最后一条之后继续查询，
+        查询耗时与翻页深度无关；未传 cursor 时按 page 使用 OFFSET 分页以兼容旧调用。
+        付款时间为空的订单不参与游标分页。
+
+        Args:
+            page: 页码，仅在未传 cursor 时生效
+            page_size: 每页记录数
+            filters: 查询条件，支持 category、store 等值条件和 payment_time 的 (start, end, 'BETWEEN')
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            tuple: (是否成功, {'rows': 订单列表, 'page_size', 'has_more', 'next_cursor'}/错误信息)
+        """
+        try:
+            query = db.query()\
+                .select('*')\
+                .from_table(self.table)\
+                .where(**(filters or {}))
+
+            offset = None
+            if cursor:
+                success, position = self._decode_cursor(cursor)
+                if not success:
+                    return False, position
+                payment_time, order_pk = position
+                # 冗余的 payment_time <= %s 便于分区表只扫描游标之前的月份分区
+                query.where_raw(
+                    "payment_time <= %s AND (payment_time < %s OR (payment_time = %s AND id < %s))",
+                    payment_time, payment_time, payment_time, order_pk
+                )
+            elif page > 1:
+                offset = (page - 1) * page_size
+
+            # 多取一条用于判断是否还有下一页
+            success, results = query\
+                .order_by('payment_time', desc=True)\
+                .order_by('id', desc=True)\
+                .limit(page_size + 1, offset)\
+                .cached()\
+                .execute()
+            if not success:
+                return False, results
+
+            rows = list(results[:page_size])
+            has_more = len(results) > page_size
+            last = rows[-1] if rows else None
+            next_cursor = self._encode_cursor(last['payment_time'], last['id']) \
+                if has_more and last and last['payment_time'] is not None else None
             return True, {
-                'total': len(df),
-                'success': success_count,
-                'error': error_count,
-                'error_msgs': error_msgs[:10]  # 只返回前10条错误信息
+                'rows': rows,
+                'page_size': page_size,
+                'has_more': has_more,
+                'next_cursor': next_cursor
             }
-            
+
+        except Exception as e:
+            return False, f'查询订单列表失败: {str(e)}'
+
+    @staticmethod
+    def _encode_cursor(payment_time: Any, order_pk: int) -> str:
+        """将分页位置编码为游标"""
+        payload = json.dumps([str(payment_time), order_pk])
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[bool, Any]:
+        """解析游标
+
+        Returns:
+            Tuple[bool, Any]: (是否成功, (payment_time, id)/错误信息)
+        """
+        try:
+            payment_time, order_pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return True, (payment_time, int(order_pk))
+        except Exception:
+            return False, '无效的分页游标'
+
+    def export_orders(self, filters: Dict = None, file_format: str = ExportFormat.CSV) -> tuple:
+        """流式导出订单，按付款时间、ID 倒序
+
+        使用服务端游标逐行读取，边读边写出，内存占用与导出行数无关。
+        表头使用导入时的中文列名，导出的文件可以直接重新导入。
+        返回的迭代器必须关闭（WSGI 服务器在响应结束或客户端断开时调用 close），
+        提前关闭时断开数据库连接，不再读取剩余结果。
+
+        Args:
+            filters: 查询条件，与 list_orders 相同
+            file_format: 导出格式，见 ExportFormat
+
+        Returns:
+            tuple: (是否成功, 文件内容分块(bytes)迭代器/错误信息)
+        """
+        if file_format not in self.ExportFormat.get_all_formats():
+            return False, f"不支持的导出格式: {file_format}"
+        try:
+            columns = ['category'] + list(self.field_mapping.values())
+            sql, params = db.query()\
+                .select(*columns)\
+                .from_table(self.table)\
+                .where(**(filters or {}))\
+                .order_by('payment_time', desc=True)\
+                .order_by('id', desc=True)\
+                .build()
+            stream = db.stream_sql(sql, params, fetch_size=self.export_chunk_rows)
+            # 先读取第一行，查询出错时在开始输出前返回错误
+            first = next(stream, None)
+        except Exception as e:
+            return False, f'导出订单失败: {str(e)}'
+
+        def iter_rows():
+            # 输出结束或客户端断开时释放服务端游标和连接
+            try:
+                yield from chain([] if first is None else [first], stream)
+            finally:
+                stream.close()
+
+        rows = iter_rows()
+        header = ['订单类别'] + list(self.field_mapping.keys())
+        if file_format == self.ExportFormat.XLSX:
+            output = self._export_xlsx(header, columns, rows)
+        else:
+            output = self._export_csv(header, columns, rows)
+        # 未开始迭代的生成器关闭时不执行 finally，客户端在首块输出前断开时由 stream.close 释放连接
+        return True, ClosingIterator(output, stream.close)
+
+    def _export_csv(self, header: List[str], columns: List[str], rows: Iterator[Dict]) -> Iterator[bytes]:
+        """逐块生成 CSV，带 BOM 以便 Excel 正确识别中文"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        try:
+            buffer.write('\ufeff')
+            writer.writerow(header)
+            for count, row in enumerate(rows, 1):
+                writer.writerow(['' if row[col] is None else row[col] for col in columns])
+                if count % self.export_chunk_rows == 0:
+                    yield buffer.getvalue().encode('utf-8')
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode('utf-8')
+        finally:
+            rows.close()
+
+    def _export_xlsx(self, header: List[str], columns: List[str], rows: Iterator[Dict]) -> Iterator[bytes]:
+        """逐行生成 xlsx，边查询边输出
+
+        工作表 XML 直接写入 zip 流，每 export_chunk_rows 行输出一次已压缩的数据，
+        不在磁盘或内存中缓存整个文件；文件开头在读取数据前就输出，大文件导出不会因首字节过晚被代理超时断开。
+        超过单个工作表的行数上限（1048576 行，含表头）时续写到新工作表（订单_2、订单_3 ...）。
+        """
+        try:
+            writer = XlsxStreamWriter('订单', header)
+            yield writer.read()
+            for count, row in enumerate(rows, 1):
+                writer.append([row[col] for col in columns])
+                if count % self.export_chunk_rows == 0:
+                    chunk = writer.read()
+                    if chunk:
+                        yield chunk
+            yield writer.close()
+        finally:
+            rows.close()
+
+    def get_import_ledger(self, file_hash: str) -> Optional[Dict]:
+        """查询文件内容哈希对应的导入台账
+
+        Args:
+            file_hash: 文件内容 SHA-256
+
+        Returns:
+            Optional[Dict]: 已成功导入过时返回 {'file_name', 'mode', 'imported_at', 'summary'}，否则返回 None
+        """
+        success, results = db.execute_sql(
+            f"SELECT file_name, mode, summary, imported_at FROM {self.ledger_table} WHERE file_hash = %s",
+            (file_hash,)
+        )
+        if not success:
+            logging.error(f"查询导入台账失败: {results}")
+            return None
+        if not results:
+            return None
+
+        record = results[0]
+        summary = record['summary']
+        return {
+            'file_name': record['file_name'],
+            'mode': record['mode'],
+            'imported_at': str(record['imported_at']),
+            'summary': json.loads(summary) if isinstance(summary, (str, bytes)) else summary
+        }
+
+    def _record_import_ledger(self, file_hash: str, file_path: str, category: str, mode: str, summary: Dict) -> None:
+        """记录成功导入的文件，写入失败只记录日志，不影响导入结果"""
+        success, result = db.execute_sql(
+            f"INSERT INTO {self.ledger_table} (file_hash, file_name, category, mode, summary) "
+            f"VALUES (%s, %s, %s, %s, %s) "
+            f"ON DUPLICATE KEY UPDATE file_name = VALUES(file_name), category = VALUES(category), "
+            f"mode = VALUES(mode), summary = VALUES(summary), imported_at = CURRENT_TIMESTAMP",
+            (file_hash, os.path.basename(file_path), category, mode, json.dumps(summary, ensure_ascii=False)),
+            fetch=False
+        )
+        if not success:
+            logging.error(f"写入导入台账失败: {result}")
+
+    def _get_watermarks(self, category: str) -> tuple:
+        """查询类别下各店铺的增量导入水位线
+
+        Returns:
+            tuple: (是否成功, {店铺名: {'payment_time': 最晚付款时间, 'row_hashes': 该时间的订单行指纹集合}}/错误信息)
+        """
+        success, results = db.execute_sql(
+            f"SELECT store, last_payment_time, boundary_hashes FROM {self.watermark_table} WHERE category = %s",
+            (category,)
+        )
+        if not success:
+            return False, f'查询导入水位线失败: {results}'
+
+        watermarks = {}
+        for record in results:
+            row_hashes = record['boundary_hashes']
+            if isinstance(row_hashes, (str, bytes)):
+                row_hashes = json.loads(row_hashes)
+            watermarks[record['store']] = {
+                'payment_time': pd.Timestamp(record['last_payment_time']),
+                'row_hashes': set(row_hashes or [])
+            }
+        return True, watermarks
+
+    def _process_incremental(self, df: pd.DataFrame, category: str, watermarks: Dict) -> Tuple[List[Dict], int]:
+        """按水位线过滤后处理 DataFrame
+
+        付款时间早于所在店铺水位线的行在转换前丢弃；等于水位线的行转换后，
+        内容指纹已记录在水位线中的丢弃。付款时间为空或无法解析的行全部保留。
+
+        Returns:
+            Tuple[List[Dict], int]: (处理后的订单数据列表, 跳过的行数)
+        """
+        payment_times = self._get_raw_column(df, '付款时间')
+        if df.empty or not watermarks or payment_times is None:
+            return self._process_dataframe(df, category), 0
+
+        stores = self._get_raw_column(df, '店铺名')
+        if stores is None:
+            stores = pd.Series('', index=df.index)
+        else:
+            stores = stores.map(lambda value: '' if pd.isna(value) else self._to_text(value) or '')
+        limits = pd.to_datetime(
+            stores.map({store: mark['payment_time'] for store, mark in watermarks.items()}),
+            errors='coerce'
+        )
+        times = self._parse_payment_times(payment_times)
+
+        # 与 NaT 的比较结果均为 False
+        before = (times < limits).to_numpy()
+        at = (times == limits).to_numpy()
+        skipped = int(before.sum())
+        orders = self._process_dataframe(df[~before & ~at], category)
+        if at.any():
+            for order_data in self._process_dataframe(df[at], category):
+                if self._get_row_hash(order_data) in watermarks[order_data.get('store') or '']['row_hashes']:
+                    skipped += 1
+                else:
+                    orders.append(order_data)
+        return orders, skipped
+
+    def _track_watermarks(self, watermark_state: Dict, orders: List[Dict]) -> None:
+        """累计本次导入各店铺的最晚付款时间及该时间的订单行指纹"""
+        if not orders:
+            return
+        times = self._parse_payment_times(pd.Series([order_data.get('payment_time') for order_data in orders], dtype=object))
+        for order_data, payment_time in zip(orders, times):
+            if pd.isna(payment_time):
+                continue
+            store = order_data.get('store') or ''
+            mark = watermark_state.get(store)
+            if mark is None or payment_time > mark['payment_time']:
+                watermark_state[store] = {'payment_time': payment_time, 'row_hashes': {self._get_row_hash(order_data)}}
+            elif payment_time == mark['payment_time']:
+                mark['row_hashes'].add(self._get_row_hash(order_data))
+
+    def _save_watermarks(self, category: str, watermarks: Dict, watermark_state: Dict) -> None:
+        """推进水位线，写入失败只记录日志，下次导入会重新处理这些行"""
+        rows = []
+        for store, mark in watermark_state.items():
+            previous = watermarks.get(store)
+            if previous and mark['payment_time'] < previous['payment_time']:
+                continue
+            row_hashes = set(mark['row_hashes'])
+            if previous and mark['payment_time'] == previous['payment_time']:
+                row_hashes |= previous['row_hashes']
+            rows.append({
+                'category': category,
+                'store': store,
+                'last_payment_time': mark['payment_time'].to_pydatetime(),
+                'boundary_hashes': json.dumps(sorted(row_hashes))
+            })
+        if rows and not db.batch_upsert(
+                self.watermark_table, rows, update_columns=['last_payment_time', 'boundary_hashes']
+        ):
+            logging.error(f"更新导入水位线失败: {category}")
+
+    @staticmethod
+    def _get_raw_column(df: pd.DataFrame, excel_field: str) -> Optional[pd.Series]:
+        """获取原始列，重复列名时与 _process_dataframe 一致取最后一列"""
+        positions = [i for i, name in enumerate(df.columns) if name == excel_field]
+        return df.iloc[:, positions[-1]] if positions else None
+
+    @staticmethod
+    def _parse_payment_times(values: pd.Series) -> pd.Series:
+        """解析付款时间，无法解析的值为 NaT
+
+        整列先按第一个值推断的格式解析，与其格式不同的值（如 2024/1/5 与 2024-01-05 10:00:00 混用）
+        再逐个解析，避免被当作无法解析。
+        """
+        times = pd.to_datetime(values, errors='coerce')
+        retry = times.isna() & values.notna()
+        if retry.any():
+            times[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+        return times
+
+    def import_orders_from_directory(
+            self,
+            directory_path: str,
+            category: str = None,
+            batch_size: int = None,
+            mode: str = ImportMode.INSERT,
+            max_workers: int = None,
+            dedupe: str = DedupeMode.OFF
+    ) -> tuple:
+        """并行导入目录下的所有订单Excel文件
+
+        文件在子进程中并行读取和转换（Excel 解析受 GIL 限制），
+        转换结果由写入线程写入数据库（线程数见 _get_db_writers），同时执行的多个导入合计占用的写入连接数也不超过该线程数。
+        同时在解析和等待写入的文件数有上限，内存占用与目录中的文件数无关。
+        每个文件只导入第一个工作表。
+
+        Args:
+            directory_path: 目录路径（不递归子目录）
+            category: 订单类别，为空时按文件名判断每个文件的类别
+            batch_size: 每个事务写入的订单数，默认使用 self.batch_size
+            mode: 导入模式，见 ImportMode
+            max_workers: 解析进程数，默认使用 self.max_parse_workers
+            dedupe: 重复检测模式，见 DedupeMode，所有文件共用一个布隆过滤器，可以发现跨文件的重复行
+
+        Returns:
+            tuple: (是否成功, 汇总结果/错误信息)，汇总结果包含每个文件的导入结果
+        """
+        try:
+            if mode not in self.ImportMode.get_all_modes():
+                return False, f"不支持的导入模式: {mode}"
+            if category and category not in self.Category.get_all_categories():
+                return False, f"不支持的订单类别: {category}"
+            if not os.path.isdir(directory_path):
+                return False, f"目录不存在: {directory_path}"
+            success, seen_keys = self._new_dedupe_filter(mode, dedupe)
+            if not success:
+                return False, seen_keys
+
+            sources = [
+                {'path': os.path.join(directory_path, filename), 'member': None, 'sheet': None, 'name': filename}
+                for filename in sorted(os.listdir(directory_path))
+                # 跳过 Excel 打开文件时生成的临时文件
+                if filename.lower().endswith(('.xls', '.xlsx')) and not filename.startswith('~$')
+            ]
+            if not sources:
+                return False, '目录中没有Excel文件'
+
+            return True, self._import_sources(
+                sources, category, batch_size, mode, max_workers, dedupe=dedupe, seen_keys=seen_keys
+            )
+
+        except Exception as e:
+            return False, f'批量导入失败: {str(e)}'
+
+    def import_orders_from_bundle(
+            self,
+            file_path: str,
+            category: str = None,
+            batch_size: int = None,
+            mode: str = ImportMode.INSERT,
+            max_workers: int = None,
+            on_progress: Callable[[Dict], None] = None,
+            file_hash: str = None,
+            dedupe: str = DedupeMode.OFF
+    ) -> tuple:
+        """导入多工作表的Excel文件或包含多个Excel文件的 zip 压缩包
+
+        压缩包中的文件不解压到磁盘，由解析进程直接读入内存；多工作表的文件按工作表拆分。
+        各工作表/文件与目录导入一样在子进程中并行解析、由写入线程并行写入。
+        类别依次按 工作表名、压缩包内文件名、上传文件名 判断，也可以通过 category 统一指定。
+
+        Args:
+            file_path: xls/xlsx/zip 文件路径
+            category: 订单类别，为空时按名称判断每个工作表的类别
+            batch_size: 每个事务写入的订单数，默认使用 self.batch_size
+            mode: 导入模式，见 ImportMode
+            max_workers: 解析进程数，默认使用 self.max_parse_workers
+            on_progress: 进度回调，以所有工作表的 rows_parsed/rows_written/errors 合计调用
+            file_hash: 文件内容哈希，所有工作表全部导入成功后记入导入台账
+            dedupe: 重复检测模式，见 DedupeMode，所有工作表共用一个布隆过滤器，可以发现跨工作表/文件的重复行
+
+        Returns:
+            tuple: (是否成功, 汇总结果/错误信息)，汇总结果的 files 为每个工作表/文件的导入结果
+        """
+        try:
+            if mode not in self.ImportMode.get_all_modes():
+                return False, f"不支持的导入模式: {mode}"
+            if category and category not in self.Category.get_all_categories():
+                return False, f"不支持的订单类别: {category}"
+            success, seen_keys = self._new_dedupe_filter(mode, dedupe)
+            if not success:
+                return False, seen_keys
+
+            sources = self._list_bundle_sources(file_path)
+            if not sources:
+                return False, '文件中没有可导入的工作表'
+
+            summary = self._import_sources(
+                sources, category, batch_size, mode, max_workers, on_progress, dedupe, seen_keys, file_path
+            )
+            # 存在失败的工作表、失败或暂存的订单时不记入台账，允许重新导入
+            if file_hash and summary['error'] == 0 and summary['failed_files'] == 0 and not summary.get('spooled'):
+                self._record_import_ledger(file_hash, file_path, category, mode, summary)
+            return True, summary
+
+        except zipfile.BadZipFile:
+            return False, '压缩包已损坏或不是 zip 格式'
         except Exception as e:
             return False, f'导入失败: {str(e)}'
 
+    def is_bundle(self, file_path: str) -> bool:
+        """是否需要按 import_orders_from_bundle 导入：zip 压缩包或包含多个可见工作表的Excel文件
+
+        无法读取工作表时返回 False，由 import_orders_from_excel 报告具体错误。
+        """
+        if file_path.lower().endswith('.zip'):
+            return True
+        try:
+            return len(self._get_sheet_names(file_path)) > 1
+        except Exception as e:
+            logging.warning(f"读取工作表失败: {str(e)}")
+            return False
+
+    def _import_sources(
+            self,
+            sources: List[Dict],
+            category: str = None,
+            batch_size: int = None,
+            mode: str = ImportMode.INSERT,
+            max_workers: int = None,
+            on_progress: Callable[[Dict], None] = None,
+            dedupe: str = DedupeMode.OFF,
+            seen_keys: BloomFilter = None,
+            spool_name: str = None
+    ) -> Dict:
+        """并行解析并写入多个导入源
+
+        Args:
+            sources: 导入源列表，每项为 {'path': 文件路径, 'member': 压缩包内文件名, 'sheet': 工作表名, 'name': 显示名称}，
+                列出时已读取失败的导入源带有 error
+            category: 订单类别，为空时按 _get_source_category 判断每个导入源的类别
+            seen_keys: 所有导入源共用的重复检测布隆过滤器，见 _new_dedupe_filter
+            spool_name: 暂存文件中记录的来源名称，所有导入源共用一个暂存文件
+
+        Returns:
+            Dict: 汇总结果，files 为按 sources 顺序排列的每个导入源的结果
+        """
+        batch_size = batch_size or self.batch_size
+        results = {}
+        source_categories = {}
+        for index, source in enumerate(sources):
+            if source.get('error'):
+                results[index] = self._new_source_result(source, mode, failed=True, msg=source['error'])
+                continue
+            success, source_category = (True, category) if category else self._get_source_category(source)
+            if success:
+                source_categories[index] = source_category
+            else:
+                results[index] = self._new_source_result(source, mode, failed=True, msg=source_category)
+
+        def report_progress(_=None):
+            # 每个导入源各自统计，进度按所有导入源合计
+            summaries = list(results.values())
+            self._report_progress({
+                key: sum(summary.get(key, 0) for summary in summaries) for key in ('total', 'success', 'error')
+            }, on_progress)
+
+        # 同一文件（或压缩包内同一文件）的各工作表在一个解析任务中读取，文件只打开一次
+        file_sources = {}
+        for index in source_categories:
+            file_sources.setdefault((sources[index]['path'], sources[index]['member']), []).append(index)
+        workers = min(max_workers or self.max_parse_workers, len(file_sources)) or 1
+        writers = self._get_db_writers()
+        # 已提交解析但未写完的导入源数上限，每个导入源的全部订单在写完前都留在内存中；
+        # 一个文件的工作表一起提交，可能超过该数
+        max_in_flight = workers + writers
+        archive_cutoff = self._get_archive_cutoff()
+        rollup_slices = set()
+        spool = self._create_spool(mode, spool_name or sources[0]['path'])
+        pending = iter(file_sources.items())
+        parse_futures, write_futures = {}, {}
+
+        def submit_parses():
+            while sum(len(indices) for indices in parse_futures.values()) + len(write_futures) < max_in_flight:
+                item = next(pending, None)
+                if item is None:
+                    return
+                (path, member), indices = item
+                parse_futures[parse_pool.submit(
+                    _convert_order_file, path, [(sources[index]['sheet'], source_categories[index]) for index in indices],
+                    member, self.bundle_member_max_bytes
+                )] = indices
+
+        # Web 进程中有多个后台线程，fork 出的子进程可能继承被其他线程持有的锁，解析进程改用 spawn 启动
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as parse_pool, \
+                ThreadPoolExecutor(max_workers=writers) as write_pool:
+            submit_parses()
+            while parse_futures or write_futures:
+                done, _ = wait(list(parse_futures) + list(write_futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in write_futures:
+                        index = write_futures.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            results[index].update({'failed': True, 'msg': f'写入失败: {str(e)}'})
+                        continue
+
+                    indices = parse_futures.pop(future)
+                    try:
+                        converted = future.result()
+                    except Exception as e:
+                        converted = [e] * len(indices)
+                    for index, sheet_result in zip(indices, converted):
+                        if isinstance(sheet_result, Exception):
+                            results[index] = self._new_source_result(
+                                sources[index], mode, failed=True, msg=f'读取失败: {str(sheet_result)}'
+                            )
+                            continue
+                        total, missing_columns, orders = sheet_result
+                        summary = self._new_source_result(sources[index], mode, dedupe=dedupe)
+                        summary['total'] = total
+                        if missing_columns:
+                            summary['missing_columns'] = missing_columns
+                        results[index] = summary
+                        orders = self._skip_archived(orders, summary, archive_cutoff)
+                        report_progress()
+                        rollup_slices |= self._get_rollup_slices(orders)
+                        write_futures[write_pool.submit(
+                            self._save_orders, orders, batch_size, summary, mode,
+                            report_progress if on_progress else None, dedupe, seen_keys, spool, rollup_slices
+                        )] = index
+                submit_parses()
+        if spool is not None:
+            spool.finish()
+        spooled = sum(file_result.get('spooled', 0) for file_result in results.values())
+        archived_skipped = sum(file_result.get('archived_skipped', 0) for file_result in results.values())
+        # 数据库不可用时不重算汇总，由重放按暂存文件中的全部批次重算
+        if not spooled:
+            self._refresh_profit_rollup(rollup_slices)
+
+        files = [results[index] for index in range(len(sources))]
+        aggregate = self._new_summary(mode, dedupe)
+        aggregate.pop('error_msgs')
+        aggregate.pop('duplicate_samples', None)
+        for file_result in files:
+            for key in aggregate:
+                aggregate[key] += file_result.get(key, 0)
+        aggregate.update({
+            'file_count': len(files),
+            'failed_files': sum(1 for file_result in files if file_result['failed']),
+            'files': files
+        })
+        if spooled:
+            aggregate.update({'spooled': spooled, 'spool_file': spool.path})
+        if archived_skipped:
+            aggregate['archived_skipped'] = archived_skipped
+        return aggregate
+
+    def _get_archive_cutoff(self) -> Optional[date]:
+        """查询已归档的付款时间上界，每次导入查询一次，查询失败时不跳过任何订单行"""
+        success, cutoff = self.partition_service.get_archive_cutoff()
+        if not success:
+            logging.warning(f"查询订单归档日期失败，本次导入不跳过已归档的订单: {cutoff}")
+            return None
+        return cutoff
+
+    def _skip_archived(self, orders: List[Dict], summary: Dict, cutoff: Optional[date]) -> List[Dict]:
+        """丢弃付款时间早于归档上界的订单行，计入 summary 的 archived_skipped
+
+        这些月份的分区已移入归档表并删除，累计导出中的旧订单重新写入后会落入最早的月份分区，
+        下次归档时再次复制，且会使已归档日期的利润汇总按不完整的数据重算。付款时间为空的行不跳过。
+        """
+        if cutoff is None or not orders:
+            return orders
+        times = self._parse_payment_times(pd.Series([order_data.get('payment_time') for order_data in orders], dtype=object))
+        limit = pd.Timestamp(cutoff)
+        kept = [order_data for order_data, payment_time in zip(orders, times) if pd.isna(payment_time) or payment_time >= limit]
+        skipped = len(orders) - len(kept)
+        if skipped:
+            summary['archived_skipped'] = summary.get('archived_skipped', 0) + skipped
+        return kept
+
+    def _get_db_writers(self) -> int:
+        """目录和多工作表导入的数据库写入线程数，同时也是进程内所有导入共用的写入名额数
+
+        未设置 self.max_db_writers 时为连接池大小减一，为汇总重算等其他查询保留一个连接，
+        避免写入线程占满连接池后其他取连接的操作等待超时。
+        同时执行多个导入任务时各自的写入线程合计可能超过该数，每块写入前先取得共用的写入名额，
+        同时写入的块数（占用的连接数）仍不超过该数，见 _get_write_slots。
+        """
+        if self.max_db_writers:
+            return self.max_db_writers
+        return max(1, db.pool_size - 1)
+
+    def _get_write_slots(self) -> threading.BoundedSemaphore:
+        """进程内所有导入（包括同时执行的导入任务和暂存重放）共用的写入名额，数量为 _get_db_writers()
+
+        连接池大小或 max_db_writers 变化后重新创建，已取得旧名额的写入结束后归还到旧的信号量。
+        """
+        size = self._get_db_writers()
+        with MabangOrderService._write_slots_lock:
+            if MabangOrderService._write_slots is None or MabangOrderService._write_slots_size != size:
+                MabangOrderService._write_slots = threading.BoundedSemaphore(size)
+                MabangOrderService._write_slots_size = size
+            return MabangOrderService._write_slots
+
+    def _new_source_result(
+            self,
+            source: Dict,
+            mode: str,
+            failed: bool = False,
+            msg: str = None,
+            dedupe: str = DedupeMode.OFF
+    ) -> Dict:
+        """创建单个导入源的结果，file 为显示名称，按工作表拆分时附带 sheet"""
+        result = {'file': source['name'], 'failed': failed}
+        if source['sheet']:
+            result['sheet'] = source['sheet']
+        if failed:
+            result['msg'] = msg
+        else:
+            result.update(self._new_summary(mode, dedupe))
+        return result
+
+    def _get_source_category(self, source: Dict) -> Tuple[bool, str]:
+        """依次按 工作表名、压缩包内文件名、文件名 判断导入源的类别"""
+        for name in (source['sheet'], source['member'], source['path']):
+            if name:
+                success, category = self._get_category_from_filename(name)
+                if success:
+                    return True, category
+        if source['sheet']:
+            return False, f"无法从工作表名'{source['sheet']}'或文件名'{source['name']}'判断订单类别，请确保名称包含类别信息"
+        return self._get_category_from_filename(source['name'])
+
+    def _list_bundle_sources(self, file_path: str) -> List[Dict]:
+        """列出文件中的导入源
+
+        zip 按其中的每个Excel文件展开（跳过目录、macOS 元数据和 Excel 临时文件），
+        多工作表的文件按可见工作表展开，单工作表的文件作为一个导入源。
+        解压后超过 bundle_member_max_bytes 的文件记为读取失败；全部Excel文件解压后
+        超过 bundle_total_max_bytes 时整个压缩包不导入。
+
+        Raises:
+            ValueError: 压缩包解压后的总大小超过上限
+        """
+        if not file_path.lower().endswith('.zip'):
+            return self._expand_sheets(
+                {'path': file_path, 'member': None, 'name': os.path.basename(file_path)},
+                self._get_sheet_names(file_path)
+            )
+
+        sources = []
+        with zipfile.ZipFile(file_path) as bundle:
+            members = []
+            for info in bundle.infolist():
+                name = self._decode_member_name(info)
+                basename = os.path.basename(name)
+                if info.is_dir() or name.startswith('__MACOSX/') or basename.startswith(('~$', '._')):
+                    continue
+                if basename.lower().endswith(('.xls', '.xlsx')):
+                    members.append((info, name))
+            total_bytes = sum(info.file_size for info, _ in members)
+            if total_bytes > self.bundle_total_max_bytes:
+                raise ValueError(
+                    f"压缩包解压后共 {total_bytes // 1024 // 1024}MB，"
+                    f"超过上限 {self.bundle_total_max_bytes // 1024 // 1024}MB"
+                )
+
+            for info, name in members:
+                source = {'path': file_path, 'member': info.filename, 'name': name}
+                if info.file_size > self.bundle_member_max_bytes:
+                    sources.append({
+                        **source, 'sheet': None,
+                        'error': f"读取失败: 解压后 {info.file_size // 1024 // 1024}MB，"
+                                 f"超过上限 {self.bundle_member_max_bytes // 1024 // 1024}MB"
+                    })
+                    continue
+                try:
+                    if name.lower().endswith('.xlsx'):
+                        # 从压缩流中直接读取 xl/workbook.xml，不把整个文件解压到内存
+                        with bundle.open(info) as member:
+                            sheet_names = self._get_sheet_names(member, True)
+                    else:
+                        # xls 需要完整读入内存，不解压到磁盘
+                        sheet_names = self._get_sheet_names(io.BytesIO(bundle.read(info)), False)
+                except Exception as e:
+                    # 单个文件损坏不影响压缩包中的其他文件
+                    sources.append({**source, 'sheet': None, 'error': f'读取失败: {str(e)}'})
+                    continue
+                sources.extend(self._expand_sheets(source, sheet_names))
+        return sources
+
+    @staticmethod
+    def _expand_sheets(source: Dict, sheet_names: List[str]) -> List[Dict]:
+        """多工作表的文件按工作表展开，单工作表时不指定工作表名"""
+        if len(sheet_names) <= 1:
+            return [{**source, 'sheet': None}]
+        return [{**source, 'sheet': sheet_name} for sheet_name in sheet_names]
+
+    @staticmethod
+    def _decode_member_name(info: zipfile.ZipInfo) -> str:
+        """获取压缩包内的文件名
+
+        未设置 UTF-8 标志的文件名按 cp437 解码，Windows 中文系统压缩的文件实际为 GBK 编码。
+        """
+        if info.flag_bits & 0x800:
+            return info.filename
+        try:
+            return info.filename.encode('cp437').decode('gbk')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            return info.filename
+
+    def _get_sheet_names(self, file_path: Any, is_xlsx: bool = None) -> List[str]:
+        """获取Excel文件的可见工作表名
+
+        xlsx 只解析 xl/workbook.xml，不加载工作表和共享字符串；xls 由 pandas 读取工作表名。
+
+        Args:
+            file_path: Excel文件路径或文件对象
+            is_xlsx: 是否为 xlsx，为空时按文件路径判断
+        """
+        if is_xlsx is None:
+            is_xlsx = self._is_xlsx(file_path)
+        if not is_xlsx:
+            if hasattr(file_path, 'seek'):
+                file_path.seek(0)
+            return list(pd.ExcelFile(file_path).sheet_names)
+
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        with zipfile.ZipFile(file_path) as archive:
+            root = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        return [
+            sheet.get('name')
+            for sheet in root.iter(f'{namespace}sheet')
+            if sheet.get('state', 'visible') == 'visible'
+        ]
+
+    def _get_rollup_slices(self, orders: List[Dict]) -> set:
+        """获取订单涉及的利润汇总切片 (付款日期, 店铺名, 类别)，付款时间为空或无法解析的订单不参与汇总"""
+        if not orders:
+            return set()
+        times = self._parse_payment_times(pd.Series([order_data.get('payment_time') for order_data in orders], dtype=object))
+        return {
+            (payment_time.strftime('%Y-%m-%d'), order_data.get('store') or '', order_data.get('category'))
+            for order_data, payment_time in zip(orders, times)
+            if not pd.isna(payment_time) and order_data.get('category') is not None
+        }
+
+    def _refresh_profit_rollup(self, rollup_slices: set) -> None:
+        """增量重算利润汇总，失败只记录日志，可通过 rebuild-profit-rollup 命令回填"""
+        if not rollup_slices:
+            return
+        success, result = self.profit_service.refresh_slices(rollup_slices)
+        if not success:
+            logging.error(f"导入后重算利润汇总失败: {result}")
+
+    def _new_summary(self, mode: str = ImportMode.INSERT, dedupe: str = DedupeMode.OFF) -> Dict:
+        """创建空的导入结果统计"""
+        summary = {
+            'total': 0,
+            'success': 0,
+            'error': 0,
+            'error_msgs': []  # 只返回前10条错误信息
+        }
+        if mode == self.ImportMode.UPSERT:
+            summary.update({'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicate': 0})
+        elif mode == self.ImportMode.LOAD_DATA:
+            summary['staged'] = 0  # 写入临时 TSV 的订单数
+            summary['duplicate'] = 0  # 订单表中已存在、未写入的订单行数，计入 success
+        if dedupe != self.DedupeMode.OFF:
+            summary.update({
+                'suspected_duplicates': 0,  # 布隆过滤器判断可能重复、需要查库确认的行数
+                'confirmed_duplicates': 0,  # 确认重复的行数，drop 模式下这些行未写入
+                'duplicate_samples': []  # 只返回前10条重复行
+            })
+        return summary
+
+    @staticmethod
+    def _open_workbook(file_path: Any):
+        """以只读模式打开 xlsx（路径或文件对象），打开时会解析整个共享字符串表，同一文件应只打开一次"""
+        return load_workbook(file_path, read_only=True, data_only=True)
+
+    @staticmethod
+    def _is_xlsx(file_path: Any) -> bool:
+        """是否为 xlsx 文件路径；xls 可以传入文件对象，按 xls 处理"""
+        return isinstance(file_path, str) and file_path.lower().endswith('.xlsx')
+
+    @staticmethod
+    def _get_worksheet(workbook, sheet_name: str = None):
+        """获取指定工作表，未指定时为第一个工作表"""
+        return workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+
+    def _read_excel_header(self, file_path: Any, workbook=None, sheet_name: str = None) -> List[Any]:
+        """只读取Excel工作表的表头
+
+        xlsx 以只读模式读取第一行即可返回；pandas 的 nrows=0 仍会解析整个工作表。
+
+        Args:
+            file_path: Excel文件路径，xls 也可以是文件对象或已打开的 pd.ExcelFile
+            workbook: 已打开的只读工作簿（仅 xlsx），为空时临时打开
+            sheet_name: 工作表名，默认为第一个工作表
+        """
+        if not self._is_xlsx(file_path):
+            if hasattr(file_path, 'seek'):
+                file_path.seek(0)
+            return list(pd.read_excel(file_path, sheet_name=sheet_name or 0, nrows=0).columns)
+
+        opened = workbook is None
+        if opened:
+            workbook = self._open_workbook(file_path)
+        try:
+            header = next(self._get_worksheet(workbook, sheet_name).iter_rows(max_row=1, values_only=True), ())
+        finally:
+            if opened:
+                workbook.close()
+        # 与 pandas 一致，空表头命名为 Unnamed: 列序号
+        return [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+
+    def _get_missing_columns(self, header: List[Any]) -> List[str]:
+        """获取表头中缺少的映射列"""
+        columns = {str(name).strip() for name in header}
+        return [excel_field for excel_field in self.field_mapping if excel_field not in columns]
+
+    def _get_excel_dtypes(self, header: List[Any]) -> Dict[Any, Any]:
+        """获取映射列的读取类型
+
+        数值、特殊字段和付款时间保留单元格原始值（object），由转换函数统一处理千分位、百分号等格式；
+        其余文本字段直接按字符串读取。未映射的列不读取。
+        """
+        raw_fields = set(self.field_types['decimal_fields']) | set(self.field_types['int_fields']) | \
+            set(self.field_types['special_fields']) | {'payment_time'}
+        dtypes = {}
+        for name in header:
+            db_field = self.field_mapping.get(str(name).strip())
+            if db_field is not None:
+                dtypes[name] = object if db_field in raw_fields else str
+        return dtypes
+
+    def _read_excel(
+            self,
+            file_path: Any,
+            header: List[Any] = None,
+            workbook=None,
+            sheet_name: str = None
+    ) -> pd.DataFrame:
+        """一次性读取Excel工作表的映射列，并去除列名首尾空白
+
+        xlsx 直接用 openpyxl 只读取单元格值，未映射列不做任何转换；
+        xls 由 pandas 按映射列和显式类型读取。
+
+        Note:
+            文本字段中的整数值始终写为不带小数的字符串（如 123）。改为按映射列读取之前，
+            整表由 pd.read_excel 推断类型，数字列中有空单元格时整列为浮点数，这些值写为 '123.0'；
+            此前以该格式导入的订单编号、SKU 等与新导入的值不同，需先执行
+            sql/mabang_erp_order_list_integer_text.sql 规范化已有数据，否则 upsert 和重复检测不会将它们视为同一行。
+
+        Args:
+            file_path: Excel文件路径，xls 也可以是文件对象或已打开的 pd.ExcelFile
+            header: 已读取的表头，为空时先读取表头
+            workbook: 已打开的只读工作簿（仅 xlsx），为空时临时打开
+            sheet_name: 工作表名，默认为第一个工作表
+        """
+        if header is None:
+            header = self._read_excel_header(file_path, workbook, sheet_name)
+        if self._is_xlsx(file_path):
+            frames = list(self._read_excel_batches(file_path, sys.maxsize, workbook, sheet_name))
+            if frames:
+                return frames[0]
+            return pd.DataFrame(columns=[
+                str(name).strip() for name in header if str(name).strip() in self.field_mapping
+            ], dtype=object)
+
+        dtypes = self._get_excel_dtypes(header)
+        if hasattr(file_path, 'seek'):
+            file_path.seek(0)
+        df = pd.read_excel(file_path, sheet_name=sheet_name or 0, usecols=list(dtypes), dtype=dtypes)
+        df.columns = df.columns.str.strip()
+        return df
+
+    def _read_excel_batches(
+            self,
+            file_path: str,
+            batch_size: int,
+            workbook=None,
+            sheet_name: str = None
+    ) -> Iterator[pd.DataFrame]:
+        """以只读模式逐行读取 xlsx 工作表的映射列，按固定行数分批返回
+
+        内存占用只与 batch_size 有关，与文件大小无关。
+        单元格保留 openpyxl 读出的原始类型，不做整列类型推断；
+        与 pandas 一致，整数值的浮点数转换为 int。
+
+        Args:
+            file_path: xlsx 文件路径
+            batch_size: 每批行数
+            workbook: 已打开的只读工作簿，为空时临时打开，由调用方负责关闭
+            sheet_name: 工作表名，默认为第一个工作表
+
+        Yields:
+            pd.DataFrame: 列名已去除首尾空白的一批数据
+        """
+        opened = workbook is None
+        if opened:
+            workbook = self._open_workbook(file_path)
+        try:
+            rows = self._get_worksheet(workbook, sheet_name).iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            names = [str(name).strip() if name is not None else '' for name in header]
+            # 只保留映射列
+            indexes = [i for i, name in enumerate(names) if name in self.field_mapping]
+            columns = [names[i] for i in indexes]
+            width = len(names)
+            padding = (None,) * width
+
+            batch = []
+            for row in rows:
+                # 跳过空行
+                if all(value is None for value in row):
+                    continue
+                if len(row) != width:
+                    row = (row + padding)[:width]
+                batch.append(tuple(
+                    int(value) if isinstance(value, float) and value.is_integer() else value
+                    for value in (row[i] for i in indexes)
+                ))
+                if len(batch) >= batch_size:
+                    yield pd.DataFrame(batch, columns=columns, dtype=object)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns, dtype=object)
+        finally:
+            if opened:
+                workbook.close()
+
+    def _save_orders(
+            self,
+            orders: List[Dict],
+            batch_size: int,
+            summary: Dict,
+            mode: str = ImportMode.INSERT,
+            on_progress: Callable[[Dict], None] = None,
+            dedupe: str = DedupeMode.OFF,
+            seen_keys: BloomFilter = None,
+            spool: Spool = None,
+            rollup_slices: set = None
+    ) -> None:
+        """分块批量写入订单
+
+        每块在一个事务中以多行 INSERT 写入；整块失败时逐行重试，
+        保证 summary 中的成功/失败统计与逐行写入一致。
+
+        Args:
+            orders: 已处理的订单数据列表
+            batch_size: 每块的订单数
+            summary: 导入结果统计，原地累加 success/error/error_msgs
+            mode: 导入模式，见 ImportMode
+            on_progress: 进度回调，每写入一块后调用
+            dedupe: 重复检测模式，见 DedupeMode
+            seen_keys: 本次导入的重复检测布隆过滤器，开启重复检测时必须传入
+            spool: 本次导入的暂存文件，每块写入前先追加到暂存文件；数据库不可用时暂停写入，
+                该块及之后的块只追加到暂存文件，计入 summary 的 spooled。为空时数据库不可用的块整块记为失败。
+                等待连接池超时（PoolTimeoutError）不视为数据库不可用，该块未写入的行记为失败，之后的块继续写入。
+                写入时出现其他异常时确认该块（不再重放）并抛出异常
+            rollup_slices: 利润汇总切片集合，upsert 更新已存在的订单行时原地加入旧行所在的切片
+        """
+        if mode == self.ImportMode.LOAD_DATA:
+            self._load_orders(orders, batch_size, summary, on_progress, spool)
+            return
+
+        for start in range(0, len(orders), batch_size):
+            chunk = orders[start:start + batch_size]
+            if dedupe != self.DedupeMode.OFF:
+                chunk = self._check_duplicates(chunk, summary, mode, dedupe, seen_keys)
+            seq = spool.append(chunk) if spool is not None else None
+            succeeded = summary['success']
+            try:
+                if spool is not None and spool.held:
+                    raise DatabaseUnavailableError('数据库不可用，已暂停写入')
+                self._write_chunk(chunk, summary, mode, rollup_slices)
+            except PoolTimeoutError as e:
+                # 连接池借空时数据库仍可用，不暂停写入；该块未计入成功的行记为失败，由重新导入恢复
+                if spool is not None:
+                    spool.ack(seq)
+                for _ in range(len(chunk) - (summary['success'] - succeeded)):
+                    self._record_error(summary, f"保存失败: {str(e)}")
+                self._report_progress(summary, on_progress)
+                continue
+            except DatabaseUnavailableError as e:
+                if spool is None:
+                    for _ in chunk:
+                        self._record_error(summary, f"保存失败: {str(e)}")
+                else:
+                    if not spool.held:
+                        logging.warning(f"数据库不可用，剩余订单写入暂存文件 {spool.path}: {str(e)}")
+                        spool.hold()
+                    summary['spooled'] = summary.get('spooled', 0) + len(chunk)
+                    summary['spool_file'] = spool.path
+                self._report_progress(summary, on_progress)
+                continue
+            except Exception:
+                # 其他错误使本次导入失败，由重新导入恢复；该块可能已有部分行提交，
+                # 确认该批次使其不再重放，避免重放时重复写入
+                if spool is not None:
+                    spool.ack(seq)
+                raise
+            if spool is not None:
+                spool.ack(seq)
+            if dedupe != self.DedupeMode.OFF:
+                # 写入后再加入过滤器，之后的块中再次出现时数据库里已有这些行，可以确认
+                for order_data in chunk:
+                    seen_keys.add('\x1f'.join(self._get_dedupe_key(order_data)))
+            self._report_progress(summary, on_progress)
+
+    def _write_chunk(self, chunk: List[Dict], summary: Dict, mode: str, rollup_slices: set = None) -> None:
+        """按导入模式写入一块订单，数据库不可用时抛出 DatabaseUnavailableError
+
+        写入前取得共用的写入名额，名额用尽时等待其他导入的写入结束，不占用连接池的等待时间。
+        """
+        with self._get_write_slots():
+            if mode == self.ImportMode.UPSERT:
+                self._upsert_orders(chunk, summary, rollup_slices)
+            else:
+                self._insert_orders(chunk, summary)
+
+    def _create_spool(self, mode: str, source: str) -> Optional[Spool]:
+        """创建本次导入的暂存文件，未配置暂存目录或创建失败时返回 None，导入不使用暂存"""
+        if not self.spool_dir:
+            return None
+        try:
+            return Spool.create(self.spool_dir, {
+                # load_data 回退后按 insert 写入，重放时同样按 insert 写入
+                'mode': self.ImportMode.UPSERT if mode == self.ImportMode.UPSERT else self.ImportMode.INSERT,
+                'source': os.path.basename(source),
+                'created_at': time.time()
+            })
+        except Exception as e:
+            logging.error(f"创建导入暂存文件失败: {str(e)}")
+            return None
+
+    def replay_spool(self) -> tuple:
+        """将暂存文件中未写入数据库的批次按顺序写入数据库
+
+        由后台重放线程定期调用，也可以通过命令 flask mabang replay-spool 手动执行。
+        文件中的批次全部写入后删除文件，并按文件中的全部批次（包括暂存前已写入的）重算利润汇总。
+        正被导入或其他进程重放的文件会被跳过。重放为至少一次语义，insert 模式下
+        写入成功但未来得及确认的批次可能重复写入，使用 upsert 模式导入可避免重复。
+
+        Returns:
+            tuple: (是否成功, {'files': 完成的文件数, 'batches': 重放的批次数,
+                    'total', 'success', 'error', 'error_msgs'}/错误信息)，数据库仍不可用时返回失败
+        """
+        paths = Spool.list(self.spool_dir) if self.spool_dir else []
+        result = {'files': 0, 'batches': 0, **self._new_summary()}
+        if not paths:
+            return True, result
+        if not db.ping():
+            return False, '数据库不可用'
+
+        for path in paths:
+            spool = Spool.open(path)
+            if spool is None:
+                continue
+            mode = spool.meta.get('mode', self.ImportMode.INSERT)
+            summary = self._new_summary(mode)
+            rollup_slices = set()
+            try:
+                for seq, rows, acked in spool.batches():
+                    rollup_slices |= self._get_rollup_slices(rows)
+                    if acked:
+                        continue
+                    summary['total'] += len(rows)
+                    self._write_chunk(rows, summary, mode, rollup_slices)
+                    spool.ack(seq)
+                    result['batches'] += 1
+                spool.remove()
+                result['files'] += 1
+                self._refresh_profit_rollup(rollup_slices)
+            except DatabaseUnavailableError as e:
+                return False, f"数据库不可用，重放中断: {str(e)}"
+            except PoolTimeoutError as e:
+                # 未确认的批次留在暂存文件中，下次重放时继续
+                return False, f"等待数据库连接超时，重放中断: {str(e)}"
+            finally:
+                spool.close()
+                for key in ('total', 'success', 'error'):
+                    result[key] += summary[key]
+                result['error_msgs'].extend(summary['error_msgs'][:self.max_error_msgs - len(result['error_msgs'])])
+        return True, result
+
+    def _new_dedupe_filter(self, mode: str, dedupe: str) -> tuple:
+        """创建本次导入的重复检测布隆过滤器
+
+        过滤器只在一次导入内共用（单个文件、压缩包中的全部文件或目录中的全部文件），只记录本次导入写入的键，
+        不从数据库加载已有订单。因此重复检测只能发现同一次导入内的重复行：分多次上传的文件，
+        与之前导入的订单重复时不会被检测到，需要跨文件检测时应把文件打包或放在同一目录中一次导入。
+
+        Returns:
+            tuple: (是否成功, 布隆过滤器/错误信息)，不检测重复时为 (True, None)
+        """
+        if dedupe not in self.DedupeMode.get_all_modes():
+            return False, f"不支持的重复检测模式: {dedupe}"
+        if dedupe == self.DedupeMode.OFF:
+            return True, None
+        if mode == self.ImportMode.LOAD_DATA:
+            # 载入前数据库中没有本次导入的行，无法确认
+            return False, 'load_data 模式不支持重复检测'
+        return True, BloomFilter(self.dedupe_capacity, self.dedupe_error_rate)
+
+    def _check_duplicates(
+            self,
+            chunk: List[Dict],
+            summary: Dict,
+            mode: str,
+            dedupe: str,
+            seen_keys: BloomFilter
+    ) -> List[Dict]:
+        """检测一块订单中与本次导入已写入的行重复的订单行
+
+        按 订单编号+SKU 判断重复：已存在其他类别的同一订单行即为重复（全托管和半托管导出中的同一订单），
+        insert 模式下同一类别的行也是重复（会写入两行），upsert 模式下同一类别的行按自然键更新，不算重复。
+        布隆过滤器判断为可能重复的行用一次查询向数据库确认，过滤器的误判只会多查，不会误报；
+        同一块内的重复行直接在内存中确认。确认查询失败时只记录日志，整块照常写入。
+
+        并行写入的多个导入源之间，未提交的块对其他写入线程不可见，同时写入的重复行可能漏报。
+
+        Args:
+            chunk: 待写入的订单数据列表
+            summary: 导入结果统计，原地累加 suspected_duplicates/confirmed_duplicates/duplicate_samples
+            mode: 导入模式，见 ImportMode
+            dedupe: 重复检测模式，report 时返回原列表，drop 时返回去除重复行后的列表
+            seen_keys: 本次导入已写入行的布隆过滤器
+
+        Returns:
+            List[Dict]: 需要写入的订单数据列表
+        """
+        keys = [self._get_dedupe_key(order_data) for order_data in chunk]
+        suspects = {key for key in keys if '\x1f'.join(key) in seen_keys}
+        summary['suspected_duplicates'] += sum(1 for key in keys if key in suspects)
+
+        existing = {}
+        if suspects:
+            try:
+                existing = self._get_existing_categories(list(suspects))
+            except Exception as e:
+                logging.error(f"确认重复订单失败: {str(e)}")
+
+        kept = []
+        for order_data, key in zip(chunk, keys):
+            categories = existing.setdefault(key, set())
+            category = order_data.get('category')
+            conflicts = set(categories) if mode == self.ImportMode.INSERT else categories - {category}
+            categories.add(category)
+            if not conflicts:
+                kept.append(order_data)
+                continue
+            summary['confirmed_duplicates'] += 1
+            if len(summary['duplicate_samples']) < self.max_error_msgs:
+                summary['duplicate_samples'].append(
+                    f"{order_data.get('order_id')}/{order_data.get('sku') or ''}: "
+                    f"{category} 与 {', '.join(sorted(str(c) for c in conflicts))} 重复"
+                )
+            if dedupe == self.DedupeMode.REPORT:
+                kept.append(order_data)
+        return kept
+
+    def _get_existing_categories(self, keys: List[tuple]) -> Dict[tuple, set]:
+        """批量查询 订单编号+SKU 已存在的类别
+
+        Args:
+            keys: _get_dedupe_key 返回的键列表
+
+        Returns:
+            Dict[tuple, set]: 键 -> 已存在的类别集合
+        """
+        order_ids = list({key[0] for key in keys})
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        success, results = db.execute_sql(
+            f"SELECT order_id, sku, category FROM {self.table} WHERE order_id IN ({placeholders})",
+            tuple(order_ids)
+        )
+        if not success:
+            raise Exception(results)
+
+        wanted = set(keys)
+        existing = {}
+        for record in results:
+            key = self._get_dedupe_key(record)
+            if key in wanted:
+                existing.setdefault(key, set()).add(record['category'])
+        return existing
+
+    def _get_dedupe_key(self, row: Dict) -> tuple:
+        """获取重复检测的键，与 _get_natural_key 一样统一转换为字符串，缺失的 SKU 与空字符串相同"""
+        return tuple('' if row.get(field) is None else str(row[field]) for field in self.dedupe_key)
+
+    @staticmethod
+    def _report_progress(summary: Dict, on_progress: Callable[[Dict], None] = None) -> None:
+        """按导入结果统计回调进度"""
+        if on_progress:
+            on_progress({
+                'rows_parsed': summary['total'],
+                'rows_written': summary['success'],
+                'errors': summary['error']
+            })
+
+    def _load_orders(
+            self,
+            orders: List[Dict],
+            batch_size: int,
+            summary: Dict,
+            on_progress: Callable[[Dict], None] = None,
+            spool: Spool = None
+    ) -> None:
+        """通过 LOAD DATA 一次写入全部订单，失败时回退到逐块插入，回退时使用 spool 暂存
+
+        付款时间为空的订单行不受唯一索引约束，LOAD DATA 无法发现重复，改为按 insert 模式逐块写入，
+        见 _exclude_null_payment_duplicates。
+        """
+        null_flags = self._get_null_payment_flags(orders)
+        loaded = [order_data for order_data, is_null in zip(orders, null_flags) if not is_null]
+        inserted = [order_data for order_data, is_null in zip(orders, null_flags) if is_null]
+        load_file = self._open_load_file()
+        line_file = self._open_load_file()
+        try:
+            self._write_load_file(load_file, loaded)
+            self._write_load_file(line_file, self._get_sku_lines(loaded), self.sku_line_columns)
+            load_file.close()
+            line_file.close()
+            summary['staged'] += len(loaded)
+            success, result = self._bulk_load(load_file.name, line_file.name, len(loaded), summary)
+        finally:
+            self._remove_load_file(load_file)
+            self._remove_load_file(line_file)
+
+        if success:
+            if inserted:
+                self._save_orders(inserted, batch_size, summary, self.ImportMode.INSERT, on_progress, spool=spool)
+            self._report_progress(summary, on_progress)
+            return
+        logging.warning(f"LOAD DATA 导入失败，回退到 insert 模式: {result}")
+        summary['load_data_fallback'] = result
+        self._save_orders(orders, batch_size, summary, self.ImportMode.INSERT, on_progress, spool=spool)
+
+    def _get_load_columns(self) -> List[str]:
+        """LOAD DATA 临时文件的列顺序"""
+        return ['category'] + list(self.field_mapping.values())
+
+    @staticmethod
+    def _open_load_file():
+        """创建 LOAD DATA 使用的临时 TSV 文件"""
+        return tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', newline='', prefix='mabang_order_', suffix='.tsv', delete=False
+        )
+
+    @staticmethod
+    def _remove_load_file(load_file) -> None:
+        """关闭并删除临时 TSV 文件"""
+        load_file.close()
+        try:
+            os.remove(load_file.name)
+        except OSError:
+            pass
+
+    def _write_load_file(self, load_file, orders: List[Dict], columns: List[str] = None) -> None:
+        """将订单追加写入临时 TSV 文件，格式与 load_data_infile 的约定一致
+
+        Args:
+            load_file: 临时 TSV 文件
+            orders: 订单数据（或其他行数据）列表
+            columns: 写入的列，默认为订单表的 LOAD DATA 列
+        """
+        columns = columns or self._get_load_columns()
+        load_file.writelines(
+            '\t'.join(self._to_load_value(order_data.get(col)) for col in columns) + '\n'
+            for order_data in orders
+        )
+
+    @staticmethod
+    def _to_load_value(value: Any) -> str:
+        """转换为 TSV 字段：NULL 写作 \\N，反斜杠、制表符和换行符转义"""
+        if value is None:
+            return '\\N'
+        return str(value)\
+            .replace('\\', '\\\\')\
+            .replace('\t', '\\t')\
+            .replace('\n', '\\n')\
+            .replace('\r', '\\r')
+
+    def _bulk_load(self, file_path: str, line_file_path: str, rows: int, summary: Dict) -> tuple:
+        """在一个事务中载入订单和 SKU明细 临时 TSV 文件并合并到订单表和明细子表
+
+        订单表中已存在（命中唯一索引）的订单行跳过，不覆盖也不改动其明细，计入 duplicate；
+        新写入的订单行先删除同一订单键已有的明细再插入，与 _write_sku_lines 一致。
+        文件内同一订单行出现多次时以先载入的为准。
+
+        Args:
+            file_path: 订单临时 TSV 文件路径
+            line_file_path: SKU明细 临时 TSV 文件路径
+            rows: 文件中的订单数
+            summary: 导入结果统计，成功时文件中的订单全部计入 success，其中跳过的订单行同时计入 duplicate
+
+        Returns:
+            tuple: (是否成功, 合并到订单表的行数/错误信息)，连接失败等任何错误都返回失败且没有写入任何数据，
+                由调用方回退到 insert
+        """
+        if rows == 0:
+            return True, 0
+        columns = ', '.join(self._get_load_columns())
+        line_columns = ', '.join(self.sku_line_columns)
+        try:
+            with db.load_data_transaction([self.table, self.sku_line_table]) as cursor:
+                stage_table, _ = db.stage_data_infile(cursor, self.table, self._get_load_columns(), file_path)
+                line_stage_table, _ = db.stage_data_infile(
+                    cursor, self.sku_line_table, self.sku_line_columns, line_file_path
+                )
+                # 暂存表中只保留订单表中还不存在的订单行，即本次合并的订单
+                cursor.execute(
+                    f"DELETE s FROM {stage_table} s JOIN {self.table} o "
+                    f"ON o.order_id = s.order_id AND o.sku = s.sku AND o.category = s.category "
+                    f"AND o.payment_time = s.payment_time"
+                )
+                # 剩余的重复只可能来自文件内部
+                merged = cursor.execute(
+                    f"INSERT IGNORE INTO {self.table} ({columns}) SELECT {columns} FROM {stage_table}"
+                )
+                cursor.execute(
+                    f"DELETE l FROM {self.sku_line_table} l JOIN {stage_table} s "
+                    f"ON l.order_id = s.order_id AND l.category = s.category AND l.order_sku = COALESCE(s.sku, '')"
+                )
+                cursor.execute(
+                    f"INSERT IGNORE INTO {self.sku_line_table} ({line_columns}) "
+                    f"SELECT {', '.join('l.' + col for col in self.sku_line_columns)} FROM {line_stage_table} l "
+                    f"JOIN (SELECT DISTINCT order_id, category, COALESCE(sku, '') AS order_sku FROM {stage_table}) s "
+                    f"ON l.order_id = s.order_id AND l.category = s.category AND l.order_sku = s.order_sku"
+                )
+        except Exception as e:
+            return False, str(e)
+        summary['duplicate'] += rows - merged
+        summary['success'] += rows
+        return True, merged
+
+    def rebuild_sku_lines(self, batch_size: int = None) -> tuple:
+        """从订单表的 sku_details 重建 SKU明细 子表，用于回填历史订单
+
+        Returns:
+            tuple: (是否成功, {'orders': 处理的订单行数, 'errors': 失败的块数}/错误信息)
+        """
+        batch_size = batch_size or self.batch_size
+        summary = self._new_summary()
+        processed = 0
+        try:
+            chunk = []
+            for order_data in db.stream_sql(
+                    f"SELECT order_id, category, sku, sku_details FROM {self.table} "
+                    f"WHERE sku_details IS NOT NULL AND category IS NOT NULL",
+                    fetch_size=batch_size
+            ):
+                chunk.append(order_data)
+                if len(chunk) >= batch_size:
+                    self._save_sku_lines(chunk, summary)
+                    processed += len(chunk)
+                    chunk = []
+            self._save_sku_lines(chunk, summary)
+            processed += len(chunk)
+        except Exception as e:
+            return False, f'重建SKU明细失败: {str(e)}'
+        if summary['error_msgs']:
+            logging.error(f"重建SKU明细部分失败: {summary['error_msgs']}")
+        return True, {'orders': processed, 'errors': summary['error']}
+
+    def _get_sku_lines(self, orders: List[Dict]) -> List[Dict]:
+        """将订单的 sku_details 解析为 SKU明细 子表行
+
+        同一批订单中相同的 SKU明细 只解析一次。
+        """
+        lines = []
+        cache = {}
+        for order_data in orders:
+            details = order_data.get('sku_details')
+            if not details:
+                continue
+            items = cache.get(details)
+            if items is None:
+                items = cache[details] = self._parse_sku_details(details)
+            order_sku = order_data.get('sku') or ''
+            for line_no, (sku, quantity) in enumerate(items, 1):
+                lines.append({
+                    'order_id': order_data['order_id'],
+                    'category': order_data['category'],
+                    'order_sku': order_sku,
+                    'line_no': line_no,
+                    'sku': sku,
+                    'quantity': quantity
+                })
+        return lines
+
+    def _parse_sku_details(self, details: str) -> List[Tuple[str, int]]:
+        """解析 SKU明细 字符串
+
+        多个 SKU 以分号、逗号或换行分隔，每项为 SKU 加可选数量，见 self.sku_item_patterns。
+
+        Returns:
+            List[Tuple[str, int]]: (SKU, 数量) 列表
+        """
+        items = []
+        for item in re.split(r'[;；,，\n]+', details):
+            item = item.strip()
+            if not item:
+                continue
+            for pattern in self.sku_item_patterns:
+                match = pattern.match(item)
+                if match:
+                    items.append((match.group('sku').strip(), int(match.group('quantity'))))
+                    break
+            else:
+                items.append((item, 1))
+        return items
+
+    def _save_sku_lines(self, orders: List[Dict], summary: Dict) -> None:
+        """在一个事务中替换一块订单的 SKU明细 子表行，用于只重建明细、不写订单的场景"""
+        if not orders:
+            return
+        try:
+            with db.transaction() as cursor:
+                self._write_sku_lines(cursor, orders)
+        except Exception as e:
+            self._record_error(summary, f"写入SKU明细失败: {str(e)}")
+
+    def _write_sku_lines(self, cursor, orders: List[Dict]) -> None:
+        """在调用方的事务中替换一块订单的 SKU明细 子表行，出错时抛出异常
+
+        先删除这些订单行已有的明细再插入，重复导入或明细变化时结果与最新的 sku_details 一致。
+        同一块内重复的订单行只保留最后一条。
+        """
+        if not orders:
+            return
+        latest = {
+            (order_data['order_id'], order_data['category'], order_data.get('sku') or ''): order_data
+            for order_data in orders
+        }
+        keys = list(latest)
+        lines = self._get_sku_lines(list(latest.values()))
+        columns = ', '.join(self.sku_line_columns)
+        placeholders = ', '.join(['%s'] * len(self.sku_line_columns))
+        cursor.execute(
+            f"DELETE FROM {self.sku_line_table} WHERE (order_id, category, order_sku) IN "
+            f"({', '.join(['(%s, %s, %s)'] * len(keys))})",
+            tuple(value for key in keys for value in key)
+        )
+        if lines:
+            cursor.executemany(
+                f"INSERT INTO {self.sku_line_table} ({columns}) VALUES ({placeholders})",
+                [tuple(line[col] for col in self.sku_line_columns) for line in lines]
+            )
+
+    def _insert_orders(self, chunk: List[Dict], summary: Dict) -> None:
+        """在一个事务中插入一块订单及其 SKU明细，失败时逐行重试
+
+        订单和明细一起提交或一起回滚，不会出现订单已写入而明细缺失的情况。
+        付款时间为空的订单行不受唯一索引约束，写入前在同一事务中排除重复行，见 _exclude_null_payment_duplicates。
+        """
+        try:
+            with db.transaction() as cursor:
+                rows, duplicates = self._exclude_null_payment_duplicates(cursor, chunk)
+                db.batch_create(self.table, rows, cursor=cursor)
+                self._write_sku_lines(cursor, rows)
+            summary['success'] += len(rows)
+            self._record_null_payment_duplicates(summary, duplicates)
+            return
+        except PoolTimeoutError:
+            # 连接池借空不是数据库不可用，逐行重试同样要等待连接，交由调用方处理
+            raise
+        except Exception as e:
+            # 数据库不可用时逐行重试只会得到同样的失败
+            if not db.ping():
+                raise DatabaseUnavailableError(f'批量写入失败且数据库无法连接: {str(e)}')
+
+        # 整块已回滚，逐行重试以定位失败的订单
+        for order_data in chunk:
+            try:
+                with db.transaction() as cursor:
+                    rows, duplicates = self._exclude_null_payment_duplicates(cursor, [order_data])
+                    db.batch_create(self.table, rows, cursor=cursor)
+                    self._write_sku_lines(cursor, rows)
+                summary['success'] += len(rows)
+                self._record_null_payment_duplicates(summary, duplicates)
+            except Exception as e:
+                self._record_error(summary, f"保存失败: {order_data.get('order_id')}: {str(e)}")
+
+    def _exclude_null_payment_duplicates(self, cursor, rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """在调用方的事务中排除付款时间为空、且自然键已存在的订单行
+
+        分区表的唯一索引包含 payment_time，NULL 互不相等，付款时间为空的行写入时不会触发唯一索引冲突。
+        用 SELECT ... FOR UPDATE 查询已有的行，同时锁住索引间隙，并发写入同一订单行的事务会等待本事务提交；
+        与已有行或本块中之前的行自然键相同的行视为重复，与唯一索引冲突一样不写入。
+
+        Returns:
+            Tuple[List[Dict], List[Dict]]: (需要写入的行, 重复的行)
+        """
+        null_flags = self._get_null_payment_flags(rows)
+        order_ids = sorted({row['order_id'] for row, is_null in zip(rows, null_flags) if is_null})
+        if not order_ids:
+            return rows, []
+        cursor.execute(
+            f"SELECT {', '.join(self.natural_key)} FROM {self.table} "
+            f"WHERE order_id IN ({', '.join(['%s'] * len(order_ids))}) AND payment_time IS NULL FOR UPDATE",
+            tuple(order_ids)
+        )
+        seen = {self._get_natural_key(record) for record in cursor.fetchall()}
+        kept, duplicates = [], []
+        for row, is_null in zip(rows, null_flags):
+            if not is_null:
+                kept.append(row)
+                continue
+            key = self._get_natural_key(row)
+            if key in seen:
+                duplicates.append(row)
+            else:
+                seen.add(key)
+                kept.append(row)
+        return kept, duplicates
+
+    def _record_null_payment_duplicates(self, summary: Dict, duplicates: List[Dict]) -> None:
+        for order_data in duplicates:
+            self._record_error(summary, f"保存失败: {order_data.get('order_id')}: 已存在付款时间为空的相同订单行")
+
+    def _get_null_payment_flags(self, rows: List[Dict]) -> List[bool]:
+        """订单行的付款时间是否为空（写入数据库后为 NULL）"""
+        times = self._parse_payment_times(pd.Series([row.get('payment_time') for row in rows], dtype=object))
+        return [bool(pd.isna(payment_time)) for payment_time in times]
+
+    def _upsert_orders(self, chunk: List[Dict], summary: Dict, rollup_slices: set = None) -> None:
+        """按自然键插入或更新一块订单
+
+        先用一次查询取出已存在订单行的内容指纹，内容未变化的行直接跳过，
+        其余行通过 INSERT ... ON DUPLICATE KEY UPDATE 一次写入，
+        与付款时间变化的旧行删除及 SKU明细 在同一事务中提交。
+        同一块内重复的订单行只保留最后一条。
+
+        Args:
+            chunk: 已处理的订单数据列表
+            summary: 导入结果统计，原地累加 inserted/updated/unchanged/duplicate
+            rollup_slices: 利润汇总切片集合，原地加入被更新的订单行原来所在的切片
+                （付款时间或店铺变化后，旧切片也需要重算）
+        """
+        latest = {}
+        for order_data in chunk:
+            row = dict(order_data)
+            # 唯一索引中 NULL 互不相等，缺失的 SKU 存为空字符串
+            if row.get('sku') is None:
+                row['sku'] = ''
+            row['row_hash'] = self._get_row_hash(row)
+            latest[self._get_natural_key(row)] = row
+
+        existing, query_error = None, None
+        try:
+            existing = self._get_existing_row_hashes(list(latest))
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            # 数据库不可用时整块交由调用方暂存，不计入任何统计
+            if not db.ping():
+                raise DatabaseUnavailableError(f"查询已存在订单失败且数据库无法连接: {str(e)}")
+            query_error = str(e)
+
+        duplicate_count = len(chunk) - len(latest)
+        summary['duplicate'] += duplicate_count
+        summary['success'] += duplicate_count
+        if query_error is not None:
+            for _ in latest:
+                self._record_error(summary, f"查询已存在订单失败: {query_error}")
+            return
+
+        inserts, updates, moved = [], [], []
+        for key, row in latest.items():
+            if key not in existing:
+                inserts.append(row)
+            elif existing[key]['row_hash'] != row['row_hash']:
+                updates.append(row)
+                if rollup_slices is not None:
+                    rollup_slices |= self._get_rollup_slices([{**existing[key], 'category': row['category']}])
+                # 订单表按付款时间分区，唯一索引包含付款时间，付款时间变化的行需先删除旧行
+                if not self._same_payment_time(existing[key]['payment_time'], row.get('payment_time')):
+                    moved.append(key)
+            else:
+                summary['unchanged'] += 1
+                summary['success'] += 1
+
+        pending = inserts + updates
+        if not pending:
+            return
+        update_columns = [col for col in pending[0] if col not in self.natural_key]
+        try:
+            self._write_upserts(pending, moved, update_columns)
+            summary['inserted'] += len(inserts)
+            summary['updated'] += len(updates)
+            summary['success'] += len(inserts) + len(updates)
+            return
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            if not db.ping():
+                raise DatabaseUnavailableError(f'批量写入失败且数据库无法连接: {str(e)}')
+
+        # 整块已回滚，逐行重试以定位失败的订单
+        moved_keys = set(moved)
+        for counter, rows in (('inserted', inserts), ('updated', updates)):
+            for row in rows:
+                key = self._get_natural_key(row)
+                try:
+                    self._write_upserts([row], [key] if key in moved_keys else [], update_columns)
+                    summary[counter] += 1
+                    summary['success'] += 1
+                except Exception as e:
+                    self._record_error(summary, f"保存失败: {row.get('order_id')}: {str(e)}")
+
+    def _write_upserts(self, rows: List[Dict], moved: List[tuple], update_columns: List[str]) -> None:
+        """在一个事务中删除付款时间变化的旧行、写入订单行并替换其 SKU明细，出错时整体回滚并抛出异常
+
+        付款时间为空的行不受唯一索引约束，ON DUPLICATE KEY UPDATE 不会命中已有的行，
+        因此先删除自然键相同且付款时间为空的旧行再写入。
+        """
+        null_keys = [
+            self._get_natural_key(row) for row, is_null in zip(rows, self._get_null_payment_flags(rows)) if is_null
+        ]
+        with db.transaction() as cursor:
+            if moved:
+                self._delete_order_rows(cursor, moved)
+            if null_keys:
+                self._delete_order_rows(cursor, null_keys, null_payment_only=True)
+            db.batch_upsert(self.table, rows, update_columns=update_columns, cursor=cursor)
+            self._write_sku_lines(cursor, rows)
+
+    def _get_existing_row_hashes(self, keys: List[tuple]) -> Dict[tuple, Dict]:
+        """批量查询已存在订单行的内容指纹、付款时间和店铺
+
+        Args:
+            keys: 自然键列表
+
+        Returns:
+            Dict[tuple, Dict]: 自然键 -> {'row_hash', 'payment_time', 'store'}
+        """
+        order_ids = list({key[0] for key in keys})
+        if not order_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        success, results = db.execute_sql(
+            f"SELECT {', '.join(self.natural_key)}, row_hash, payment_time, store FROM {self.table} "
+            f"WHERE order_id IN ({placeholders})",
+            tuple(order_ids)
+        )
+        if not success:
+            raise Exception(results)
+
+        wanted = set(keys)
+        existing = {}
+        for record in results:
+            key = self._get_natural_key(record)
+            if key in wanted:
+                existing[key] = {
+                    'row_hash': record['row_hash'], 'payment_time': record['payment_time'], 'store': record['store']
+                }
+        return existing
+
+    def _delete_order_rows(self, cursor, keys: List[tuple], null_payment_only: bool = False) -> None:
+        """在调用方的事务中按自然键删除订单行，null_payment_only 时只删除付款时间为空的行"""
+        conditions = ' OR '.join(
+            '(' + ' AND '.join(f"{field} = %s" for field in self.natural_key) + ')' for _ in keys
+        )
+        if null_payment_only:
+            conditions = f"({conditions}) AND payment_time IS NULL"
+        params = tuple(value for key in keys for value in key)
+        cursor.execute(f"DELETE FROM {self.table} WHERE {conditions}", params)
+
+    def _same_payment_time(self, stored: Any, value: Any) -> bool:
+        """比较数据库中的付款时间与导入值是否相同，均为空或均无法解析时视为相同"""
+        stored, value = self._parse_payment_times(pd.Series([stored, value], dtype=object))
+        if pd.isna(stored) or pd.isna(value):
+            return pd.isna(stored) and pd.isna(value)
+        return stored == value
+
+    def _get_natural_key(self, row: Dict) -> tuple:
+        """获取订单行的自然键，统一转换为字符串以便与数据库中的值比较"""
+        return tuple('' if row.get(field) is None else str(row[field]) for field in self.natural_key)
+
+    def _get_row_hash(self, row: Dict) -> str:
+        """计算订单行的内容指纹（类别与全部映射字段）"""
+        fields = ['category'] + list(self.field_mapping.values())
+        payload = '\x1f'.join('\\N' if row.get(field) is None else str(row[field]) for field in fields)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+    def _record_error(self, summary: Dict, msg: str) -> None:
+        """记录一条导入错误，只保留前 max_error_msgs 条错误信息"""
+        summary['error'] += 1
+        if len(summary['error_msgs']) < self.max_error_msgs:
+            summary['error_msgs'].append(msg)
+
     @staticmethod
     def _get_decimal(value: Any) -> Optional[Decimal]:
         """转换为Decimal"""
@@ -296,3 +2371,66 @@ class MabangOrderService:
             return Decimal(str(rate)) / Decimal('100')
         except:
             return None
+
+
+def _convert_order_file(
+        file_path: str,
+        sheets: List[Tuple[Optional[str], str]],
+        member: str = None,
+        member_max_bytes: int = None
+) -> List[Any]:
+    """在子进程中读取并转换单个订单文件的一个或多个工作表，不访问数据库
+
+    文件只打开一次（zip 中的文件只解压一次），各工作表依次从同一个工作簿读取，
+    多工作表文件的解压和共享字符串表解析不随工作表数重复。
+
+    Args:
+        file_path: Excel 或 zip 文件路径
+        sheets: (工作表名, 订单类别) 列表，工作表名为空时读取第一个工作表
+        member: zip 中的文件名，指定时将该文件读入内存后解析，不解压到磁盘
+        member_max_bytes: zip 中文件解压后的大小上限，默认使用 bundle_member_max_bytes
+
+    Returns:
+        List[Any]: 与 sheets 一一对应，成功时为 (工作表总行数, 缺少的映射列, 处理后的订单数据列表)，
+            读取失败时为异常，不影响其他工作表
+
+    Raises:
+        Exception: 文件本身无法打开，所有工作表都读取失败
+    """
+    service = MabangOrderService()
+    source = file_path
+    if member is not None:
+        member_max_bytes = member_max_bytes or service.bundle_member_max_bytes
+        with zipfile.ZipFile(file_path) as bundle:
+            info = bundle.getinfo(member)
+            if info.file_size > member_max_bytes:
+                raise ValueError(f"{member} 解压后超过上限 {member_max_bytes // 1024 // 1024}MB")
+            content = io.BytesIO(bundle.read(info))
+        # xlsx 由已打开的工作簿读取，source 只用于按扩展名选择读取方式
+        source = member if member.lower().endswith('.xlsx') else content
+    else:
+        content = file_path
+    workbook = None
+    if service._is_xlsx(source):
+        workbook = service._open_workbook(content)
+    else:
+        # xls 同样只解析一次，各工作表从同一个 ExcelFile 读取
+        source = pd.ExcelFile(content)
+    results = []
+    try:
+        for sheet_name, category in sheets:
+            try:
+                header = service._read_excel_header(source, workbook, sheet_name)
+                missing_columns = service._get_missing_columns(header)
+                if '订单编号' in missing_columns:
+                    raise ValueError(f"缺少必需列: 订单编号，文件中共缺少以下列: {', '.join(missing_columns)}")
+                df = service._read_excel(source, header, workbook, sheet_name)
+                results.append((len(df), missing_columns, service._process_dataframe(df, category)))
+            except Exception as e:
+                results.append(e)
+    finally:
+        if workbook is not None:
+            workbook.close()
+        else:
+            source.close()
+    return results
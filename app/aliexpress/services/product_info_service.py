@@ -63,6 +63,7 @@ class ProductService:
                 .order_by('created_at', desc=True)\
                 .limit(page_size)\
                 .offset((page - 1) * page_size)\
+                .cached()\
                 .execute()
                 
             return success, results
@@ -0,0 +1,74 @@
+from flask import Blueprint, request
+
+from app.common.utils.response_helper import ResponseHelper
+from app.core.services.db import db
+from app.core.services.sql_cache import sql_templates
+
+database_bp = Blueprint('database', __name__)
+
+
+@database_bp.route('/pool/metrics', methods=['GET'])
+def get_pool_metrics():
+    """查询数据库连接池指标
+
+    用于按真实负载调整 SQLALCHEMY_POOL_SIZE：in_use 长期接近 pool_size、wait_ms 的高区间计数
+    持续增长或出现 timeouts 时说明连接池偏小；created 持续增长说明空闲连接被频繁关闭重建。
+
+    Returns:
+        Response: JSON响应
+            成功: {'code': 200, 'data': {'pool_size', 'pool_timeout', 'in_use', 'idle', 'peak_in_use',
+                   'checkouts', 'timeouts', 'created', 'wait_ms': {'count', 'sum', 'max', 'buckets'}}}
+    """
+    return ResponseHelper.success(msg='获取连接池指标成功', data=db.get_pool_metrics())
+
+
+@database_bp.route('/sql-cache/metrics', methods=['GET'])
+def get_sql_cache_metrics():
+    """查询 SQL 模板缓存指标
+
+    hit_rate 偏低且 size 接近 maxsize 时说明查询形状过多（如条件列随请求变化），缓存在频繁淘汰。
+
+    Returns:
+        Response: JSON响应
+            成功: {'code': 200, 'data': {'size', 'maxsize', 'hits', 'misses', 'hit_rate'}}
+    """
+    return ResponseHelper.success(msg='获取SQL模板缓存指标成功', data=sql_templates.snapshot())
+
+
+@database_bp.route('/result-cache/metrics', methods=['GET'])
+def get_result_cache_metrics():
+    """查询结果缓存指标
+
+    Returns:
+        Response: JSON响应
+            成功: {'code': 200, 'data': {'enabled', 'backend', 'ttl', 'hits', 'misses', 'hit_rate', 'invalidations',
+                   进程内缓存另有 'size', 'maxsize', 'evictions'}}
+    """
+    if db.result_cache is None:
+        return ResponseHelper.success(msg='查询结果缓存未启用', data={'enabled': False})
+    return ResponseHelper.success(msg='获取查询结果缓存指标成功', data={'enabled': True, **db.result_cache.snapshot()})
+
+
+@database_bp.route('/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """查询语句耗时报告
+
+    Args:
+        top: 按总耗时返回的语句指纹数，默认 20
+
+    Returns:
+        Response: JSON响应
+            成功: {'code': 200, 'data': {'enabled', 'threshold_ms',
+                   'top': [{'fingerprint', 'count', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'slow_count', 'sample', 'explain'}],
+                   'recent': [{'recorded_at', 'fingerprint', 'elapsed_ms', 'param_count', 'rows', 'wait_ms', 'sql', 'explain'}]}}
+    """
+    slow_query_log = db.slow_query_log
+    if slow_query_log is None:
+        return ResponseHelper.success(msg='语句耗时统计未启用', data={'enabled': False})
+    top = request.args.get('top', 20, type=int)
+    return ResponseHelper.success(msg='获取语句耗时报告成功', data={
+        'enabled': True,
+        'threshold_ms': slow_query_log.threshold_ms,
+        'top': slow_query_log.report(top),
+        'recent': slow_query_log.recent()
+    })
@@ -0,0 +1,71 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """布隆过滤器
+
+    以固定大小的位数组记录键的集合，内存占用只与 capacity 和 error_rate 有关：
+    判断为不存在的键一定没有加入过；判断为存在的键可能是误判，需要调用方另行确认。
+    加入的键超过 capacity 后误判率上升，但不会漏判。线程安全。
+
+    Args:
+        capacity: 预计加入的键数量
+        error_rate: 加入 capacity 个键时的误判率
+
+    Usage:
+        seen = BloomFilter(1000000)
+        if key in seen:
+            ...  # 可能重复，需要确认
+        seen.add(key)
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity <= 0:
+            raise ValueError('capacity 必须大于 0')
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate 必须在 0 和 1 之间')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.bit_count + 7) // 8)
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        """位数组占用的字节数"""
+        return len(self._bits)
+
+    def add(self, key: str) -> bool:
+        """加入一个键
+
+        Returns:
+            bool: 加入前是否可能已存在
+        """
+        positions = self._get_positions(key)
+        with self._lock:
+            existed = all(self._bits[position >> 3] & (1 << (position & 7)) for position in positions)
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            if not existed:
+                self.count += 1
+        return existed
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._get_positions(key)
+        with self._lock:
+            return all(self._bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+    def __len__(self) -> int:
+        """已加入的不同键数量（近似值，误判为已存在的键不计入）"""
+        return self.count
+
+    def _get_positions(self, key: str) -> list:
+        # 双重哈希：由一次 128 位摘要派生 hash_count 个位置
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
@@ -1,28 +1,43 @@
+import functools
 import logging
-from contextlib import contextmanager
-from typing import Optional, List, Any
+import threading
+import time
+from contextlib import contextmanager, suppress
+from typing import Optional, List, Any, Iterator, Union
 
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSCursor, SSDictCursor
 from dbutils.pooled_db import PooledDB
 
 from app.config.mysql_config import MYSQL_CONFIG
+from app.core.services.metrics import Histogram
+from app.core.services.slow_query_log import SlowQueryLog
+from app.core.services.result_cache import (
+    ResultCache, MemoryResultCache, RedisResultCache, get_read_tables, get_written_tables
+)
+from app.core.services.sql_cache import sql_templates
 
 
 class QueryBuilder:
-    """SQL 查询构建器"""
+    """SQL 查询构建器
+    
+    各子句按查询形状记录（条件只记录列名和运算符），build 时以形状为键从 sql_templates 取编译好的 SQL，
+    每次调用只重新组装参数元组。LIMIT/OFFSET 以参数传入，不同分页共用同一个模板。
+    """
     
     def __init__(self, db_manager):
         self.db_manager = db_manager  # 保存 DatabaseManager 实例
         self.table = None
         self.select_columns = ['*']
-        self.where_conditions = []
+        self.where_conditions = []  # (列名, 运算符)，原始条件为 (条件表达式, 'RAW')
         self.where_values = []
         self.order_by_columns = []
         self.group_by_columns = []
         self.limit_count = None
         self.offset_count = None
         self.join_clauses = []
+        self.use_cache = False
+        self.cache_ttl = None
         
     def select(self, *columns) -> 'QueryBuilder':
         """选择要查询的列"""
@@ -38,20 +53,35 @@ class QueryBuilder:
     def where(self, **conditions) -> 'QueryBuilder':
         """添加 WHERE 条件"""
         for column, value in conditions.items():
-            if isinstance(value, tuple) and len(value) == 2:
+            if isinstance(value, tuple) and len(value) == 3 and value[2].upper() == 'BETWEEN':
+                # 处理区间条件，如 (start, end, 'BETWEEN')
+                self.where_conditions.append((column, 'BETWEEN'))
+                self.where_values.extend(value[:2])
+            elif isinstance(value, tuple) and len(value) == 2:
                 # 处理特殊操作符，如 LIKE, >, <
                 operator = value[1].upper()
                 if operator == 'LIKE':
-                    self.where_conditions.append(f"{column} LIKE %s")
                     self.where_values.append(f"%{value[0]}%")
                 else:
-                    self.where_conditions.append(f"{column} {operator} %s")
                     self.where_values.append(value[0])
+                self.where_conditions.append((column, operator))
             else:
-                self.where_conditions.append(f"{column} = %s")
+                self.where_conditions.append((column, '='))
                 self.where_values.append(value)
         return self
     
+    def where_raw(self, condition: str, *values) -> 'QueryBuilder':
+        """
+        添加原始 WHERE 条件，用于 OR、行比较等 where 无法表达的条件
+        
+        Args:
+            condition: 条件表达式，参数使用 %s 占位
+            values: 占位符对应的参数
+        """
+        self.where_conditions.append((condition, 'RAW'))
+        self.where_values.extend(values)
+        return self
+    
     def order_by(self, column: str, desc: bool = False) -> 'QueryBuilder':
         """添加排序条件"""
         self.order_by_columns.append(f"{column} {'DESC' if desc else 'ASC'}")
@@ -64,8 +94,8 @@ class QueryBuilder:
     
     def limit(self, count: int, offset: int = None) -> 'QueryBuilder':
         """添加限制条件"""
-        self.limit_count = count
-        self.offset_count = offset
+        self.limit_count = int(count)
+        self.offset_count = None if offset is None else int(offset)
         return self
     
     def join(self, table: str, on: dict, join_type: str = 'INNER') -> 'QueryBuilder':
@@ -87,14 +117,30 @@ class QueryBuilder:
         Returns:
             QueryBuilder: 查询构建器实例，支持链式调用
         """
-        self.offset_count = offset_value
+        self.offset_count = int(offset_value)
         return self
     
     def build(self) -> tuple:
         """构建 SQL 语句"""
         if not self.table:
             raise ValueError("No table specified")
-            
+
+        has_limit = self.limit_count is not None
+        has_offset = has_limit and self.offset_count is not None
+        key = (
+            'select', self.table, tuple(self.select_columns), tuple(self.join_clauses),
+            tuple(self.where_conditions), tuple(self.group_by_columns), tuple(self.order_by_columns),
+            has_limit, has_offset
+        )
+        sql = sql_templates.get(key, lambda: self._compile(has_limit, has_offset))
+
+        params = tuple(self.where_values)
+        if has_limit:
+            params += (self.limit_count, self.offset_count) if has_offset else (self.limit_count,)
+        return sql, params
+
+    def _compile(self, has_limit: bool, has_offset: bool) -> str:
+        """按当前查询形状生成 SQL 模板"""
         sql_parts = [
             f"SELECT {', '.join(self.select_columns)}",
             f"FROM {self.table}"
@@ -106,7 +152,9 @@ class QueryBuilder:
         
         # 添加 WHERE 子句
         if self.where_conditions:
-            sql_parts.append("WHERE " + " AND ".join(self.where_conditions))
+            sql_parts.append("WHERE " + " AND ".join(
+                self._compile_condition(column, operator) for column, operator in self.where_conditions
+            ))
         
         # 添加 GROUP BY 子句
         if self.group_by_columns:
@@ -117,12 +165,46 @@ class QueryBuilder:
             sql_parts.append("ORDER BY " + ", ".join(self.order_by_columns))
         
         # 添加 LIMIT 和 OFFSET
-        if self.limit_count is not None:
-            sql_parts.append(f"LIMIT {self.limit_count}")
-            if self.offset_count is not None:
-                sql_parts.append(f"OFFSET {self.offset_count}")
+        if has_limit:
+            sql_parts.append("LIMIT %s")
+            if has_offset:
+                sql_parts.append("OFFSET %s")
+        
+        return " ".join(sql_parts)
+
+    @staticmethod
+    def _compile_condition(column: str, operator: str) -> str:
+        if operator == 'RAW':
+            return f"({column})"
+        if operator == 'BETWEEN':
+            return f"{column} BETWEEN %s AND %s"
+        return f"{column} {operator} %s"
+
+    def stream(self, batch_size: int = 1000, batches: bool = False) -> Iterator[Union[dict, List[dict]]]:
+        """
+        以服务端游标流式执行构建的查询，见 DatabaseManager.iter_query
+        
+        Args:
+            batch_size: 每次从服务端读取的行数
+            batches: 为 True 时每次产出一批，否则逐行产出
+            
+        Usage:
+            for rows in db.query().from_table('orders').where(store='store_1').stream(batches=True):
+                ...
+        """
+        sql, params = self.build()
+        return self.db_manager.iter_query(sql, params, batch_size, batches)
+
+    def cached(self, ttl: float = None) -> 'QueryBuilder':
+        """
+        查询结果使用 DatabaseManager 的结果缓存，未启用结果缓存时不生效
         
-        return " ".join(sql_parts), tuple(self.where_values)
+        Args:
+            ttl: 缓存有效期（秒），默认使用结果缓存的 ttl
+        """
+        self.use_cache = True
+        self.cache_ttl = ttl
+        return self
 
     def execute(self) -> tuple:
         """
@@ -133,16 +215,154 @@ class QueryBuilder:
         """
         try:
             sql, params = self.build()
+            if self.use_cache:
+                return self.db_manager.execute_sql(sql, params, cache=True, ttl=self.cache_ttl)
             return self.db_manager.execute_sql(sql, params)
         except Exception as e:
             return False, str(e)
 
 
+class DatabaseUnavailableError(Exception):
+    """数据库不可用（连接失败或连接中断），区别于单条数据导致的写入失败"""
+
+
+class PoolTimeoutError(Exception):
+    """等待连接池空闲连接超时"""
+
+
+class _PooledConnection:
+    """连接池借出的连接，关闭时归还连接并释放占用的名额，重复关闭无副作用
+
+    Args:
+        connection: DBUtils 借出的连接
+        release: 归还后释放名额的回调
+        wait_ms: 取连接的等待时间（毫秒）
+        wrap_cursor: 包装游标以记录语句耗时的函数，接收 (游标, 等待时间, 连接)，为空时直接返回原游标
+    """
+
+    def __init__(self, connection, release, wait_ms: float = None, wrap_cursor=None):
+        self._connection = connection
+        self._release = release
+        self.wait_ms = wait_ms
+        self._wrap_cursor = wrap_cursor
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._connection.cursor(*args, **kwargs)
+        # 服务端游标的结果在 execute 之后才读取，由 iter_query 记录整个读取过程的耗时
+        cursor_class = args[0] if args else kwargs.get('cursor')
+        if self._wrap_cursor is None or (cursor_class is not None and issubclass(cursor_class, SSCursor)):
+            return cursor
+        return self._wrap_cursor(cursor, self.wait_ms, self._connection)
+
+    def close(self) -> None:
+        if self._release is not None:
+            release, self._release = self._release, None
+            try:
+                self._connection.close()
+            finally:
+                release()
+
+    def discard(self) -> None:
+        """断开底层物理连接后归还
+
+        服务端游标未读完时，归还前回滚会先读完剩余结果；断开连接可以跳过这一步，
+        连接池下次取出该连接时 ping 失败会重新连接。
+        """
+        steady = getattr(self._connection, '_con', None)
+        close_steady = getattr(steady, '_close', None)
+        if close_steady is not None:
+            close_steady()
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __del__(self):
+        # 忘记关闭的连接在回收时归还，避免名额泄漏
+        self.close()
+
+
+class _TimedCursor:
+    """记录每条语句的耗时和返回/影响行数"""
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        rows = None
+        try:
+            rows = self._cursor.execute(query, args)
+            return rows
+        finally:
+            self._record(query, args, time.perf_counter() - started, rows)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        rows = None
+        try:
+            rows = self._cursor.executemany(query, args)
+            return rows
+        finally:
+            self._record(query, args, time.perf_counter() - started, rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _WriteTrackingCursor:
+    """记录事务中执行过的语句，提交后据此使结果缓存失效"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = set()
+
+    def execute(self, query, args=None):
+        self.statements.add(query)
+        return self._cursor.execute(query, args)
+
+    def executemany(self, query, args):
+        self.statements.add(query)
+        return self._cursor.executemany(query, args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
 class DatabaseManager:
-    """数据库管理器类，提供 MySQL 数据库操作的封装"""
+    """数据库管理器类，提供 MySQL 数据库操作的封装
+    
+    连接池在第一次取连接时创建，大小和等待超时取自 Flask 配置的 SQLALCHEMY_POOL_SIZE、
+    SQLALCHEMY_POOL_TIMEOUT（见 init_app），未配置时使用默认值。
+    
+    每条语句的耗时交给 slow_query_log（默认开启，阈值见 SLOW_QUERY_THRESHOLD_MS），按指纹汇总并记录慢查询。
+    
+    查询结果缓存默认不启用，由 DB_RESULT_CACHE_TYPE 配置启用后，read(cache=True)、
+    execute_sql(cache=True) 和 QueryBuilder.cached() 的查询结果按 SQL 和参数缓存；
+    通过本类执行的写入（create/update/delete/batch_*/load_data_infile/load_data_transaction/execute_sql(fetch=False)/transaction）
+    提交后按表使缓存失效。绕过本类直接写库的改动要等缓存过期后才可见。
+    """
     
     _instance = None
     _pool = None
+
+    # 连接池默认配置
+    default_pool_size = 10
+    default_pool_timeout = 30
+    # ping 连接和读写的超时（秒）
+    ping_timeout = 5
+    # 取连接等待时间直方图的区间上界（毫秒）
+    wait_buckets_ms = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
     
     def __new__(cls, *args, **kwargs):
         """单例模式"""
@@ -151,25 +371,246 @@ class DatabaseManager:
         return cls._instance
     
     def __init__(self, config: dict = None):
-        """初始化连接池"""
-        if DatabaseManager._pool is None:
-            self.config = config if config is not None else MYSQL_CONFIG
-            DatabaseManager._pool = PooledDB(
-                creator=pymysql,
-                maxconnections=10,  # 最大连接数
-                mincached=2,        # 初始连接数
-                maxcached=5,        # 最大空闲连接数
-                maxshared=3,        # 最大共享连接数
-                blocking=True,      # 连接池满时是否阻塞
-                maxusage=None,      # 单个连接最大复用次数
-                setsession=[],      # 开始会话前执行的命令
-                cursorclass=DictCursor,
-                **self.config
+        """记录连接配置，连接池延迟到第一次取连接时创建"""
+        if getattr(self, '_initialized', False):
+            return
+        self._initialized = True
+        self.config = config if config is not None else MYSQL_CONFIG
+        self.pool_size = self.default_pool_size
+        self.pool_timeout = self.default_pool_timeout
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._slots = None
+        self._reset_pool_stats()
+        self.result_cache = None
+        self.slow_query_log = SlowQueryLog()
+
+    def init_app(self, app) -> None:
+        """按 Flask 配置设置连接池和查询结果缓存，已创建的连接池会关闭并按新配置重建
+
+        Args:
+            app: Flask 应用，读取 SQLALCHEMY_POOL_SIZE（最大连接数）、SQLALCHEMY_POOL_TIMEOUT（秒）
+                SLOW_QUERY_*、DB_RESULT_CACHE_*（见 global_config.base_config.BaseConfig）
+        """
+        self.configure_pool(
+            app.config.get('SQLALCHEMY_POOL_SIZE', self.default_pool_size),
+            app.config.get('SQLALCHEMY_POOL_TIMEOUT', self.default_pool_timeout)
+        )
+
+        threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', self.slow_query_log.threshold_ms)
+        if threshold_ms is None:
+            self.slow_query_log = None
+        else:
+            self.slow_query_log = SlowQueryLog(
+                threshold_ms, app.config.get('SLOW_QUERY_EXPLAIN_INTERVAL', self.slow_query_log.explain_interval)
             )
-    
+
+        cache_type = app.config.get('DB_RESULT_CACHE_TYPE')
+        ttl = app.config.get('DB_RESULT_CACHE_TTL', 60)
+        if cache_type == 'memory':
+            self.result_cache = MemoryResultCache(app.config.get('DB_RESULT_CACHE_SIZE', 1000), ttl)
+        elif cache_type == 'redis':
+            self.result_cache = RedisResultCache(app.config['DB_RESULT_CACHE_REDIS_URL'], ttl)
+        elif cache_type:
+            raise ValueError(f"不支持的查询结果缓存类型: {cache_type}")
+        else:
+            self.result_cache = None
+
+    def _wrap_cursor(self, cursor, wait_ms: float = None, connection=None):
+        """慢查询日志开启时包装游标，记录每条语句的耗时，慢查询的 EXPLAIN 在 connection 上执行"""
+        if self.slow_query_log is None:
+            return cursor
+        return _TimedCursor(
+            cursor,
+            lambda sql, params, seconds, rows: self._record_statement(sql, params, seconds, rows, wait_ms, connection)
+        )
+
+    def _record_statement(
+            self, sql: str, params: Any, seconds: float, rows: int = None, wait_ms: float = None, connection=None
+    ):
+        """记录语句耗时，connection 为执行该语句的连接，为空时不执行 EXPLAIN"""
+        slow_query_log = self.slow_query_log
+        if slow_query_log is not None:
+            explain = None if connection is None else functools.partial(self._explain, connection)
+            slow_query_log.record(sql, params, seconds, rows, wait_ms, explain)
+
+    @staticmethod
+    def _explain(connection, sql: str, params: Any) -> List[dict]:
+        """在执行原语句的连接上获取执行计划，由慢查询日志按频率限制调用
+
+        不另取连接，连接池借空时也不会因 EXPLAIN 阻塞；原语句的结果已经全部读取，连接可以继续执行语句。
+        """
+        # 使用未包装的游标，EXPLAIN 本身不计入语句耗时统计
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return list(cursor.fetchall())
+
+    def set_result_cache(self, cache: Optional[ResultCache]) -> None:
+        """设置查询结果缓存后端，None 表示关闭缓存"""
+        self.result_cache = cache
+
+    def _invalidate(self, tables: List[str]) -> None:
+        """写入提交后使读取这些表的缓存项失效"""
+        if self.result_cache is not None:
+            self.result_cache.invalidate([table.lower() for table in tables])
+
+    def _invalidate_statements(self, statements) -> None:
+        """按执行过的语句使缓存失效，无法识别修改了哪个表的写入语句清空整个缓存"""
+        if self.result_cache is None:
+            return
+        tables = set()
+        for sql in statements:
+            written = get_written_tables(sql)
+            if written is None:
+                self.result_cache.clear()
+                return
+            tables.update(written)
+        if tables:
+            self.result_cache.invalidate(sorted(tables))
+
+    def configure_pool(self, pool_size: int, pool_timeout: float = None) -> None:
+        """设置连接池大小和取连接超时
+
+        Args:
+            pool_size: 最大连接数
+            pool_timeout: 连接全部借出时等待空闲连接的秒数，None 表示一直等待
+        """
+        if pool_size < 1:
+            raise ValueError('pool_size 必须大于 0')
+        with self._pool_lock:
+            self.pool_size = pool_size
+            self.pool_timeout = pool_timeout
+            if DatabaseManager._pool is not None:
+                DatabaseManager._pool.close()
+                DatabaseManager._pool = None
+            self._reset_pool_stats()
+
+    def _get_pool(self):
+        pool = DatabaseManager._pool
+        if pool is not None:
+            return pool
+        with self._pool_lock:
+            if DatabaseManager._pool is None:
+                mincached = min(2, self.pool_size)
+                DatabaseManager._pool = PooledDB(
+                    creator=self._get_creator(),
+                    maxconnections=self.pool_size,                  # 最大连接数
+                    mincached=mincached,                            # 初始连接数
+                    maxcached=max(mincached, self.pool_size // 2),  # 最大空闲连接数
+                    blocking=True,      # 连接池满时是否阻塞（等待超时由 get_connection 控制）
+                    maxusage=None,      # 单个连接最大复用次数
+                    setsession=[],      # 开始会话前执行的命令
+                    cursorclass=DictCursor,
+                    **self.config
+                )
+                self._slots = threading.BoundedSemaphore(self.pool_size)
+            return DatabaseManager._pool
+
+    def _get_creator(self):
+        """包装 pymysql.connect，统计新建的连接数"""
+        def connect(*args, **kwargs):
+            connection = pymysql.connect(*args, **kwargs)
+            with self._stats_lock:
+                self._pool_stats['created'] += 1
+            return connection
+        # DBUtils 通过 dbapi / threadsafety 识别驱动的异常类型和线程安全级别
+        connect.dbapi = pymysql
+        connect.threadsafety = pymysql.threadsafety
+        return connect
+
+    def _reset_pool_stats(self) -> None:
+        self._pool_stats = {'checkouts': 0, 'timeouts': 0, 'created': 0, 'in_use': 0, 'peak_in_use': 0}
+        self._wait_histogram = Histogram(self.wait_buckets_ms)
+
     def get_connection(self):
-        """获取数据库连接"""
-        return DatabaseManager._pool.connection()
+        """获取数据库连接
+
+        连接全部借出时最多等待 pool_timeout 秒，超时抛出 PoolTimeoutError。
+        返回的连接必须调用 close() 归还。
+        """
+        pool = self._get_pool()
+        slots, stats = self._slots, self._pool_stats
+        started = time.perf_counter()
+        if not slots.acquire(timeout=self.pool_timeout):
+            with self._stats_lock:
+                self._pool_stats['timeouts'] += 1
+            self._wait_histogram.observe((time.perf_counter() - started) * 1000)
+            raise PoolTimeoutError(f"等待数据库连接超时（{self.pool_timeout} 秒，连接池大小 {self.pool_size}）")
+        try:
+            connection = pool.connection()
+        except Exception:
+            slots.release()
+            raise
+        wait_ms = (time.perf_counter() - started) * 1000
+        self._wait_histogram.observe(wait_ms)
+        with self._stats_lock:
+            stats['checkouts'] += 1
+            stats['in_use'] += 1
+            stats['peak_in_use'] = max(stats['peak_in_use'], stats['in_use'])
+        return _PooledConnection(
+            connection, lambda: self._release_slot(slots, stats), wait_ms,
+            self._wrap_cursor if self.slow_query_log is not None else None
+        )
+
+    def _release_slot(self, slots, stats: dict) -> None:
+        # 归还到借出时的连接池和统计，重新配置连接池前借出的连接不影响新的统计
+        with self._stats_lock:
+            stats['in_use'] -= 1
+        slots.release()
+
+    def get_pool_metrics(self) -> dict:
+        """获取连接池指标
+
+        Returns:
+            dict: {'pool_size', 'pool_timeout', 'in_use', 'idle', 'peak_in_use', 'checkouts', 'timeouts',
+                   'created', 'wait_ms': {'count', 'sum', 'max', 'buckets'}}，
+                idle 为连接池中缓存的空闲连接数，连接池尚未创建时为 0
+        """
+        pool = DatabaseManager._pool
+        with self._stats_lock:
+            stats = dict(self._pool_stats)
+        return {
+            'pool_size': self.pool_size,
+            'pool_timeout': self.pool_timeout,
+            'in_use': stats['in_use'],
+            'idle': len(getattr(pool, '_idle_cache', ())) if pool is not None else 0,
+            'peak_in_use': stats['peak_in_use'],
+            'checkouts': stats['checkouts'],
+            'timeouts': stats['timeouts'],
+            'created': stats['created'],
+            'wait_ms': self._wait_histogram.snapshot()
+        }
+
+    def ping(self) -> bool:
+        """检查数据库是否可用
+
+        使用不经过连接池的独立连接和较短的超时，连接池借空（PoolTimeoutError）时仍能反映数据库本身是否可用，
+        写入失败后据此区分数据库不可用与单条数据导致的失败。
+
+        Returns:
+            bool: 能连接数据库并执行 SELECT 1 时返回 True
+        """
+        conn = None
+        try:
+            conn = pymysql.connect(
+                **{
+                    **self.config,
+                    'connect_timeout': self.ping_timeout,
+                    'read_timeout': self.ping_timeout,
+                    'write_timeout': self.ping_timeout
+                }
+            )
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchall()
+            return True
+        except Exception as e:
+            logging.warning(f"数据库不可用: {str(e)}")
+            return False
+        finally:
+            if conn is not None:
+                with suppress(Exception):
+                    conn.close()
     
     @contextmanager
     def transaction(self):
@@ -184,8 +625,12 @@ class DatabaseManager:
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
+            if self.result_cache is not None:
+                cursor = _WriteTrackingCursor(cursor)
             yield cursor
             conn.commit()
+            if isinstance(cursor, _WriteTrackingCursor):
+                self._invalidate_statements(cursor.statements)
         except Exception as e:
             conn.rollback()
             logging.error(f"Transaction failed: {str(e)}")
@@ -244,6 +689,7 @@ class DatabaseManager:
             with conn.cursor() as cursor:
                 cursor.execute(sql, values)
                 conn.commit()
+                self._invalidate([table])
                 logging.info(f"Inserted data into {table}: {data}")
                 return cursor.rowcount
         finally:
@@ -256,68 +702,102 @@ class DatabaseManager:
             where: dict = None,
             page: int = None,
             page_size: int = None,
-            distinct_columns: str = None
+            distinct_columns: str = None,
+            cache: bool = False
     ) -> list:
-        """从数据库读取数据"""
-        where_clause = ''
-        values = []
-
-        if where:
-            conditions = []
-            for col, value in where.items():
-                if value is None:
-                    conditions.append(f"{col} IS NULL")
-                elif isinstance(value, tuple) and value[1].lower() == 'like':
-                    conditions.append(f"{col} LIKE %s")
-                    values.append(f"%{value[0]}%")
-                elif isinstance(value, dict) and 'between' in value:
-                    conditions.append(f"{col} BETWEEN %s AND %s")
-                    values.extend(value['between'])
-                elif isinstance(value, tuple) and value[1].lower() == '>':
-                    conditions.append(f"{col} > %s")
-                    values.append(value[0])
-                else:
-                    conditions.append(f"{col} = %s")
-                    values.append(value)
-
-            where_clause = ' WHERE ' + ' AND '.join(conditions)
-
-        if distinct_columns:
-            select_columns = f"SELECT DISTINCT {distinct_columns}"
-        else:
-            select_columns = f"SELECT {columns}"
+        """从数据库读取数据，cache 为 True 时使用查询结果缓存（需已启用）"""
+        sql, values = self._build_read(table, columns, where, page, page_size, distinct_columns)
 
-        sql = f"{select_columns} FROM {table}{where_clause}"
-
-        if page is not None and page_size is not None:
-            offset = (page - 1) * page_size
-            sql += f" LIMIT %s OFFSET %s"
-            values.extend([page_size, offset])
+        result_cache = self.result_cache if cache else None
+        if result_cache is not None:
+            tables = [table.lower()]
+            key = result_cache.make_key(sql, values, tables)
+            hit, result = result_cache.get(key)
+            if hit:
+                return result
 
         conn = self.get_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute(sql, tuple(values))
+                cursor.execute(sql, values)
                 result = cursor.fetchall()
                 logging.info(
                     f"Read from {table}, columns: {columns}, where: {where}, page: {page}, page_size: {page_size}, distinct_columns: {distinct_columns}"
                 )
+                if result_cache is not None:
+                    result_cache.set(key, result, tables)
                 return result
         finally:
             conn.close()
 
+    def _build_read(
+            self,
+            table: str,
+            columns: str = '*',
+            where: dict = None,
+            page: int = None,
+            page_size: int = None,
+            distinct_columns: str = None
+    ) -> tuple:
+        """生成 read 的 SQL 和参数，SQL 模板按查询形状缓存"""
+        kinds, values = [], []
+        for col, value in (where or {}).items():
+            if value is None:
+                kinds.append((col, 'NULL'))
+            elif isinstance(value, tuple) and value[1].lower() == 'like':
+                kinds.append((col, 'LIKE'))
+                values.append(f"%{value[0]}%")
+            elif isinstance(value, dict) and 'between' in value:
+                kinds.append((col, 'BETWEEN'))
+                values.extend(value['between'])
+            elif isinstance(value, tuple) and value[1].lower() == '>':
+                kinds.append((col, '>'))
+                values.append(value[0])
+            else:
+                kinds.append((col, '='))
+                values.append(value)
+
+        paged = page is not None and page_size is not None
+        if paged:
+            values.extend([page_size, (page - 1) * page_size])
+
+        key = ('read', table, columns, distinct_columns, tuple(kinds), paged)
+        sql = sql_templates.get(key, lambda: self._compile_read(table, columns, kinds, paged, distinct_columns))
+        return sql, tuple(values)
+
+    @staticmethod
+    def _compile_read(table: str, columns: str, kinds: list, paged: bool, distinct_columns: str = None) -> str:
+        conditions = []
+        for col, kind in kinds:
+            if kind == 'NULL':
+                conditions.append(f"{col} IS NULL")
+            elif kind == 'BETWEEN':
+                conditions.append(f"{col} BETWEEN %s AND %s")
+            else:
+                conditions.append(f"{col} {kind} %s")
+        where_clause = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+        if distinct_columns:
+            select_columns = f"SELECT DISTINCT {distinct_columns}"
+        else:
+            select_columns = f"SELECT {columns}"
+
+        sql = f"{select_columns} FROM {table}{where_clause}"
+        if paged:
+            sql += " LIMIT %s OFFSET %s"
+        return sql
+
     def update(self, table: str, data: dict, where: dict) -> int:
         """更新数据库记录"""
-        set_clause = ', '.join(f"{col}=%s" for col in data.keys())
-        where_clause = ' AND '.join(f"{col}=%s" for col in where.keys())
+        sql = self._get_update_sql(table, data, where)
         values = tuple(data.values()) + tuple(where.values())
-        sql = f"UPDATE {table} SET {set_clause} WHERE {where_clause}"
 
         conn = self.get_connection()
         try:
             with conn.cursor() as cursor:
                 cursor.execute(sql, values)
                 conn.commit()
+                self._invalidate([table])
                 logging.info(f"Updated {table} with data: {data}, where: {where}")
                 return cursor.rowcount
         finally:
@@ -325,22 +805,42 @@ class DatabaseManager:
 
     def delete(self, table: str, where: dict) -> int:
         """删除数据库记录"""
-        where_clause = ' AND '.join(f"{col}=%s" for col in where.keys())
+        sql = self._get_delete_sql(table, where)
         values = tuple(where.values())
-        sql = f"DELETE FROM {table} WHERE {where_clause}"
 
         conn = self.get_connection()
         try:
             with conn.cursor() as cursor:
                 cursor.execute(sql, values)
                 conn.commit()
+                self._invalidate([table])
                 logging.info(f"Deleted from {table}, where: {where}")
                 return cursor.rowcount
         finally:
             conn.close()
 
-    def batch_create(self, table: str, data_list: list) -> bool:
-        """批量插入数据"""
+    @staticmethod
+    def _get_update_sql(table: str, data: dict, where: dict) -> str:
+        """按更新列和条件列获取 UPDATE 模板"""
+        return sql_templates.get(
+            ('update', table, tuple(data), tuple(where)),
+            lambda: f"UPDATE {table} SET {', '.join(f'{col}=%s' for col in data)} "
+                    f"WHERE {' AND '.join(f'{col}=%s' for col in where)}"
+        )
+
+    @staticmethod
+    def _get_delete_sql(table: str, where: dict) -> str:
+        """按条件列获取 DELETE 模板"""
+        return sql_templates.get(
+            ('delete', table, tuple(where)),
+            lambda: f"DELETE FROM {table} WHERE {' AND '.join(f'{col}=%s' for col in where)}"
+        )
+
+    def batch_create(self, table: str, data_list: list, cursor=None) -> bool:
+        """批量插入数据
+
+        传入 cursor（transaction() 的游标）时在调用方的事务中执行，不提交，出错时抛出异常
+        """
         if not data_list:
             return True
 
@@ -349,21 +849,195 @@ class DatabaseManager:
         columns_str = ', '.join(columns)
         sql = f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders})"
         values = [tuple(data[col] for col in columns) for data in data_list]
+        if cursor is not None:
+            cursor.executemany(sql, values)
+            return True
 
         conn = self.get_connection()
         try:
             with conn.cursor() as cursor:
                 cursor.executemany(sql, values)
                 conn.commit()
+                self._invalidate([table])
                 return True
         except Exception as e:
+            conn.rollback()
             logging.error(f"批量插入数据时出错: {str(e)}")
             return False
         finally:
             conn.close()
 
-    def execute_sql(self, sql: str, params: tuple = None, fetch: bool = True) -> tuple:
-        """执行自定义 SQL 语句"""
+    def batch_upsert(self, table: str, data_list: list, update_columns: list = None, cursor=None) -> bool:
+        """
+        批量插入或更新数据（INSERT ... ON DUPLICATE KEY UPDATE）
+        
+        Args:
+            table: 表名，需存在主键或唯一索引
+            data_list: 数据字典列表，所有字典的键相同
+            update_columns: 命中唯一索引时需要更新的列，默认更新全部列
+            cursor: transaction() 的游标，传入时在调用方的事务中执行，不提交，出错时抛出异常
+            
+        Returns:
+            bool: 是否成功，整批在一个事务中执行
+        """
+        if not data_list:
+            return True
+
+        columns = list(data_list[0].keys())
+        update_columns = update_columns or columns
+        placeholders = ', '.join(['%s'] * len(columns))
+        columns_str = ', '.join(columns)
+        update_clause = ', '.join(f"{col}=VALUES({col})" for col in update_columns)
+        sql = (
+            f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders}) "
+            f"ON DUPLICATE KEY UPDATE {update_clause}"
+        )
+        values = [tuple(data[col] for col in columns) for data in data_list]
+        if cursor is not None:
+            cursor.executemany(sql, values)
+            return True
+
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.executemany(sql, values)
+                conn.commit()
+                self._invalidate([table])
+                return True
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"批量插入或更新数据时出错: {str(e)}")
+            return False
+        finally:
+            conn.close()
+
+    @contextmanager
+    def load_data_transaction(self, tables: List[str]):
+        """
+        LOAD DATA 事务上下文管理器
+        
+        使用独立的 local_infile 连接，不占用连接池。退出时提交，出错时回滚并抛出异常，
+        连接失败同样抛出异常。提交后使 tables 的查询缓存失效。
+        
+        Args:
+            tables: 事务中写入的表
+            
+        Usage:
+            with db.load_data_transaction(['orders']) as cursor:
+                stage_table, staged = db.stage_data_infile(cursor, 'orders', columns, file_path)
+                cursor.execute(f"INSERT IGNORE INTO orders ({cols}) SELECT {cols} FROM {stage_table}")
+        """
+        conn = None
+        try:
+            conn = pymysql.connect(cursorclass=DictCursor, local_infile=True, **self.config)
+            with self._wrap_cursor(conn.cursor(), connection=conn) as cursor:
+                yield cursor
+                conn.commit()
+            self._invalidate(tables)
+        except Exception as e:
+            if conn is not None:
+                # 连接已断开时回滚也会失败，未提交的数据由服务端丢弃
+                with suppress(Exception):
+                    conn.rollback()
+            logging.error(f"LOAD DATA 事务失败: {str(e)}")
+            raise
+        finally:
+            if conn is not None:
+                with suppress(Exception):
+                    conn.close()
+
+    @staticmethod
+    def stage_data_infile(cursor, table: str, columns: list, file_path: str) -> tuple:
+        """
+        在 load_data_transaction 的游标上将 TSV 文件载入仅当前连接可见的临时暂存表
+        
+        Args:
+            cursor: load_data_transaction 返回的游标
+            table: 目标表名，暂存表的列定义取自目标表
+            columns: TSV 文件的列，与目标表列名一致
+            file_path: TSV 文件路径，制表符分隔、反斜杠转义、\\N 表示 NULL、UTF-8 编码
+            
+        Returns:
+            tuple: (暂存表名, 载入的行数)
+        """
+        columns_str = ', '.join(columns)
+        stage_table = f"{table}_stage"
+        cursor.execute(f"CREATE TEMPORARY TABLE {stage_table} SELECT {columns_str} FROM {table} WHERE 1 = 0")
+        staged = cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {stage_table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns_str})",
+            (file_path,)
+        )
+        return stage_table, staged
+
+    def load_data_infile(
+            self, table: str, columns: list, file_path: str, update_columns: list = None,
+            ignore_duplicates: bool = False
+    ) -> tuple:
+        """
+        通过 LOAD DATA LOCAL INFILE 批量导入 TSV 文件
+        
+        文件先载入临时暂存表，再用一条 INSERT ... SELECT 合并到目标表，整个过程在一个事务中完成，
+        见 load_data_transaction 和 stage_data_infile。
+        
+        Args:
+            table: 目标表名
+            columns: TSV 文件的列，与目标表列名一致
+            file_path: TSV 文件路径，制表符分隔、反斜杠转义、\\N 表示 NULL、UTF-8 编码
+            update_columns: 命中唯一索引时需要更新的列
+            ignore_duplicates: 未指定 update_columns 时，是否跳过命中唯一索引的行（INSERT IGNORE）；
+                为 False 时任何重复行都会使整个导入失败
+            
+        Returns:
+            tuple: (是否成功, 合并语句影响的行数/错误信息)，连接失败同样返回 (False, 错误信息)；
+                未指定 update_columns 时即写入目标表的行数，指定时按 MySQL 的约定，插入的行计 1、
+                更新的行计 2、内容未变化的行计 0
+        """
+        columns_str = ', '.join(columns)
+        insert = 'INSERT IGNORE' if ignore_duplicates and not update_columns else 'INSERT'
+        try:
+            with self.load_data_transaction([table]) as cursor:
+                stage_table, staged = self.stage_data_infile(cursor, table, columns, file_path)
+                merge_sql = f"{insert} INTO {table} ({columns_str}) SELECT {columns_str} FROM {stage_table}"
+                if update_columns:
+                    merge_sql += " ON DUPLICATE KEY UPDATE " + ', '.join(
+                        f"{col}=VALUES({col})" for col in update_columns
+                    )
+                merged = cursor.execute(merge_sql)
+        except Exception as e:
+            logging.error(f"LOAD DATA 导入 {table} 出错: {str(e)}")
+            return False, str(e)
+        logging.info(f"LOAD DATA 导入 {table}: 载入 {staged} 行，合并影响 {merged} 行")
+        return True, merged
+
+    def execute_sql(
+            self,
+            sql: str,
+            params: tuple = None,
+            fetch: bool = True,
+            cache: bool = False,
+            tables: List[str] = None,
+            ttl: float = None
+    ) -> tuple:
+        """
+        执行自定义 SQL 语句
+        
+        Args:
+            sql: SQL 语句
+            params: 参数
+            fetch: 是否为查询，为 False 时提交并返回影响行数，提交后按修改的表使结果缓存失效
+            cache: 查询结果是否使用结果缓存（需已启用），仅 fetch 为 True 时有效
+            tables: 查询读取的表，用于写入时失效，默认从 SQL 的 FROM / JOIN 解析
+            ttl: 缓存有效期（秒），默认使用结果缓存的 ttl
+        """
+        result_cache = self.result_cache if fetch and cache else None
+        if result_cache is not None:
+            tables = [table.lower() for table in tables] if tables else get_read_tables(sql)
+            key = result_cache.make_key(sql, params, tables)
+            hit, results = result_cache.get(key)
+            if hit:
+                return True, results
+
         conn = self.get_connection()
         try:
             with conn.cursor() as cursor:
@@ -372,9 +1046,12 @@ class DatabaseManager:
                 if fetch:
                     results = cursor.fetchall()
                     logging.info(f"执行 SELECT 语句: {sql}, 获取到 {len(results)} 条记录")
+                    if result_cache is not None:
+                        result_cache.set(key, results, tables, ttl)
                     return True, results
                 else:
                     conn.commit()
+                    self._invalidate_statements([sql])
                     affected_rows = cursor.rowcount
                     logging.info(f"执行 SQL: {sql}, 影响 {affected_rows} 行")
                     return True, affected_rows
@@ -386,6 +1063,114 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    def iter_query(
+            self,
+            sql: str,
+            params: tuple = None,
+            batch_size: int = 1000,
+            batches: bool = False
+    ) -> Iterator[Union[dict, List[dict]]]:
+        """
+        使用无缓冲的服务端游标（SSDictCursor）逐批读取查询结果，内存占用只与 batch_size 有关
+        
+        迭代结束或生成器被关闭前一直占用一个连接，期间该连接不能执行其他语句。
+        调用方提前结束迭代（break、关闭生成器或异常）时，服务端剩余结果未读完，
+        直接断开该连接后归还连接池（不再读完剩余结果），连接池下次取出时重新连接。
+        
+        Args:
+            sql: 查询语句
+            params: 查询参数
+            batch_size: 每次从服务端读取的行数
+            batches: 为 True 时每次产出一批（最多 batch_size 行的列表），否则逐行产出
+            
+        Yields:
+            dict 或 List[dict]: 结果行或一批结果行
+            
+        Usage:
+            for rows in db.iter_query("SELECT * FROM orders WHERE store = %s", ('store_1',), batches=True):
+                ...
+        """
+        conn = self.get_connection()
+        cursor = None
+        unread = False
+        # 只统计执行和从服务端读取的耗时，不含调用方处理各批数据的时间
+        seconds, row_count = 0.0, 0
+        try:
+            cursor = conn.cursor(SSDictCursor)
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            seconds += time.perf_counter() - started
+            unread = True
+            logging.info(f"流式执行 SELECT 语句: {sql}")
+            while True:
+                started = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                seconds += time.perf_counter() - started
+                if not rows:
+                    break
+                row_count += len(rows)
+                if batches:
+                    yield rows
+                else:
+                    yield from rows
+            unread = False
+        except Exception as e:
+            logging.error(f"流式执行 SQL 出错: {sql}, 错误: {str(e)}")
+            raise
+        finally:
+            try:
+                if cursor is not None:
+                    if unread:
+                        # pymysql 服务端游标关闭（以及结果对象回收）时会读完剩余结果，先将结果标记为已结束，
+                        # 由 discard 断开连接丢弃剩余结果；连接池借出的是 DBUtils 包装的游标，需要修改其中的 pymysql 游标
+                        result = getattr(getattr(cursor, '_cursor', cursor), '_result', None)
+                        if result is not None:
+                            result.unbuffered_active = False
+                    cursor.close()
+            finally:
+                if unread:
+                    conn.discard()
+                    self._record_statement(sql, params, seconds, row_count, conn.wait_ms)
+                else:
+                    # 结果已全部读取，慢查询的 EXPLAIN 在归还前的同一连接上执行
+                    try:
+                        self._record_statement(sql, params, seconds, row_count, conn.wait_ms, conn._connection)
+                    finally:
+                        conn.close()
+
+    def stream(
+            self,
+            table: str,
+            columns: str = '*',
+            where: dict = None,
+            batch_size: int = 1000,
+            batches: bool = False,
+            distinct_columns: str = None
+    ) -> Iterator[Union[dict, List[dict]]]:
+        """
+        以服务端游标流式读取数据，条件写法与 read 相同，用于 read 一次性读取会占用过多内存的大结果集
+        
+        Args:
+            batch_size: 每次从服务端读取的行数
+            batches: 为 True 时每次产出一批，否则逐行产出
+            
+        Usage:
+            for row in db.stream('mabang_erp_order_list', 'order_id, sku', {'category': '全托管仓发'}):
+                ...
+        """
+        sql, values = self._build_read(table, columns, where, distinct_columns=distinct_columns)
+        return self.iter_query(sql, values, batch_size, batches)
+
+    def stream_sql(self, sql: str, params: tuple = None, fetch_size: int = 1000) -> Iterator[dict]:
+        """
+        逐行流式读取查询结果，等同于 iter_query(sql, params, fetch_size)
+        
+        Usage:
+            for row in db.stream_sql("SELECT * FROM orders WHERE store = %s", ('store_1',)):
+                ...
+        """
+        return self.iter_query(sql, params, fetch_size)
+
     def warm_up(self):
         """预热连接池"""
         try:
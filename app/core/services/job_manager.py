@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class JobManager:
+    """后台任务管理器
+
+    任务在有界线程池中执行，提交后立即返回任务ID，可通过 get 查询进度和结果。
+    已结束的任务在保留期过后自动清理。
+
+    Note:
+        任务状态保存在当前进程内存中，多进程部署时只能在提交任务的进程中查询。
+    """
+
+    class Status:
+        """任务状态枚举"""
+        PENDING = 'pending'  # 排队中
+        RUNNING = 'running'  # 执行中
+        SUCCESS = 'success'  # 已成功
+        FAILED = 'failed'    # 已失败
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 10, retention_seconds: int = 3600):
+        """
+        Args:
+            max_workers: 同时执行的任务数
+            max_pending: 排队等待的任务数上限，超过后拒绝提交
+            retention_seconds: 已结束任务的保留时间（秒）
+        """
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[..., tuple], *args, **kwargs) -> Tuple[bool, str]:
+        """
+        提交后台任务
+
+        任务函数需接受 on_progress 关键字参数（进度字典回调），
+        并按项目约定返回 (是否成功, 结果/错误信息)。
+
+        Returns:
+            Tuple[bool, str]: (是否成功, 任务ID/错误信息)
+        """
+        self._purge_expired()
+        if not self._slots.acquire(blocking=False):
+            return False, '任务队列已满，请稍后重试'
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': self.Status.PENDING,
+                'progress': {},
+                'result': None,
+                'msg': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+        try:
+            self._executor.submit(self._run, job_id, func, args, kwargs)
+        except Exception as e:
+            self._slots.release()
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            return False, f'任务提交失败: {str(e)}'
+        return True, job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态快照，任务不存在或已过期时返回 None"""
+        self._purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot['progress'] = dict(job['progress'])
+            return snapshot
+
+    def _run(self, job_id: str, func: Callable[..., tuple], args: tuple, kwargs: dict):
+        """执行任务并记录结果"""
+        self._update(job_id, status=self.Status.RUNNING, started_at=time.time())
+        try:
+            success, result = func(*args, on_progress=lambda progress: self._update(job_id, progress=progress), **kwargs)
+            if success:
+                self._update(job_id, status=self.Status.SUCCESS, result=result)
+            else:
+                self._update(job_id, status=self.Status.FAILED, msg=result)
+        except Exception as e:
+            logging.error(f"后台任务 {job_id} 执行失败: {str(e)}")
+            self._update(job_id, status=self.Status.FAILED, msg=str(e))
+        finally:
+            self._update(job_id, finished_at=time.time())
+            self._slots.release()
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if 'progress' in fields:
+                job['progress'] = dict(fields.pop('progress'))
+            job.update(fields)
+
+    def _purge_expired(self):
+        """清理超过保留期的已结束任务"""
+        deadline = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['finished_at'] is not None and job['finished_at'] < deadline
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
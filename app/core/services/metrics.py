@@ -0,0 +1,250 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_memory_mb() -> Optional[float]:
+    """获取当前进程内存占用（MB）
+
+    Linux 读取 /proc/self/statm 中的当前 RSS；其他类 Unix 系统退化为进程启动以来的峰值 RSS；
+    无法获取时返回 None。
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为 KB
+        return max_rss / 1024 / 1024 if sys.platform == 'darwin' else max_rss / 1024
+    return None
+
+
+class StageTimer:
+    """流水线阶段计时器
+
+    按阶段累计耗时和处理行数；后台线程每隔 sample_interval 秒采样进程 RSS，
+    记录包括阶段执行过程中在内的峰值，阶段结束时也会再采样一次。
+
+    Args:
+        sample_interval: 内存采样间隔（秒），为 0 时不启动采样线程，只在阶段结束时采样
+
+    Note:
+        RSS 为进程级指标，同一进程内并发执行的任务会互相影响峰值内存；子进程的内存不计入。
+        采样线程在 result() 或 stop() 时结束，提前退出时需要调用 stop()。
+
+    Usage:
+        timer = StageTimer()
+        try:
+            with timer.stage('process', rows=len(df)):
+                orders = process(df)
+            for df in timer.iterate('read', batches):
+                ...
+            summary['metrics'] = timer.result(total_rows)
+        finally:
+            timer.stop()
+    """
+
+    def __init__(self, sample_interval: float = 0.05):
+        self._started = time.perf_counter()
+        self._stages = {}
+        self._peak_memory = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+        self.sample_memory()
+        if sample_interval > 0:
+            self._sampler = threading.Thread(
+                target=self._sample_loop, args=(sample_interval,), name='stage-timer-memory', daemon=True
+            )
+            self._sampler.start()
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """计时一个阶段，同名阶段的耗时和行数累加"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - started, rows)
+            self.sample_memory()
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """计时迭代器每次取值的耗时，用于流式读取等与处理交替进行的阶段，行数取每项的 len"""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._add(name, time.perf_counter() - started, 0)
+                return
+            self._add(name, time.perf_counter() - started, len(item))
+            self.sample_memory()
+            yield item
+
+    def add_rows(self, name: str, rows: int) -> None:
+        """为阶段补充处理行数"""
+        self._add(name, 0.0, rows)
+
+    def sample_memory(self) -> None:
+        """采样当前内存并更新峰值"""
+        memory = get_memory_mb()
+        with self._lock:
+            if memory is not None and (self._peak_memory is None or memory > self._peak_memory):
+                self._peak_memory = memory
+
+    def stop(self) -> None:
+        """停止后台内存采样，可重复调用"""
+        self._stopped.set()
+        if self._sampler is not None and self._sampler is not threading.current_thread():
+            self._sampler.join()
+        self._sampler = None
+
+    def _sample_loop(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            self.sample_memory()
+
+    def result(self, rows: int) -> Dict[str, Any]:
+        """
+        Args:
+            rows: 整个流水线处理的行数，用于计算总吞吐量
+
+        Returns:
+            Dict: {'total_seconds', 'rows_per_sec', 'peak_memory_mb',
+                   'stages': {阶段名: {'seconds', 'rows', 'rows_per_sec'}}}
+        """
+        total_seconds = time.perf_counter() - self._started
+        self.sample_memory()
+        self.stop()
+        return {
+            'total_seconds': round(total_seconds, 3),
+            'rows_per_sec': self._rate(rows, total_seconds),
+            'peak_memory_mb': None if self._peak_memory is None else round(self._peak_memory, 1),
+            'stages': {
+                name: {
+                    'seconds': round(stage['seconds'], 3),
+                    'rows': stage['rows'],
+                    'rows_per_sec': self._rate(stage['rows'], stage['seconds'])
+                }
+                for name, stage in self._stages.items()
+            }
+        }
+
+    def _add(self, name: str, seconds: float, rows: int) -> None:
+        stage = self._stages.setdefault(name, {'seconds': 0.0, 'rows': 0})
+        stage['seconds'] += seconds
+        stage['rows'] += rows
+
+    @staticmethod
+    def _rate(rows: int, seconds: float) -> Optional[float]:
+        return round(rows / seconds, 1) if rows and seconds > 0 else None
+
+
+class Histogram:
+    """累计分布直方图
+
+    按上界统计落入各区间的次数，同时记录总次数、总和与最大值。线程安全。
+
+    Args:
+        bounds: 递增的区间上界，超过最后一个上界的值计入 '+Inf'
+    """
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = sorted(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if self._max is None or value > self._max:
+                self._max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict: {'count', 'sum', 'max', 'buckets': {上界: 小于等于该上界的累计次数, '+Inf': 总次数}}
+        """
+        with self._lock:
+            buckets, cumulative = {}, 0
+            for bound, count in zip(self.bounds + ['+Inf'], self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                'count': self._count,
+                'sum': round(self._sum, 3),
+                'max': None if self._max is None else round(self._max, 3),
+                'buckets': buckets
+            }
+
+
+class MetricsRegistry:
+    """进程内指标登记表
+
+    按名称保存最近若干次记录和累计值，供指标接口查询，用于跨版本对比性能。
+    """
+
+    def __init__(self, history_size: int = 50):
+        self.history_size = history_size
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, values: Dict[str, Any]) -> None:
+        """记录一次指标，values 中的 rows 和 metrics.total_seconds 计入累计值"""
+        entry = {'recorded_at': time.time(), **values}
+        with self._lock:
+            series = self._series.setdefault(name, {
+                'count': 0,
+                'rows': 0,
+                'seconds': 0.0,
+                'recent': deque(maxlen=self.history_size)
+            })
+            series['count'] += 1
+            series['rows'] += values.get('rows') or 0
+            series['seconds'] += (values.get('metrics') or {}).get('total_seconds') or 0.0
+            series['recent'].append(entry)
+
+    def snapshot(self, name: str = None) -> Dict[str, Any]:
+        """获取指标快照
+
+        Returns:
+            Dict: {名称: {'count', 'rows', 'seconds', 'rows_per_sec', 'recent': [...]}}
+        """
+        with self._lock:
+            names = [name] if name else list(self._series)
+            result = {}
+            for series_name in names:
+                series = self._series.get(series_name)
+                if series is None:
+                    continue
+                result[series_name] = {
+                    'count': series['count'],
+                    'rows': series['rows'],
+                    'seconds': round(series['seconds'], 3),
+                    'rows_per_sec': round(series['rows'] / series['seconds'], 1) if series['seconds'] > 0 else None,
+                    'recent': list(series['recent'])
+                }
+            return result
+
+
+# 全局指标登记表
+metrics = MetricsRegistry()
@@ -0,0 +1,286 @@
+import copy
+import hashlib
+import logging
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # 只有使用 RedisResultCache 时才需要
+    redis = None
+
+
+# 查询读取的表：FROM / JOIN 之后的表名，子查询的 "FROM (" 不匹配
+_READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+`?([\w.]+)`?', re.IGNORECASE)
+# 写入语句修改的表
+_WRITE_TABLE = re.compile(
+    r'^\s*(?:INSERT(?:\s+IGNORE)?(?:\s+INTO)?|REPLACE(?:\s+INTO)?|UPDATE(?:\s+IGNORE)?|DELETE(?:\s+IGNORE)?\s+FROM|'
+    r'TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|'
+    r'LOAD\s+DATA(?:\s+LOCAL)?\s+INFILE\s+\S+(?:\s+(?:REPLACE|IGNORE))?\s+INTO\s+TABLE)\s+`?([\w.]+)`?',
+    re.IGNORECASE
+)
+# 不修改数据的语句
+_READ_ONLY = re.compile(
+    r'^\s*(?:SELECT|SHOW|EXPLAIN|DESCRIBE|DESC|SET|CREATE\s+TEMPORARY|DROP\s+TEMPORARY)\b', re.IGNORECASE
+)
+
+
+def get_read_tables(sql: str) -> List[str]:
+    """解析查询语句读取的表名（小写）"""
+    return sorted({name.lower() for name in _READ_TABLES.findall(sql)})
+
+
+def get_written_tables(sql: str) -> Optional[List[str]]:
+    """解析语句修改的表名（小写）
+
+    Returns:
+        Optional[List[str]]: 只读语句返回空列表，无法识别修改了哪个表的语句返回 None
+    """
+    match = _WRITE_TABLE.match(sql)
+    if match:
+        return [match.group(1).lower()]
+    return [] if _READ_ONLY.match(sql) else None
+
+
+class ResultCache:
+    """查询结果缓存的后端接口
+
+    缓存键由 SQL、参数和所读各表的版本号组成：写入某个表时其版本号加一，之前的缓存项不会再被命中，
+    查询过程中发生的写入也不会让旧结果以新版本号写入缓存。
+
+    子类实现 make_key / _get / _set / invalidate / clear；命中和未命中次数由基类统计。
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, sql: str, params: Any, tables: Iterable[str]) -> Any:
+        raise NotImplementedError
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """
+        Returns:
+            Tuple[bool, Any]: (是否命中, 查询结果)，返回的结果为副本，调用方可以修改
+        """
+        hit, value = self._get(key)
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit, value
+
+    def set(self, key: Any, value: Any, tables: Iterable[str], ttl: float = None) -> None:
+        self._set(key, value, list(tables), self.ttl if ttl is None else ttl)
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """使读取这些表的缓存项失效"""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict: {'backend', 'ttl', 'hits', 'misses', 'hit_rate', 'invalidations'}
+        """
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                'backend': type(self).__name__,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+                'invalidations': self.invalidations
+            }
+
+    def _get(self, key: Any) -> Tuple[bool, Any]:
+        raise NotImplementedError
+
+    def _set(self, key: Any, value: Any, tables: List[str], ttl: float) -> None:
+        raise NotImplementedError
+
+    def _count_invalidation(self) -> None:
+        with self._stats_lock:
+            self.invalidations += 1
+
+
+class MemoryResultCache(ResultCache):
+    """进程内查询结果缓存，LRU 淘汰并按 TTL 过期。线程安全。
+
+    Note:
+        只在当前进程内失效，多进程部署时其他进程的写入要等 TTL 过期后才可见，
+        需要跨进程失效时使用 RedisResultCache。
+
+    Args:
+        maxsize: 缓存的查询结果数上限，超过后淘汰最久未使用的结果
+        ttl: 缓存项的默认有效期（秒）
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 60):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (过期时间, 结果, 读取的表)
+        self._keys_by_table = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, sql: str, params: Any, tables: Iterable[str]) -> Any:
+        with self._lock:
+            versions = tuple((table, self._versions.get(table, 0)) for table in tables)
+        return sql, repr(params), versions
+
+    def _get(self, key: Any) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            value = entry[1]
+        return True, _copy_result(value)
+
+    def _set(self, key: Any, value: Any, tables: List[str], ttl: float) -> None:
+        value = _copy_result(value)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tables)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                # 旧版本的缓存项不会再被命中，直接释放
+                for key in list(self._keys_by_table.pop(table, ())):
+                    self._remove(key)
+        self._count_invalidation()
+
+    def clear(self) -> None:
+        with self._lock:
+            for table in set(self._versions) | set(self._keys_by_table):
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._entries.clear()
+            self._keys_by_table.clear()
+        self._count_invalidation()
+
+    def snapshot(self) -> Dict[str, Any]:
+        result = super().snapshot()
+        with self._lock:
+            result.update({'size': len(self._entries), 'maxsize': self.maxsize, 'evictions': self.evictions})
+        return result
+
+    def _remove(self, key: Any) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+
+class RedisResultCache(ResultCache):
+    """基于 Redis 的共享查询结果缓存，多进程共用缓存和失效
+
+    表的版本号保存在 Redis 中，任一进程写入后所有进程的旧缓存项立即失效；
+    缓存项按 TTL 过期，容量上限由 Redis 的 maxmemory 和 allkeys-lru 淘汰策略控制。
+    Redis 不可用时读取视为未命中、写入缓存被跳过，查询照常访问数据库。
+
+    Note:
+        结果使用 pickle 序列化，Redis 只能由受信任的服务访问。
+        Redis 不可用时失效也无法生效，恢复后可能读到未过期的旧结果，TTL 不宜过长。
+
+    Args:
+        url: Redis 地址，如 redis://localhost:6379/0
+        ttl: 缓存项的默认有效期（秒）
+        prefix: 键前缀
+    """
+
+    def __init__(self, url: str, ttl: float = 60, prefix: str = 'db_result_cache'):
+        if redis is None:
+            raise ImportError('RedisResultCache 需要安装 redis')
+        super().__init__(ttl)
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    def make_key(self, sql: str, params: Any, tables: Iterable[str]) -> Any:
+        tables = list(tables)
+        try:
+            versions = self.client.mget([self._version_key(table) for table in tables]) if tables else []
+        except redis.RedisError as e:
+            logging.warning(f"读取查询缓存版本号失败: {str(e)}")
+            return None
+        digest = hashlib.sha1(repr((sql, params, tables, versions)).encode('utf-8')).hexdigest()
+        return f"{self.prefix}:entry:{digest}"
+
+    def _get(self, key: Any) -> Tuple[bool, Any]:
+        if key is None:
+            return False, None
+        try:
+            data = self.client.get(key)
+        except redis.RedisError as e:
+            logging.warning(f"读取查询缓存失败: {str(e)}")
+            return False, None
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+
+    def _set(self, key: Any, value: Any, tables: List[str], ttl: float) -> None:
+        if key is None:
+            return
+        try:
+            self.client.set(key, pickle.dumps(value), px=max(1, int(ttl * 1000)))
+        except redis.RedisError as e:
+            logging.warning(f"写入查询缓存失败: {str(e)}")
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for table in tables:
+                pipeline.incr(self._version_key(table))
+            pipeline.execute()
+        except redis.RedisError as e:
+            logging.error(f"查询缓存失效失败，读取这些表的缓存项要等 TTL 过期: {list(tables)}, {str(e)}")
+            return
+        self._count_invalidation()
+
+    def clear(self) -> None:
+        try:
+            # 只删除缓存项，保留版本号，避免版本号从头计数后与未过期的旧缓存项重合
+            keys = list(self.client.scan_iter(match=f"{self.prefix}:entry:*", count=1000))
+            if keys:
+                self.client.delete(*keys)
+        except redis.RedisError as e:
+            logging.error(f"清空查询缓存失败: {str(e)}")
+            return
+        self._count_invalidation()
+
+    def _version_key(self, table: str) -> str:
+        return f"{self.prefix}:version:{table}"
+
+
+def _copy_result(value: Any) -> Any:
+    """复制查询结果，结果行（dict）的值均为不可变类型，逐行浅复制即可"""
+    if isinstance(value, (list, tuple)) and all(isinstance(row, dict) for row in value):
+        return [dict(row) for row in value]
+    return copy.deepcopy(value)
@@ -0,0 +1,194 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# 慢查询写入独立的 logger，日志文件见 global_config/logging_config.py
+slow_logger = logging.getLogger('slow_query')
+
+_COMMENTS = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+# 前面不是标识符字符的数字才是字面量（col1、t2 不替换），前面紧跟的正负号一并替换
+_NUMBERS = re.compile(r'(?<!\w)[-+]?\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'%s|%\(\w+\)s')
+_VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_REPEATED_LISTS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+# 语句模板重复率很高，缓存最近的指纹避免重复归一化
+_fingerprint_cache = {}
+_fingerprint_cache_size = 2048
+
+
+def fingerprint(sql: str) -> str:
+    """将 SQL 归一化为指纹：去掉注释，字面量和占位符替换为 ?，IN 列表和多行 VALUES 合并，统一小写和空白
+
+    Usage:
+        fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a'")
+        # 'select * from t where id in (...) and name = ?'
+    """
+    result = _fingerprint_cache.get(sql)
+    if result is not None:
+        return result
+    result = _STRINGS.sub('?', sql)
+    result = _COMMENTS.sub(' ', result)
+    result = _PLACEHOLDERS.sub('?', result)
+    result = _NUMBERS.sub('?', result)
+    result = _VALUE_LISTS.sub('(...)', result)
+    result = _REPEATED_LISTS.sub('(...)', result)
+    result = _WHITESPACE.sub(' ', result).strip().lower()
+    if len(_fingerprint_cache) >= _fingerprint_cache_size:
+        _fingerprint_cache.clear()
+    _fingerprint_cache[sql] = result
+    return result
+
+
+class SlowQueryLog:
+    """语句耗时统计和慢查询日志
+
+    所有语句按指纹累计次数和耗时，用于按总耗时排序的 Top-N 报告；
+    耗时超过阈值的语句写入慢查询日志（指纹、参数个数、返回/影响行数、取连接等待时间），
+    SELECT 语句同时自动执行 EXPLAIN，同一指纹在 explain_interval 秒内只执行一次。
+
+    Args:
+        threshold_ms: 慢查询阈值（毫秒）
+        explain_interval: 同一指纹两次 EXPLAIN 的最小间隔（秒），为 0 时不执行 EXPLAIN
+        max_fingerprints: 统计的指纹数上限，超过后新指纹计入 '<other>'
+        recent_size: 保留的最近慢查询条数
+    """
+
+    other = '<other>'
+
+    def __init__(
+            self,
+            threshold_ms: float = 500,
+            explain_interval: float = 300,
+            max_fingerprints: int = 1000,
+            recent_size: int = 100
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.max_fingerprints = max_fingerprints
+        self._stats = {}
+        self._recent = deque(maxlen=recent_size)
+        self._explained_at = {}
+        self._lock = threading.Lock()
+
+    def record(
+            self,
+            sql: str,
+            params: Any,
+            seconds: float,
+            rows: Optional[int] = None,
+            wait_ms: Optional[float] = None,
+            explain: Callable[[str, Any], List[Dict]] = None
+    ) -> None:
+        """记录一条语句的耗时
+
+        Args:
+            sql: 语句
+            params: 参数，executemany 时为参数列表
+            seconds: 执行耗时（秒）
+            rows: 返回或影响的行数，语句出错时为 None
+            wait_ms: 执行前从连接池取连接的等待时间（毫秒）
+            explain: 在执行原语句的连接上执行 EXPLAIN 的函数，接收 (sql, params) 返回执行计划，为空时不执行 EXPLAIN
+        """
+        key = fingerprint(sql)
+        elapsed_ms = seconds * 1000
+        slow = elapsed_ms >= self.threshold_ms
+        now = time.time()
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = self.other
+                    stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = {
+                        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow_count': 0, 'sample': sql
+                    }
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['rows'] += rows or 0
+            if not slow:
+                return
+            stats['slow_count'] += 1
+            run_explain = (
+                explain is not None and self.explain_interval > 0 and self._is_select(sql)
+                and now - self._explained_at.get(key, 0) >= self.explain_interval
+            )
+            if run_explain:
+                self._explained_at[key] = now
+
+        entry = {
+            'recorded_at': now,
+            'fingerprint': key,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'param_count': self._count_params(params),
+            'rows': rows,
+            'wait_ms': None if wait_ms is None else round(wait_ms, 3),
+            'sql': sql
+        }
+        if run_explain:
+            try:
+                entry['explain'] = explain(sql, params)
+            except Exception as e:
+                entry['explain_error'] = str(e)
+            with self._lock:
+                stats['explain'] = entry.get('explain')
+        with self._lock:
+            self._recent.append(entry)
+        slow_logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def report(self, top: int = 20) -> List[Dict[str, Any]]:
+        """按总耗时排序的指纹统计
+
+        Returns:
+            List[Dict]: [{'fingerprint', 'count', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'slow_count',
+                          'sample': 一条原始语句, 'explain': 最近一次执行计划}]
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+            return [
+                {
+                    'fingerprint': key,
+                    'count': stats['count'],
+                    'total_ms': round(stats['total_ms'], 3),
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                    'max_ms': round(stats['max_ms'], 3),
+                    'rows': stats['rows'],
+                    'slow_count': stats['slow_count'],
+                    'sample': stats['sample'],
+                    'explain': stats.get('explain')
+                }
+                for key, stats in items
+            ]
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """最近的慢查询，最新的在前"""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+            self._explained_at.clear()
+
+    @staticmethod
+    def _is_select(sql: str) -> bool:
+        return _COMMENTS.sub(' ', sql).lstrip()[:6].upper() == 'SELECT'
+
+    @staticmethod
+    def _count_params(params: Any) -> int:
+        if params is None:
+            return 0
+        if isinstance(params, (list, tuple)) and params and isinstance(params[0], (list, tuple, dict)):
+            # executemany：所有行的参数个数之和
+            return sum(len(row) for row in params)
+        return len(params) if isinstance(params, (list, tuple, dict)) else 1
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class Spool:
+    """本地追加写入的批次暂存文件
+
+    写入数据库之前先将批次追加到文件并落盘，写入成功后追加确认记录；
+    数据库不可用时批次留在文件中，由 replay 在数据库恢复后按顺序重新写入，无需重新解析源文件。
+    文件为 JSON Lines：第一行为元数据，之后为 batch（批次数据）和 ack（确认）记录，只追加不修改。
+
+    Note:
+        写入数据库与追加确认之间进程退出时，该批次会被重放，重放为至少一次语义。
+        打开的暂存文件持有排他锁（仅类 Unix 系统），其他进程的重放会跳过正在写入的文件。
+
+    Usage:
+        spool = Spool.create(directory, {'mode': 'insert'})
+        seq = spool.append(rows)
+        ...  # 写入数据库
+        spool.ack(seq)  # 数据库不可用时改为 spool.hold()，之后的批次只追加
+        spool.finish()  # 全部确认时删除文件，否则保留等待重放
+    """
+
+    suffix = '.spool'
+
+    # 当前进程中已打开的暂存文件，不支持 flock 的系统上也能避免同一进程内重复打开
+    _opened = set()
+    _opened_lock = threading.Lock()
+
+    def __init__(self, path: str, meta: Dict[str, Any], next_seq: int = 0, pending_count: int = 0):
+        with Spool._opened_lock:
+            if path in Spool._opened:
+                raise OSError(f"暂存文件已打开: {path}")
+            Spool._opened.add(path)
+        self.path = path
+        self.meta = meta
+        self.pending_count = pending_count
+        # 写入方发现数据库不可用后暂停写入，之后的批次只追加到文件
+        self.held = False
+        self._next_seq = next_seq
+        self._lock = threading.Lock()
+        try:
+            self._file = open(path, 'a', encoding='utf-8')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    self._file.close()
+                    raise
+        except OSError:
+            self._release()
+            raise
+
+    @classmethod
+    def create(cls, directory: str, meta: Dict[str, Any] = None) -> 'Spool':
+        """创建新的暂存文件，文件名以创建时间开头，按文件名排序即为创建顺序"""
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}{cls.suffix}"
+        spool = cls(os.path.join(directory, name), meta or {})
+        spool._write({'type': 'meta', 'meta': spool.meta})
+        return spool
+
+    @classmethod
+    def open(cls, path: str) -> Optional['Spool']:
+        """打开已有的暂存文件用于重放，文件正被其他进程写入或重放时返回 None"""
+        meta, batches, acked = {}, set(), set()
+        for record in cls._read(path):
+            if record['type'] == 'meta':
+                meta = record['meta']
+            elif record['type'] == 'batch':
+                batches.add(record['seq'])
+            elif record['type'] == 'ack':
+                acked.add(record['seq'])
+        try:
+            return cls(path, meta, max(batches, default=-1) + 1, len(batches - acked))
+        except OSError:
+            return None
+
+    @classmethod
+    def list(cls, directory: str) -> List[str]:
+        """按创建顺序列出目录下的暂存文件"""
+        if not os.path.isdir(directory):
+            return []
+        return [
+            os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if name.endswith(cls.suffix)
+        ]
+
+    def append(self, rows: List[Dict]) -> int:
+        """追加一个批次并落盘
+
+        Returns:
+            int: 批次序号，写入数据库成功后用于 ack
+        """
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._write({'type': 'batch', 'seq': seq, 'rows': rows})
+            self.pending_count += 1
+        return seq
+
+    def ack(self, seq: int) -> None:
+        """确认批次已写入数据库"""
+        with self._lock:
+            self._write({'type': 'ack', 'seq': seq})
+            self.pending_count -= 1
+
+    def hold(self) -> None:
+        """暂停写入，之后的批次只追加到文件，等待重放"""
+        self.held = True
+
+    def batches(self) -> Iterator[Tuple[int, List[Dict], bool]]:
+        """按顺序遍历文件中的所有批次，每次只在内存中保留一个批次
+
+        Yields:
+            Tuple[int, List[Dict], bool]: (批次序号, 批次数据, 是否已确认)
+        """
+        acked = {record['seq'] for record in self._read(self.path) if record['type'] == 'ack'}
+        for record in self._read(self.path):
+            if record['type'] == 'batch':
+                yield record['seq'], record['rows'], record['seq'] in acked
+
+    def pending(self) -> Iterator[Tuple[int, List[Dict]]]:
+        """按顺序遍历文件中未确认的批次
+
+        Yields:
+            Tuple[int, List[Dict]]: (批次序号, 批次数据)
+        """
+        for seq, rows, acked in self.batches():
+            if not acked:
+                yield seq, rows
+
+    def finish(self) -> bool:
+        """关闭文件，本次追加的批次全部确认时删除文件
+
+        Returns:
+            bool: 文件是否已删除
+        """
+        if self.pending_count > 0:
+            self.close()
+            return False
+        self.remove()
+        return True
+
+    def close(self) -> None:
+        """关闭文件并释放锁"""
+        if not self._file.closed:
+            self._file.close()
+        self._release()
+
+    def remove(self) -> None:
+        """删除暂存文件"""
+        # 先删除再关闭，删除前其他进程无法取得锁
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.close()
+
+    def _release(self) -> None:
+        with Spool._opened_lock:
+            Spool._opened.discard(self.path)
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_encode) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @staticmethod
+    def _read(path: str) -> Iterator[Dict]:
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line, object_hook=_decode)
+                except ValueError:
+                    # 写入中途退出时最后一行可能不完整，该批次未确认也未写入数据库
+                    logging.warning(f"跳过暂存文件 {os.path.basename(path)} 第 {line_no} 行的不完整记录")
+
+
+class ReplayWorker:
+    """后台重放线程
+
+    每隔 interval 秒调用一次 replay，replay 按项目约定返回 (是否成功, 结果/错误信息)，
+    失败时（如数据库仍不可用）等待下一次调用。
+
+    Args:
+        replay: 重放函数
+        interval: 调用间隔（秒）
+    """
+
+    def __init__(self, replay: Callable[[], tuple], interval: float = 60):
+        self.replay = replay
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """启动后台线程，已启动时不重复启动，可在每个请求中调用"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='spool-replay', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                success, result = self.replay()
+                if not success:
+                    logging.debug(f"暂存批次重放未完成: {result}")
+            except Exception as e:
+                logging.error(f"暂存批次重放失败: {str(e)}")
+
+
+def _encode(value: Any) -> Any:
+    """JSON 不支持的类型按类型标记编码，读取时由 _decode 还原"""
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"无法写入暂存文件的类型: {type(value).__name__}")
+
+
+def _decode(record: Dict) -> Any:
+    if len(record) == 1:
+        if '__decimal__' in record:
+            return Decimal(record['__decimal__'])
+        if '__datetime__' in record:
+            return datetime.fromisoformat(record['__datetime__'])
+        if '__date__' in record:
+            return date.fromisoformat(record['__date__'])
+    return record
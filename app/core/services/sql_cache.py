@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class SQLTemplateCache:
+    """编译后 SQL 模板的 LRU 缓存
+
+    以查询形状（表名、列、条件运算符、排序/分组/分页是否存在等）为键缓存 SQL 字符串，
+    形状相同的调用只需重新组装参数元组。线程安全。
+
+    Args:
+        maxsize: 缓存的模板数上限，超过后淘汰最久未使用的模板；为 0 时不缓存
+
+    Usage:
+        sql = sql_templates.get(('delete', table, tuple(where)), lambda: compile_delete(table, where))
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compile_sql: Callable[[], str]) -> str:
+        """获取查询形状对应的 SQL 模板，未缓存时调用 compile_sql 生成并缓存"""
+        with self._lock:
+            sql = self._templates.get(key)
+            if sql is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return sql
+            self.misses += 1
+        sql = compile_sql()
+        if self.maxsize > 0:
+            with self._lock:
+                self._templates[key] = sql
+                self._templates.move_to_end(key)
+                if len(self._templates) > self.maxsize:
+                    self._templates.popitem(last=False)
+        return sql
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict: {'size', 'maxsize', 'hits', 'misses', 'hit_rate'}
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._templates),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None
+            }
+
+
+# 全局 SQL 模板缓存，QueryBuilder 与 DatabaseManager 的 read/update/delete 共用
+sql_templates = SQLTemplateCache()
@@ -0,0 +1,226 @@
+import math
+import re
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, List, Optional
+from xml.sax.saxutils import escape
+
+
+# XML 1.0 不允许的控制字符，Excel 打开含这些字符的文件会报错
+_ILLEGAL_CHARACTERS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_EPOCH = datetime(1899, 12, 30)
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# 单元格样式：0 常规，1 日期时间，2 日期
+_STYLES_XML = (
+    f'{_XML_DECLARATION}<styleSheet xmlns="{_MAIN_NS}">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _OutputBuffer:
+    """zip 输出缓冲区，不支持 seek，zipfile 会为每个文件写入数据描述符，文件内容可以边压缩边输出"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def read(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class XlsxStreamWriter:
+    """逐行生成 xlsx 文件内容，压缩后的数据边生成边取出，不在内存或磁盘中缓存整个文件
+
+    工作表 XML 直接写入 zip 流，单元格使用内联字符串，不需要共享字符串表。
+    一个工作表的行数达到 Excel 上限（含表头 1048576 行）或 XML 超过 max_sheet_bytes 时，
+    自动续写到新工作表（工作表名_2、工作表名_3 ...），每个工作表都重复表头。
+
+    Args:
+        sheet_name: 工作表名
+        header: 表头，每个工作表的第一行
+        max_sheet_bytes: 单个工作表 XML 的最大字节数，避免单个 zip 条目超过 2GB 需要 ZIP64
+
+    Usage:
+        writer = XlsxStreamWriter('订单', ['订单编号', '付款时间'])
+        for row in rows:
+            writer.append(row)
+            chunk = writer.read()  # 已压缩好的数据，可能为空
+        tail = writer.close()  # 剩余数据和工作簿目录
+    """
+
+    max_rows = 1048576
+    max_cell_chars = 32767
+
+    def __init__(self, sheet_name: str = 'Sheet1', header: List[Any] = None, max_sheet_bytes: int = 1 << 30):
+        self.sheet_name = sheet_name
+        self.header = list(header) if header else None
+        self.max_sheet_bytes = max_sheet_bytes
+        self.sheet_names = []
+        self._output = _OutputBuffer()
+        self._zip = zipfile.ZipFile(self._output, 'w', zipfile.ZIP_DEFLATED)
+        self._zip.writestr('xl/styles.xml', _STYLES_XML)
+        self._sheet = None
+        self._row_count = 0
+        self._sheet_bytes = 0
+        self._columns = []
+        self._new_sheet()
+
+    def append(self, values: List[Any]) -> None:
+        """追加一行，None 为空单元格"""
+        if self._row_count >= self.max_rows or self._sheet_bytes >= self.max_sheet_bytes:
+            self._close_sheet()
+            self._new_sheet()
+        self._write_row(values)
+
+    def read(self) -> bytes:
+        """取出已经生成的数据"""
+        return self._output.read()
+
+    def close(self) -> bytes:
+        """结束最后一个工作表并写入工作簿目录
+
+        Returns:
+            bytes: 剩余的全部数据
+        """
+        if self._zip is not None:
+            self._close_sheet()
+            self._write_workbook()
+            self._zip.close()
+            self._zip = None
+        return self._output.read()
+
+    def _new_sheet(self) -> None:
+        index = len(self.sheet_names) + 1
+        self.sheet_names.append(self.sheet_name if index == 1 else f"{self.sheet_name}_{index}"[:31])
+        self._sheet = self._zip.open(f'xl/worksheets/sheet{index}.xml', 'w')
+        self._row_count = 0
+        self._sheet_bytes = 0
+        self._write(f'{_XML_DECLARATION}<worksheet xmlns="{_MAIN_NS}"><sheetData>')
+        if self.header:
+            self._write_row(self.header)
+
+    def _close_sheet(self) -> None:
+        self._write('</sheetData></worksheet>')
+        self._sheet.close()
+
+    def _write_row(self, values: List[Any]) -> None:
+        self._row_count += 1
+        row = self._row_count
+        cells = []
+        for index, value in enumerate(values):
+            cell = self._format_cell(value)
+            if cell is not None:
+                cells.append(f'<c r="{self._column(index)}{row}"{cell}</c>')
+        self._write(f'<row r="{row}">{"".join(cells)}</row>')
+
+    def _format_cell(self, value: Any) -> Optional[str]:
+        """单元格属性和内容，返回 None 时不写入该单元格"""
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return f' t="b"><v>{int(value)}</v>'
+        if isinstance(value, (int, float, Decimal)):
+            if isinstance(value, float) and not math.isfinite(value):
+                return None
+            if isinstance(value, Decimal) and not value.is_finite():
+                return None
+            return f'><v>{value}</v>'
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.replace(tzinfo=None)
+            return f' s="1"><v>{self._serial(value)}</v>'
+        if isinstance(value, date):
+            return f' s="2"><v>{(value - _EPOCH.date()).days}</v>'
+        if isinstance(value, time):
+            seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+            return f' s="1"><v>{seconds / 86400}</v>'
+        text = _ILLEGAL_CHARACTERS.sub('', str(value))[:self.max_cell_chars]
+        return f' t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is>'
+
+    @staticmethod
+    def _serial(value: datetime) -> float:
+        """Excel 日期序列值（1900 日期系统）"""
+        delta = value - _EPOCH
+        return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400
+
+    def _column(self, index: int) -> str:
+        """列序号（从 0 开始）转换为列名 A、B ... AA"""
+        while len(self._columns) <= index:
+            number = len(self._columns) + 1
+            name = ''
+            while number:
+                number, remainder = divmod(number - 1, 26)
+                name = chr(65 + remainder) + name
+            self._columns.append(name)
+        return self._columns[index]
+
+    def _write(self, text: str) -> None:
+        data = text.encode('utf-8')
+        self._sheet_bytes += len(data)
+        self._sheet.write(data)
+
+    def _write_workbook(self) -> None:
+        count = len(self.sheet_names)
+        sheets = ''.join(
+            f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(self.sheet_names, 1)
+        )
+        self._zip.writestr(
+            'xl/workbook.xml',
+            f'{_XML_DECLARATION}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>{sheets}</sheets></workbook>'
+        )
+        relationships = ''.join(
+            f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, count + 1)
+        )
+        self._zip.writestr(
+            'xl/_rels/workbook.xml.rels',
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PKG_REL_NS}">{relationships}'
+            f'<Relationship Id="rId{count + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/></Relationships>'
+        )
+        self._zip.writestr(
+            '_rels/.rels',
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        )
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, count + 1)
+        )
+        self._zip.writestr(
+            '[Content_Types].xml',
+            f'{_XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>'
+        )
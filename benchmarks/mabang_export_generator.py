@@ -0,0 +1,115 @@
+"""马帮订单导出文件生成器
+
+按马帮导出格式生成测试文件：表头使用 field_mapping 中的中文列名，
+包含 PON 交易、空值、百分比字符串、千分位金额和未映射的列，支持 1k ~ 1M 行。
+数据分块生成并流式写出，内存占用与行数无关。文件名包含类别关键字，可直接用于导入。
+
+csv 文件用于与 LOAD DATA、外部工具等对比，当前导入接口只接受 xls/xlsx。
+
+Usage:
+    python -m benchmarks.mabang_export_generator --rows 100000 --format xlsx --output /tmp/bench
+"""
+import argparse
+import csv
+import math
+import os
+import tempfile
+
+from benchmarks.standin_db import disable_pool
+
+# 每次生成的行数
+CHUNK_ROWS = 50000
+# 默认输出目录，放在系统临时目录下，不写入工作目录
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'mabang_benchmark_data')
+
+
+def generate_export(
+        output_dir: str,
+        rows: int,
+        file_format: str = 'xlsx',
+        seed: int = 42,
+        category_keyword: str = '全托管仓发'
+) -> str:
+    """生成一个马帮导出文件
+
+    Args:
+        output_dir: 输出目录
+        rows: 数据行数
+        file_format: xlsx 或 csv
+        seed: 随机种子，相同参数生成相同内容
+        category_keyword: 文件名中的类别关键字，导入时据此判断订单类别
+
+    Returns:
+        str: 生成的文件路径
+    """
+    # 延迟导入，调用方可先决定是否使用数据库替身
+    from app.aliexpress.services.mabang_order_service import MabangOrderService
+    from benchmarks.mabang_order_convert_benchmark import build_dataframe
+
+    if file_format not in ('xlsx', 'csv'):
+        raise ValueError(f"不支持的文件格式: {file_format}")
+    os.makedirs(output_dir, exist_ok=True)
+    file_path = os.path.join(output_dir, f"mabang_{category_keyword}_{rows}_{seed}.{file_format}")
+    service = MabangOrderService()
+
+    def iter_chunks():
+        for index, start in enumerate(range(0, rows, CHUNK_ROWS)):
+            yield build_dataframe(service, min(CHUNK_ROWS, rows - start), seed=seed + index)
+
+    if file_format == 'csv':
+        _write_csv(file_path, iter_chunks())
+    else:
+        _write_xlsx(file_path, iter_chunks())
+    return file_path
+
+
+def _iter_cells(df):
+    """将 DataFrame 逐行转换为单元格值，空值写为空单元格"""
+    columns = [df[name].tolist() for name in df.columns]
+    for row in zip(*columns):
+        yield [None if isinstance(value, float) and math.isnan(value) else value for value in row]
+
+
+def _write_xlsx(file_path: str, chunks):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('订单')
+    header_written = False
+    for df in chunks:
+        if not header_written:
+            sheet.append(list(df.columns))
+            header_written = True
+        for cells in _iter_cells(df):
+            sheet.append([value.to_pydatetime() if hasattr(value, 'to_pydatetime') else value for value in cells])
+    workbook.save(file_path)
+
+
+def _write_csv(file_path: str, chunks):
+    with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        header_written = False
+        for df in chunks:
+            if not header_written:
+                writer.writerow(list(df.columns))
+                header_written = True
+            for cells in _iter_cells(df):
+                writer.writerow(['' if value is None else value for value in cells])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='马帮订单导出文件生成器')
+    parser.add_argument('--rows', type=int, default=10000, help='数据行数')
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help='文件格式')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', default=DEFAULT_DATA_DIR, help='输出目录，默认在系统临时目录下')
+    args = parser.parse_args()
+
+    # 生成文件不需要数据库
+    disable_pool()
+    file_path = generate_export(args.output, args.rows, args.format, args.seed)
+    print(f"已生成: {file_path} ({os.path.getsize(file_path) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""马帮订单导入基准测试
+
+按文件大小和导入模式运行 MabangOrderService.import_orders_from_excel，
+报告吞吐量（行/秒）、峰值内存、各阶段耗时和数据库往返次数。
+
+每次导入在独立的子进程中执行，峰值内存互不影响。默认使用数据库替身（不需要 MySQL），
+只测量读取、转换和写入调用本身的开销，可用 --latency-ms 模拟每次往返的网络延迟；
+--backend mysql 使用 MYSQL_CONFIG 指向的数据库，请使用专门的测试库：
+导入会真实写入 mabang_erp_order_list，upsert 模式需要先执行 sql/mabang_erp_order_list_natural_key.sql，
+load_data 模式需要服务端开启 local_infile。
+
+Usage:
+    python -m benchmarks.mabang_order_import_benchmark --rows 1000 10000 100000 --modes insert upsert load_data
+"""
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.mabang_export_generator import DEFAULT_DATA_DIR, generate_export
+from benchmarks.standin_db import RoundTripCounter, StandInDB, disable_pool
+
+
+def run_import(file_path: str, mode: str, backend: str, latency_ms: float, stream: bool = None) -> dict:
+    """在当前进程中执行一次导入并返回测量结果"""
+    if backend == 'standin':
+        disable_pool()
+        target = StandInDB(latency_ms)
+    else:
+        from app.core.services.db import db as target
+
+    from app.aliexpress.services import (
+        mabang_order_partition_service, mabang_order_profit_service, mabang_order_service
+    )
+    counter = RoundTripCounter(target)
+    mabang_order_service.db = counter
+    mabang_order_profit_service.db = counter
+    mabang_order_partition_service.db = counter
+
+    service = mabang_order_service.MabangOrderService()
+    success, summary = service.import_orders_from_excel(file_path, mode=mode, stream=stream)
+    if not success:
+        return {'mode': mode, 'error': summary}
+
+    metrics = summary['metrics']
+    return {
+        'mode': mode,
+        'rows': summary['total'],
+        'written': summary['success'],
+        'errors': summary['error'],
+        'seconds': metrics['total_seconds'],
+        'rows_per_sec': metrics['rows_per_sec'],
+        'peak_memory_mb': metrics['peak_memory_mb'],
+        'stages': {name: stage['seconds'] for name, stage in metrics['stages'].items()},
+        'round_trips': counter.total,
+        'round_trips_by_method': dict(counter.counts),
+        'fallback': summary.get('load_data_fallback')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='马帮订单导入基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='测试文件行数')
+    parser.add_argument('--modes', nargs='+', default=['insert', 'upsert', 'load_data'], help='导入模式')
+    parser.add_argument('--backend', choices=['standin', 'mysql'], default='standin', help='数据库后端')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='替身每次往返模拟的延迟（毫秒）')
+    parser.add_argument('--stream', choices=['auto', 'on', 'off'], default='auto', help='是否流式读取')
+    parser.add_argument(
+        '--data-dir', default=DEFAULT_DATA_DIR, help='测试文件目录，已存在的文件直接复用，默认在系统临时目录下'
+    )
+    args = parser.parse_args()
+
+    if args.backend == 'standin':
+        disable_pool()
+
+    stream = {'auto': None, 'on': True, 'off': False}[args.stream]
+    # spawn 保证每次导入的进程状态和内存基线一致
+    context = multiprocessing.get_context('spawn')
+    print(f"{'行数':>9} {'模式':<10} {'耗时(s)':>9} {'行/秒':>10} {'峰值内存(MB)':>13} {'往返次数':>9}  各阶段耗时(s)")
+    for rows in args.rows:
+        file_path = os.path.join(args.data_dir, f"mabang_全托管仓发_{rows}_42.xlsx")
+        if not os.path.exists(file_path):
+            file_path = generate_export(args.data_dir, rows)
+        for mode in args.modes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_import, file_path, mode, args.backend, args.latency_ms, stream).result()
+            if 'error' in result:
+                print(f"{rows:>9} {mode:<10} 导入失败: {result['error']}")
+                continue
+            stages = ', '.join(f"{name}={seconds}" for name, seconds in result['stages'].items())
+            print(
+                f"{rows:>9} {mode:<10} {result['seconds']:>9.3f} {result['rows_per_sec'] or 0:>10,.0f} "
+                f"{result['peak_memory_mb'] or 0:>13.1f} {result['round_trips']:>9}  {stages}"
+            )
+            trips = ', '.join(f"{name}={count}" for name, count in sorted(result['round_trips_by_method'].items()))
+            print(f"{'':>9} {'':<10} 往返: {trips}")
+            if result['fallback']:
+                print(f"{'':>9} {'':<10} load_data 已回退到 insert: {result['fallback']}")
+
+
+if __name__ == '__main__':
+    main()
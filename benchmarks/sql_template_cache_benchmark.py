@@ -0,0 +1,82 @@
+"""SQL 模板缓存基准测试
+
+对比 QueryBuilder.build 以及 read/update/delete 生成 SQL 时启用和关闭 SQL 模板缓存的单次耗时，
+并校验两种方式生成的 SQL 和参数完全一致。只测量 SQL 生成，不连接数据库。
+
+Usage:
+    python -m benchmarks.sql_template_cache_benchmark --calls 200000
+"""
+import argparse
+import time
+
+from benchmarks.standin_db import disable_pool
+
+
+def build_cases(db):
+    """热点接口使用的典型查询形状，每个用例返回 (sql, params)"""
+    columns = ['id', 'category', 'store', 'order_id', 'sku', 'payment_time', 'rmb_amount', 'order_profit']
+
+    def list_orders():
+        return db.query()\
+            .select(*columns)\
+            .from_table('mabang_erp_order_list')\
+            .where(category='全托管仓发', payment_time=('2024-01-01', '2024-01-31', 'BETWEEN'))\
+            .where_raw("payment_time <= %s AND (payment_time < %s OR (payment_time = %s AND id < %s))",
+                       '2024-01-20', '2024-01-20', '2024-01-20', 1000)\
+            .order_by('payment_time', desc=True)\
+            .order_by('id', desc=True)\
+            .limit(21)\
+            .build()
+
+    def read():
+        return db._build_read('product_info', 'id, name, price', {'status': 'active', 'name': ('手机', 'like')}, 3, 20)
+
+    def update():
+        data = {'name': '手机壳', 'price': 9.9, 'status': 'active'}
+        return db._get_update_sql('product_info', data, {'id': 1}), tuple(data.values()) + (1,)
+
+    def delete():
+        return db._get_delete_sql('product_info', {'id': 1}), (1,)
+
+    return {'query_builder': list_orders, 'read': read, 'update': update, 'delete': delete}
+
+
+def measure(case, calls: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    started = time.perf_counter()
+    for _ in range(calls):
+        case()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQL 模板缓存基准测试')
+    parser.add_argument('--calls', type=int, default=100000, help='每个用例的调用次数')
+    args = parser.parse_args()
+
+    disable_pool()
+    from app.core.services.database_manager import DatabaseManager
+    from app.core.services.sql_cache import sql_templates
+
+    db = DatabaseManager()
+    cases = build_cases(db)
+    maxsize = sql_templates.maxsize
+
+    print(f"{'用例':<14} {'无缓存(µs)':>11} {'缓存(µs)':>10} {'节省':>7}")
+    for name, case in cases.items():
+        sql_templates.maxsize = 0
+        sql_templates.clear()
+        expected = case()
+        uncached = measure(case, args.calls)
+
+        sql_templates.maxsize = maxsize
+        sql_templates.clear()
+        if case() != expected or case() != expected:
+            raise SystemExit(f'{name}: 缓存生成的 SQL 与无缓存时不一致')
+        cached = measure(case, args.calls)
+        print(f"{name:<14} {uncached:>11.2f} {cached:>10.2f} {1 - cached / uncached:>7.1%}")
+    print(f"缓存: {sql_templates.snapshot()}")
+
+
+if __name__ == '__main__':
+    main()
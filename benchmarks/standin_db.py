@@ -0,0 +1,206 @@
+"""基准测试使用的数据库替身和往返次数统计
+
+StandInDB 实现订单导入用到的 DatabaseManager 接口，只统计调用、不保存数据，
+可在没有 MySQL 的环境中测量导入流水线本身的开销；RoundTripCounter 包装真实数据库或替身，
+按方法统计数据库往返次数。
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# 需要统计的 DatabaseManager 方法，每次调用计为一次往返
+COUNTED_METHODS = (
+    'create', 'read', 'update', 'delete', 'batch_create', 'batch_upsert',
+    'load_data_infile', 'execute_sql', 'stream_sql', 'iter_query'
+)
+
+
+class _NoPool:
+    """不建立连接的连接池占位"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def connection(self, *args, **kwargs):
+        raise RuntimeError('基准测试使用数据库替身，未创建连接池')
+
+
+def disable_pool():
+    """阻止 DatabaseManager 创建连接池
+
+    导入 app 包时即会初始化 DatabaseManager，因此必须在导入任何 app 模块之前调用，
+    使用替身时无需可连接的 MySQL。
+    """
+    import dbutils.pooled_db
+    dbutils.pooled_db.PooledDB = _NoPool
+
+
+class StandInDB:
+    """数据库替身：所有写入直接成功，查询返回空结果
+
+    Args:
+        latency_ms: 每次往返模拟的网络延迟（毫秒），用于估算往返次数对耗时的影响
+    """
+
+    # 与 DatabaseManager 的默认连接池大小相同，用于确定写入线程数和写入名额
+    pool_size = 10
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def query(self):
+        from app.core.services.database_manager import QueryBuilder
+        return QueryBuilder(self)
+
+    def create(self, table: str, data: dict) -> int:
+        self._round_trip()
+        return 1
+
+    def batch_create(self, table: str, data_list: list, cursor=None) -> bool:
+        if cursor is not None:
+            cursor.executemany(None, data_list)
+            return True
+        self._round_trip()
+        return True
+
+    def batch_upsert(self, table: str, data_list: list, update_columns: list = None, cursor=None) -> bool:
+        if cursor is not None:
+            cursor.executemany(None, data_list)
+            return True
+        self._round_trip()
+        return True
+
+    def load_data_infile(self, table: str, columns: list, file_path: str, update_columns: list = None) -> tuple:
+        self._round_trip()
+        with open(file_path, encoding='utf-8') as f:
+            return True, sum(1 for _ in f)
+
+    @contextmanager
+    def load_data_transaction(self, tables: list):
+        yield _StandInLoadCursor(self)
+
+    @staticmethod
+    def stage_data_infile(cursor, table: str, columns: list, file_path: str) -> tuple:
+        stage_table = f"{table}_stage"
+        cursor.execute(f"CREATE TEMPORARY TABLE {stage_table}")
+        cursor.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {stage_table}", (file_path,))
+        with open(file_path, encoding='utf-8') as f:
+            cursor.staged[stage_table] = sum(1 for _ in f)
+        return stage_table, cursor.staged[stage_table]
+
+    def execute_sql(
+            self, sql: str, params: tuple = None, fetch: bool = True, cache: bool = False, tables: list = None,
+            ttl: float = None
+    ) -> tuple:
+        self._round_trip()
+        return True, [] if fetch else 0
+
+    def stream_sql(self, sql: str, params: tuple = None, fetch_size: int = 1000):
+        self._round_trip()
+        return iter([])
+
+    def iter_query(self, sql: str, params: tuple = None, batch_size: int = 1000, batches: bool = False):
+        self._round_trip()
+        return iter([])
+
+    @contextmanager
+    def transaction(self):
+        yield _StandInCursor(self)
+
+
+class _StandInCursor:
+    def __init__(self, db: StandInDB):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.db._round_trip()
+        return 0
+
+    def executemany(self, sql, params_list):
+        self.db._round_trip()
+        return 0
+
+    def fetchall(self):
+        return []
+
+
+class _StandInLoadCursor(_StandInCursor):
+    """load_data_transaction 的游标：INSERT ... SELECT 按暂存表载入的行数全部写入"""
+
+    def __init__(self, db: StandInDB):
+        super().__init__(db)
+        self.staged = {}
+
+    def execute(self, sql, params=None):
+        self.db._round_trip()
+        match = re.search(r'\bFROM (\w+)', sql)
+        if sql.startswith('INSERT') and match:
+            return self.staged.get(match.group(1), 0)
+        return 0
+
+
+class RoundTripCounter:
+    """按方法统计数据库往返次数的代理
+
+    每次方法调用计为一次往返，事务内的每条语句分别计数。
+    pymysql 的 executemany 会把多行 INSERT 合并为一条语句，超过 max_allowed_packet 时才拆分，
+    因此批量写入按一次往返估算。
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self.counts = Counter()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in COUNTED_METHODS or not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            # 传入事务游标的批量写入由游标上的语句计数
+            if kwargs.get('cursor') is None:
+                self.counts[name] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+    def query(self):
+        # 查询构建器通过 db_manager.execute_sql 执行，需绑定到代理上才能计数
+        from app.core.services.database_manager import QueryBuilder
+        return QueryBuilder(self)
+
+    @contextmanager
+    def transaction(self):
+        with self._target.transaction() as cursor:
+            yield _CountingCursor(cursor, self.counts)
+
+    @contextmanager
+    def load_data_transaction(self, tables: list):
+        with self._target.load_data_transaction(tables) as cursor:
+            yield _CountingCursor(cursor, self.counts)
+
+
+class _CountingCursor:
+    def __init__(self, cursor, counts: Counter):
+        self._cursor = cursor
+        self._counts = counts
+
+    def execute(self, *args, **kwargs):
+        self._counts['transaction.execute'] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counts['transaction.executemany'] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
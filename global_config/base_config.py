@@ -11,6 +11,16 @@ class BaseConfig:
     SQLALCHEMY_POOL_SIZE = 10
     SQLALCHEMY_POOL_TIMEOUT = 30
 
+    # 慢查询日志：超过阈值（毫秒）的语句写入 slow_query 日志，SELECT 同时记录 EXPLAIN；阈值为 None 时不统计语句耗时
+    SLOW_QUERY_THRESHOLD_MS = 500
+    SLOW_QUERY_EXPLAIN_INTERVAL = 300  # 同一类语句两次 EXPLAIN 的最小间隔（秒）
+
+    # 查询结果缓存：None 不启用，'memory' 进程内缓存，'redis' 多进程共享缓存（需安装 redis）
+    DB_RESULT_CACHE_TYPE = None
+    DB_RESULT_CACHE_SIZE = 1000  # 进程内缓存的结果数上限
+    DB_RESULT_CACHE_TTL = 60  # 缓存有效期（秒）
+    DB_RESULT_CACHE_REDIS_URL = os.getenv('DB_RESULT_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
@@ -3,6 +3,7 @@ import os
 
 # 日志文件路径
 LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), 'app.log')
+SLOW_QUERY_LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), 'slow_query.log')
 
 # 日志配置
 LOGGING_CONFIG = {
@@ -20,6 +21,20 @@ LOGGING_CONFIG = {
             'filename': LOG_FILE_PATH,
             'formatter': 'standard',
         },
+        'slow_query_file': {
+            'level': 'WARNING',
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG_FILE_PATH,
+            'formatter': 'standard',
+        },
+    },
+    'loggers': {
+        # 慢查询单独写入 slow_query.log，每行一条 JSON
+        'slow_query': {
+            'handlers': ['slow_query_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['file'],
@@ -7,7 +7,9 @@ from app import create_app
 
 # 从环境变量获取运行模式
 config_name = os.getenv('FLASK_ENV', 'development')
-app = create_app(config_name)
+# 以 spawn 方式启动的子进程（如订单导入的解析进程）会以 __mp_main__ 重新执行本文件，子进程不创建应用
+if __name__ != '__mp_main__':
+    app = create_app(config_name)
 
 # 导入日志配置
 
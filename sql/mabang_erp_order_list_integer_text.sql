@@ -0,0 +1,76 @@
+-- 规范化早期导入的整数文本：订单编号、SKU 由 '123.0' 改为 '123'
+-- 改为按映射列读取 Excel 之前，整表由 pd.read_excel 推断类型，数字列中有空单元格时整列为浮点数，
+-- 订单编号、SKU 等写为 '123.0'；现在始终写为 '123'，旧格式的行与重新导入的同一订单行自然键不同，
+-- upsert 会写入重复的订单行，重复检测也无法识别
+-- 前置：已执行 mabang_erp_order_list_partitioning.sql；需要 MySQL 8.0（REGEXP_REPLACE）
+-- 执行前请备份 mabang_erp_order_list、mabang_erp_order_list_archive 和 order_sku_line
+--
+-- 执行后：
+--   flask mabang backfill-sku-lines  按规范化后的订单重建 SKU明细（第 5 步删除了旧格式的明细）
+--   flask mabang rebuild-profit-rollup --start-date ... --end-date ...  重算涉及的月份（汇总按 SKU 分组）
+-- 增量导入的水位线指纹按旧格式计算，付款时间恰好等于水位线的旧格式订单行在下次增量导入时会再导入一次，
+-- upsert 模式下按规范化后的自然键更新原行
+
+SET @integer_text = '^(-?[0-9]+)\\.0$';
+
+-- 1. 旧格式订单行规范化后的键；同一键下已按新格式导入的订单行也加入，用于下一步去重
+CREATE TABLE mabang_integer_text_keys (
+    id           BIGINT UNSIGNED NOT NULL,
+    order_id     VARCHAR(64)     NOT NULL,
+    sku          VARCHAR(255)    NOT NULL,
+    category     VARCHAR(32)     NULL,
+    payment_time DATETIME        NULL,
+    PRIMARY KEY (id),
+    KEY idx_key (order_id, sku, category)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
+
+INSERT INTO mabang_integer_text_keys (id, order_id, sku, category, payment_time)
+SELECT id, REGEXP_REPLACE(order_id, @integer_text, '$1'), REGEXP_REPLACE(sku, @integer_text, '$1'), category, payment_time
+FROM mabang_erp_order_list
+WHERE order_id REGEXP @integer_text OR sku REGEXP @integer_text;
+
+INSERT IGNORE INTO mabang_integer_text_keys (id, order_id, sku, category, payment_time)
+SELECT o.id, o.order_id, o.sku, o.category, o.payment_time
+FROM mabang_erp_order_list o
+JOIN (SELECT DISTINCT order_id, sku, category, payment_time FROM mabang_integer_text_keys) k
+  ON o.order_id = k.order_id
+ AND o.sku = k.sku
+ AND o.category <=> k.category
+ AND o.payment_time <=> k.payment_time;
+
+-- 2. 规范化后自然键相同的订单行只保留 id 最大（最后导入）的一条，否则下一步会违反唯一索引
+DELETE o
+FROM mabang_erp_order_list o
+JOIN mabang_integer_text_keys k ON k.id = o.id
+JOIN (
+    SELECT order_id, sku, category, payment_time, MAX(id) AS keep_id
+    FROM mabang_integer_text_keys
+    GROUP BY order_id, sku, category, payment_time
+) latest
+  ON latest.order_id = k.order_id
+ AND latest.sku = k.sku
+ AND latest.category <=> k.category
+ AND latest.payment_time <=> k.payment_time
+WHERE o.id < latest.keep_id;
+
+-- 3. 规范化订单行；row_hash 按旧格式计算，置空后下次 upsert 导入时更新该行并重新计算
+UPDATE mabang_erp_order_list
+SET order_id    = REGEXP_REPLACE(order_id, @integer_text, '$1'),
+    sku         = REGEXP_REPLACE(sku, @integer_text, '$1'),
+    sku_details = REGEXP_REPLACE(sku_details, @integer_text, '$1'),
+    row_hash    = NULL
+WHERE order_id REGEXP @integer_text OR sku REGEXP @integer_text OR sku_details REGEXP @integer_text;
+
+-- 4. 归档表没有自然键唯一索引，直接规范化
+UPDATE mabang_erp_order_list_archive
+SET order_id    = REGEXP_REPLACE(order_id, @integer_text, '$1'),
+    sku         = REGEXP_REPLACE(sku, @integer_text, '$1'),
+    sku_details = REGEXP_REPLACE(sku_details, @integer_text, '$1'),
+    row_hash    = NULL
+WHERE order_id REGEXP @integer_text OR sku REGEXP @integer_text OR sku_details REGEXP @integer_text;
+
+-- 5. 删除旧格式订单行的 SKU明细，由 backfill-sku-lines 按规范化后的订单重建
+DELETE FROM order_sku_line
+WHERE order_id REGEXP @integer_text OR order_sku REGEXP @integer_text OR sku REGEXP @integer_text;
+
+DROP TABLE mabang_integer_text_keys;
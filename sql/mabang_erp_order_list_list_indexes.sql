@@ -0,0 +1,8 @@
+-- 马帮ERP订单列表查询索引
+-- 列表按 (payment_time, id) 倒序做游标分页，等值筛选列在前、payment_time 区间和排序列在后，
+-- 使筛选、区间和排序都能走同一个索引，无需回表排序
+ALTER TABLE mabang_erp_order_list
+    ADD INDEX idx_payment_time_id (payment_time, id),
+    ADD INDEX idx_category_payment_time_id (category, payment_time, id),
+    ADD INDEX idx_store_payment_time_id (store, payment_time, id),
+    ADD INDEX idx_category_store_payment_time_id (category, store, payment_time, id);
@@ -0,0 +1,18 @@
+-- 马帮ERP订单自然键（订单编号 + SKU + 类别），供 upsert 导入模式使用
+-- 执行前请备份 mabang_erp_order_list
+
+-- 唯一索引中 NULL 互不相等，缺失的 SKU 统一存为空字符串
+UPDATE mabang_erp_order_list SET sku = '' WHERE sku IS NULL;
+
+-- 清理已有的重复订单行，保留 id 最大（最后导入）的一条
+DELETE older
+FROM mabang_erp_order_list older
+JOIN mabang_erp_order_list newer
+  ON older.order_id = newer.order_id
+ AND older.sku = newer.sku
+ AND older.category = newer.category
+ AND older.id < newer.id;
+
+ALTER TABLE mabang_erp_order_list
+    ADD COLUMN row_hash CHAR(32) NULL COMMENT '订单行内容指纹，用于跳过未变化的行',
+    ADD UNIQUE KEY uk_order_sku_category (order_id, sku, category);
@@ -0,0 +1,53 @@
+-- 马帮ERP订单按付款时间月分区，并建立压缩归档表
+-- 前置：已执行 mabang_erp_order_list_natural_key.sql 和 mabang_erp_order_list_list_indexes.sql，payment_time 为 DATETIME 类型
+-- 执行前请备份 mabang_erp_order_list；第 2、3 步会重建整表，请在低峰期执行
+--
+-- 分区建立后由 flask mabang maintain-partitions 维护（建议每天定时执行）：
+--   从 p_future 拆分出未来月份的分区（首次执行时按已有数据拆分出历史月份），
+--   并将超过保留期的月份移入归档表后删除分区
+-- 按付款时间区间筛选的查询（payment_time BETWEEN / >= / <）只扫描涉及的月份分区
+
+-- 1. 归档表：与订单表结构相同、不分区，使用压缩行格式（需要 innodb_file_per_table = ON）
+--    必须在订单表分区之前创建，CREATE TABLE ... LIKE 会复制分区定义
+--    归档表保留 id 主键，重复归档同一行时直接跳过；同一订单行可能先后出现在不同月份，不保留自然键唯一索引
+CREATE TABLE IF NOT EXISTS mabang_erp_order_list_archive LIKE mabang_erp_order_list;
+
+ALTER TABLE mabang_erp_order_list_archive
+    DROP INDEX uk_order_sku_category,
+    ADD INDEX idx_order_sku_category (order_id, sku, category),
+    ROW_FORMAT = COMPRESSED,
+    KEY_BLOCK_SIZE = 8,
+    COMMENT = '马帮ERP订单归档，按月从 mabang_erp_order_list 移入';
+
+-- 2. 分区表的每个唯一键（包括主键）都必须包含分区列 payment_time
+--    主键列不能为空，而付款时间为空的订单需要保留，因此去掉主键，id 改为普通索引（仍然自增）；
+--    自然键唯一索引加入 payment_time，付款时间变化的订单行由 upsert 导入先删除旧行再写入；
+--    唯一索引中 NULL 互不相等，付款时间为空的订单行不受唯一索引约束，由导入在写入事务中去重
+--    （insert 加锁查询已有的行，upsert 先删除旧行）；不改用 COALESCE 生成列做分区键，
+--    按 payment_time 区间筛选的查询仍能裁剪分区
+ALTER TABLE mabang_erp_order_list
+    DROP PRIMARY KEY,
+    ADD INDEX idx_id (id),
+    DROP INDEX uk_order_sku_category,
+    ADD UNIQUE KEY uk_order_sku_category (order_id, sku, category, payment_time);
+
+-- 3. 按月 RANGE 分区
+--    TO_DAYS(NULL) 归入第一个分区，按区间筛选时 MySQL 总会同时扫描第一个分区，
+--    因此第一个分区 p_null 只存放付款时间为空的行，保持很小且不会被归档；
+--    p_future 接收已建分区之后的所有数据，由维护命令拆分为月份分区（pYYYYMM）
+ALTER TABLE mabang_erp_order_list
+    PARTITION BY RANGE (TO_DAYS(payment_time)) (
+        PARTITION p_null VALUES LESS THAN (1),
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
+
+-- 4. 清理调整唯一索引后已写入的付款时间为空的重复订单行，保留 id 最大（最后导入）的一条
+DELETE older
+FROM mabang_erp_order_list older
+JOIN mabang_erp_order_list newer
+  ON older.order_id = newer.order_id
+ AND older.sku = newer.sku
+ AND older.category = newer.category
+ AND older.payment_time IS NULL
+ AND newer.payment_time IS NULL
+ AND older.id < newer.id;
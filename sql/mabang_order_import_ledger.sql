@@ -0,0 +1,10 @@
+-- 马帮订单导入台账：按文件内容哈希记录已成功导入的文件，重复上传时直接返回上次的导入结果
+CREATE TABLE IF NOT EXISTS mabang_order_import_ledger (
+    file_hash   CHAR(64)     NOT NULL COMMENT '文件内容 SHA-256',
+    file_name   VARCHAR(255) NOT NULL COMMENT '上传时的文件名',
+    category    VARCHAR(32)  NULL COMMENT '订单类别',
+    mode        VARCHAR(16)  NOT NULL COMMENT '导入模式',
+    summary     JSON         NOT NULL COMMENT '导入结果',
+    imported_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '导入时间',
+    PRIMARY KEY (file_hash)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COMMENT = '马帮订单导入台账';
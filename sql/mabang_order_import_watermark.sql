@@ -0,0 +1,10 @@
+-- 马帮订单增量导入水位线：按 类别 + 店铺 记录已导入的最晚付款时间，
+-- 以及该付款时间下已导入订单行的内容指纹，增量导入时跳过水位线之前的行
+CREATE TABLE IF NOT EXISTS mabang_order_import_watermark (
+    category          VARCHAR(32)  NOT NULL COMMENT '订单类别',
+    store             VARCHAR(255) NOT NULL DEFAULT '' COMMENT '店铺名，缺失时为空字符串',
+    last_payment_time DATETIME     NOT NULL COMMENT '已导入的最晚付款时间',
+    boundary_hashes   JSON         NOT NULL COMMENT '付款时间等于水位线的订单行指纹',
+    updated_at        DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (category, store)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COMMENT = '马帮订单增量导入水位线';
@@ -0,0 +1,24 @@
+-- 马帮订单利润日汇总：日期 × 店铺 × 类别 × 国家 × SKU
+-- 导入订单时按 日期 + 店铺 + 类别 增量重算，全量回填使用 flask mabang rebuild-profit-rollup
+CREATE TABLE IF NOT EXISTS mabang_order_profit_daily (
+    stat_date          DATE          NOT NULL COMMENT '付款日期',
+    store              VARCHAR(255)  NOT NULL DEFAULT '' COMMENT '店铺名',
+    category           VARCHAR(32)   NOT NULL COMMENT '订单类别',
+    country            VARCHAR(64)   NOT NULL DEFAULT '' COMMENT '国家',
+    sku                VARCHAR(255)  NOT NULL DEFAULT '' COMMENT 'SKU',
+    order_count        INT           NOT NULL DEFAULT 0 COMMENT '订单数',
+    line_count         INT           NOT NULL DEFAULT 0 COMMENT '订单行数',
+    quantity           BIGINT        NOT NULL DEFAULT 0 COMMENT '商品数量',
+    rmb_amount         DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT '订单核算金额（人民币）',
+    order_profit       DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT '订单利润',
+    platform_fee_rmb   DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT '平台交易费（人民币）',
+    ad_cost_rmb        DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT '广告费（人民币）',
+    vat_fee_rmb        DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT 'VAT税费（人民币）',
+    shipping_revenue   DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT '运费收入',
+    actual_shipping    DECIMAL(18, 4) NOT NULL DEFAULT 0 COMMENT '实际运费',
+    updated_at         DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (stat_date, category, store, country, sku),
+    KEY idx_store_date (store, stat_date),
+    KEY idx_country_date (country, stat_date),
+    KEY idx_sku_date (sku, stat_date)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COMMENT = '马帮订单利润日汇总';
@@ -0,0 +1,16 @@
+-- 订单 SKU明细 子表：导入时将 mabang_erp_order_list.sku_details 解析为每个 SKU 一行，
+-- SKU 维度的查询按 idx_sku 查找，无需对 sku_details 做 LIKE 全表扫描
+-- 历史订单可执行 flask mabang backfill-sku-lines 回填
+CREATE TABLE IF NOT EXISTS order_sku_line (
+    id         BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    order_id   VARCHAR(64)  NOT NULL COMMENT '订单编号',
+    category   VARCHAR(32)  NOT NULL COMMENT '订单类别',
+    order_sku  VARCHAR(255) NOT NULL DEFAULT '' COMMENT '所属订单行的 SKU，缺失时为空字符串',
+    line_no    INT          NOT NULL COMMENT '在 SKU明细 中的序号，从 1 开始',
+    sku        VARCHAR(255) NOT NULL COMMENT 'SKU',
+    quantity   INT          NOT NULL DEFAULT 1 COMMENT '数量',
+    created_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    PRIMARY KEY (id),
+    UNIQUE KEY uk_order_line (order_id, category, order_sku, line_no),
+    KEY idx_sku (sku)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COMMENT = '订单 SKU明细';
@@ -0,0 +1,110 @@
+import struct
+
+import pymysql
+import pytest
+from dbutils.pooled_db import PooledDB
+from pymysql.constants import COMMAND, FIELD_TYPE
+
+from app.core.services.database_manager import DatabaseManager, _PooledConnection
+from app.core.services.slow_query_log import SlowQueryLog
+
+
+_EOF = b'\xfe\x00\x00\x02\x00'
+_OK_PACKET = b'\x07\x00\x00\x01' + b'\x00\x00\x00\x02\x00\x00\x00'
+
+
+def result_packets(columns, rows):
+    """字符串列结果集的 MySQL 协议数据包，序号从 1 开始，None 为 NULL"""
+    def lenenc(data):
+        return bytes([len(data)]) + data if len(data) < 251 else b'\xfc' + struct.pack('<H', len(data)) + data
+
+    def descriptor(column):
+        name = column.encode()
+        return (
+            b''.join(lenenc(part) for part in (b'def', b'db', b't', b't', name, name))
+            + b'\x0c' + struct.pack('<HIBHB', 33, 255, FIELD_TYPE.VAR_STRING, 0, 0) + b'\x00\x00'
+        )
+
+    bodies = [bytes([len(columns)])] + [descriptor(column) for column in columns] + [_EOF]
+    for row in rows:
+        bodies.append(b''.join(b'\xfb' if value is None else lenenc(str(value).encode()) for value in row))
+    bodies.append(_EOF)
+    return b''.join(
+        struct.pack('<I', len(body))[:3] + bytes([(seq + 1) % 256]) + body for seq, body in enumerate(bodies)
+    )
+
+
+class FakeSocket:
+    """按顺序为每条 SELECT 返回预设结果集的 socket，其他语句（归还连接时的 ROLLBACK）返回 OK，记录已读取的字节数"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.queries = []
+        self.buffer = b''
+        self.position = 0
+        self.closed = False
+
+    def sendall(self, data):
+        if data[4] == COMMAND.COM_QUERY:
+            query = data[5:].decode()
+            self.queries.append(query)
+            self.buffer += self.responses.pop(0) if query.startswith(('SELECT', 'EXPLAIN')) else _OK_PACKET
+
+    def read(self, size):
+        data = self.buffer[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+    @property
+    def unread(self):
+        return len(self.buffer) - self.position
+
+    def settimeout(self, timeout):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeMySQL:
+    """数据库单例通过 DBUtils 连接池借出 pymysql 连接，连接的 socket 为 FakeSocket
+
+    Attributes:
+        responses: 依次返回给 SELECT 的结果集数据包，由 add_result 添加
+        sockets: 已创建的连接的 socket
+        released: 每归还一个连接追加一项
+    """
+
+    def __init__(self, monkeypatch):
+        self.manager = DatabaseManager()
+        self.responses = []
+        self.sockets = []
+        self.released = []
+        monkeypatch.setattr(pymysql, 'connect', self._connect)
+        pool = PooledDB(creator=pymysql, maxconnections=1, ping=0)
+        monkeypatch.setattr(
+            self.manager, 'get_connection',
+            lambda: _PooledConnection(
+                pool.connection(), lambda: self.released.append(1), 0.0, self.manager._wrap_cursor
+            )
+        )
+        monkeypatch.setattr(self.manager, 'slow_query_log', SlowQueryLog(threshold_ms=0, explain_interval=0))
+
+    def add_result(self, columns, rows) -> None:
+        """添加下一条 SELECT 的结果集"""
+        self.responses.append(result_packets(columns, rows))
+
+    def _connect(self, *args, **kwargs):
+        connection = pymysql.connections.Connection(defer_connect=True, cursorclass=pymysql.cursors.DictCursor)
+        sock = FakeSocket(self.responses)
+        connection._sock = connection._rfile = sock
+        connection._closed = False
+        connection._current_timeout = None
+        connection.server_capabilities = 0
+        self.sockets.append(sock)
+        return connection
+
+
+@pytest.fixture
+def fake_mysql(monkeypatch):
+    return FakeMySQL(monkeypatch)
@@ -0,0 +1,54 @@
+import math
+import threading
+
+import pytest
+
+from app.core.services.bloom_filter import BloomFilter
+
+
+def test_sizing():
+    bloom = BloomFilter(2000000, 0.01)
+    # m = -n ln(p) / ln(2)^2，k = m / n ln(2)
+    assert bloom.bit_count == math.ceil(-2000000 * math.log(0.01) / math.log(2) ** 2)
+    assert bloom.hash_count == 7
+    assert bloom.size_bytes == (bloom.bit_count + 7) // 8
+    assert 2.2 * 1024 * 1024 < bloom.size_bytes < 2.4 * 1024 * 1024
+
+
+@pytest.mark.parametrize('capacity, error_rate', [(0, 0.01), (10, 0), (10, 1)])
+def test_invalid_arguments(capacity, error_rate):
+    with pytest.raises(ValueError):
+        BloomFilter(capacity, error_rate)
+
+
+def test_no_false_negatives_and_false_positive_rate():
+    bloom = BloomFilter(10000, 0.01)
+    for i in range(10000):
+        bloom.add(f'order-{i}')
+    assert all(f'order-{i}' in bloom for i in range(10000))
+    false_positives = sum(f'other-{i}' in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_add_reports_existing_key():
+    bloom = BloomFilter(100)
+    assert bloom.add('a') is False
+    assert bloom.add('a') is True
+    assert len(bloom) == 1
+
+
+def test_thread_safety():
+    bloom = BloomFilter(40000, 0.01)
+
+    def add_keys(offset):
+        for i in range(offset, offset + 10000):
+            bloom.add(f'order-{i}')
+
+    threads = [threading.Thread(target=add_keys, args=(offset,)) for offset in range(0, 40000, 10000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(f'order-{i}' in bloom for i in range(40000))
+    # 误判为已存在的键不计数，并发加入不会丢失计数
+    assert 39000 < len(bloom) <= 40000
@@ -0,0 +1,71 @@
+from app.core.services.slow_query_log import SlowQueryLog
+
+
+def _add_ids(fake_mysql, count):
+    fake_mysql.add_result(['id'], [[i] for i in range(count)])
+
+
+def test_read_to_end_returns_connection(fake_mysql):
+    _add_ids(fake_mysql, 1000)
+    rows = list(fake_mysql.manager.iter_query("SELECT id FROM t", batch_size=100))
+    assert len(rows) == 1000
+    sock, = fake_mysql.sockets
+    assert sock.queries == ["SELECT id FROM t", "ROLLBACK"]
+    assert sock.unread == 0 and not sock.closed
+    assert fake_mysql.released == [1]
+    assert fake_mysql.manager.slow_query_log.report()[0]['rows'] == 1000
+
+
+def test_break_discards_connection_without_draining(fake_mysql):
+    _add_ids(fake_mysql, 1000)
+    for batch in fake_mysql.manager.iter_query("SELECT id FROM t", batch_size=100, batches=True):
+        assert len(batch) == 100
+        break
+    sock, = fake_mysql.sockets
+    # 剩余结果不从 socket 读取，直接断开连接
+    assert sock.closed
+    assert sock.unread > len(sock.buffer) // 2
+    assert fake_mysql.released == [1]
+    assert fake_mysql.manager.slow_query_log.report()[0]['rows'] == 100
+
+
+def test_close_discards_connection_without_draining(fake_mysql):
+    _add_ids(fake_mysql, 1000)
+    rows = fake_mysql.manager.iter_query("SELECT id FROM t", batch_size=100)
+    assert next(rows) == {'id': '0'}
+    rows.close()
+    sock, = fake_mysql.sockets
+    assert sock.closed
+    assert sock.unread > len(sock.buffer) // 2
+    assert fake_mysql.released == [1]
+
+
+def test_discarded_connection_reconnects(fake_mysql):
+    _add_ids(fake_mysql, 1000)
+    _add_ids(fake_mysql, 3)
+    for _ in fake_mysql.manager.iter_query("SELECT id FROM t"):
+        break
+    # 连接池再次借出时重新连接
+    assert [row['id'] for row in fake_mysql.manager.iter_query("SELECT id FROM t")] == ['0', '1', '2']
+    assert len(fake_mysql.sockets) == 2
+
+
+def test_explain_before_connection_returned(fake_mysql, monkeypatch):
+    monkeypatch.setattr(fake_mysql.manager, 'slow_query_log', SlowQueryLog(threshold_ms=0, explain_interval=300))
+    _add_ids(fake_mysql, 1000)
+    fake_mysql.add_result(['type'], [['ALL']])
+    list(fake_mysql.manager.iter_query("SELECT id FROM t"))
+    sock, = fake_mysql.sockets
+    # 在同一连接上执行 EXPLAIN，之后才归还连接（归还时回滚）
+    assert sock.queries == ["SELECT id FROM t", "EXPLAIN SELECT id FROM t", "ROLLBACK"]
+    assert fake_mysql.manager.slow_query_log.report()[0]['explain'] == [{'type': 'ALL'}]
+
+
+def test_no_explain_on_discarded_connection(fake_mysql, monkeypatch):
+    monkeypatch.setattr(fake_mysql.manager, 'slow_query_log', SlowQueryLog(threshold_ms=0, explain_interval=300))
+    _add_ids(fake_mysql, 1000)
+    for _ in fake_mysql.manager.iter_query("SELECT id FROM t"):
+        break
+    sock, = fake_mysql.sockets
+    assert sock.queries == ["SELECT id FROM t"]
+    assert fake_mysql.manager.slow_query_log.report()[0]['count'] == 1
@@ -0,0 +1,55 @@
+import zipfile
+
+import pandas as pd
+
+from app.aliexpress.services import mabang_order_service as service_module
+from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+
+def _write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def test_sheets_of_bundle_member_read_from_one_workbook(tmp_path, monkeypatch):
+    workbook_path = tmp_path / 'orders.xlsx'
+    _write_workbook(workbook_path, {
+        '全托管仓发': pd.DataFrame({'订单编号': ['A1', 'A2'], 'SKU': ['S1', 'S2']}),
+        '全托管JIT': pd.DataFrame({'订单编号': ['B1'], 'SKU': ['S3']}),
+        '说明': pd.DataFrame({'备注': ['x']}),
+    })
+    bundle_path = tmp_path / 'orders.zip'
+    with zipfile.ZipFile(bundle_path, 'w') as bundle:
+        bundle.write(workbook_path, 'orders.xlsx')
+
+    opened = []
+    open_workbook = MabangOrderService._open_workbook
+    monkeypatch.setattr(
+        MabangOrderService, '_open_workbook', staticmethod(lambda file_path: opened.append(1) or open_workbook(file_path))
+    )
+    reads = []
+    read = zipfile.ZipFile.read
+
+    def read_member(self, name, pwd=None):
+        if self.filename == str(bundle_path):
+            reads.append(name)
+        return read(self, name, pwd)
+
+    monkeypatch.setattr(zipfile.ZipFile, 'read', read_member)
+
+    service = MabangOrderService()
+    full_warehouse, full_jit, notes = service_module._convert_order_file(
+        str(bundle_path),
+        [('全托管仓发', service.Category.FULL_WAREHOUSE), ('全托管JIT', service.Category.FULL_JIT), ('说明', None)],
+        'orders.xlsx'
+    )
+    # 压缩包内的文件只解压一次，工作簿只打开一次
+    assert len(reads) == 1 and len(opened) == 1
+    total, _, orders = full_warehouse
+    assert total == 2 and [order_data['order_id'] for order_data in orders] == ['A1', 'A2']
+    assert {order_data['category'] for order_data in orders} == {service.Category.FULL_WAREHOUSE}
+    total, _, orders = full_jit
+    assert total == 1 and orders[0]['order_id'] == 'B1' and orders[0]['category'] == service.Category.FULL_JIT
+    # 缺少必需列的工作表单独失败
+    assert isinstance(notes, ValueError) and '订单编号' in str(notes)
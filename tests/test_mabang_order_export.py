@@ -0,0 +1,52 @@
+import pytest
+
+from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+
+FORMATS = [MabangOrderService.ExportFormat.CSV, MabangOrderService.ExportFormat.XLSX]
+
+
+@pytest.fixture
+def service(fake_mysql):
+    service = MabangOrderService()
+    service.export_chunk_rows = 100
+    columns = ['category'] + list(service.field_mapping.values())
+    fake_mysql.add_result(columns, [[f'{column}-{i}' for column in columns] for i in range(2000)])
+    return service
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_export_to_end_returns_connection(service, fake_mysql, file_format):
+    success, chunks = service.export_orders(file_format=file_format)
+    assert success
+    data = b''.join(chunks)
+    chunks.close()
+    sock, = fake_mysql.sockets
+    assert data
+    assert sock.unread == 0 and not sock.closed
+    assert fake_mysql.released == [1]
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_client_abort_discards_connection(service, fake_mysql, file_format):
+    success, chunks = service.export_orders(file_format=file_format)
+    assert success
+    next(chunks)
+    next(chunks)
+    # 客户端断开，WSGI 服务器关闭响应迭代器
+    chunks.close()
+    sock, = fake_mysql.sockets
+    assert sock.closed
+    assert sock.unread > len(sock.buffer) // 2
+    assert fake_mysql.released == [1]
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_close_before_first_chunk_discards_connection(service, fake_mysql, file_format):
+    success, chunks = service.export_orders(file_format=file_format)
+    assert success
+    chunks.close()
+    sock, = fake_mysql.sockets
+    assert sock.closed
+    assert sock.unread > len(sock.buffer) // 2
+    assert fake_mysql.released == [1]
@@ -0,0 +1,36 @@
+from app.aliexpress.services import mabang_order_service as service_module
+from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+
+def _order(order_id, payment_time='2024-01-02 03:04:05', sku='A'):
+    return {'order_id': order_id, 'sku': sku, 'category': 'pop', 'payment_time': payment_time, 'sku_details': 'B*2;C'}
+
+
+def test_orders_and_sku_lines_merge_in_one_transaction(fake_mysql, monkeypatch):
+    monkeypatch.setattr(service_module, 'db', fake_mysql.manager)
+    service = MabangOrderService()
+    summary = service._new_summary(service.ImportMode.LOAD_DATA)
+    service._load_orders([_order('O1'), _order('O2')], 100, summary)
+
+    sock, = fake_mysql.sockets
+    stage, line_stage = f"{service.table}_stage", f"{service.sku_line_table}_stage"
+    expected = [
+        f"CREATE TEMPORARY TABLE {stage} ",
+        "LOAD DATA LOCAL INFILE ",
+        f"CREATE TEMPORARY TABLE {line_stage} ",
+        "LOAD DATA LOCAL INFILE ",
+        # 跳过订单表中已存在的订单行，只替换本次写入的订单的明细
+        f"DELETE s FROM {stage} s JOIN {service.table} o ",
+        f"INSERT IGNORE INTO {service.table} ",
+        f"DELETE l FROM {service.sku_line_table} l JOIN {stage} s ",
+        f"INSERT IGNORE INTO {service.sku_line_table} ",
+        "COMMIT",
+    ]
+    assert len(sock.queries) == len(expected)
+    for query, prefix in zip(sock.queries, expected):
+        assert query.startswith(prefix), query
+    assert f"INTO TABLE {stage} " in sock.queries[1] and f"INTO TABLE {line_stage} " in sock.queries[3]
+    assert sock.closed
+    # 订单表中已存在的行（此处合并语句影响 0 行）不回退到 insert 模式，计入 duplicate
+    assert 'load_data_fallback' not in summary
+    assert summary['success'] == 2 and summary['duplicate'] == 2 and summary['error'] == 0
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+
+import pytest
+
+from app.aliexpress.services import mabang_order_service as service_module
+from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+
+class FakeCursor:
+    """记录语句，SELECT 返回预设的已有订单行"""
+
+    def __init__(self, existing=()):
+        self.existing = list(existing)
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+    def executemany(self, sql, params):
+        self.statements.append((sql, list(params)))
+
+    def fetchall(self):
+        return self.existing
+
+
+@pytest.fixture
+def service(monkeypatch):
+    cursor = FakeCursor()
+
+    @contextmanager
+    def transaction():
+        yield cursor
+
+    monkeypatch.setattr(service_module.db, 'transaction', transaction)
+    service = MabangOrderService()
+    service.cursor = cursor
+    return service
+
+
+def _order(order_id, payment_time=None, sku='A'):
+    return {'order_id': order_id, 'sku': sku, 'category': 'pop', 'payment_time': payment_time, 'sku_details': sku}
+
+
+def test_insert_skips_existing_null_payment_rows(service):
+    service.cursor.existing = [{'order_id': 'O1', 'sku': 'A', 'category': 'pop'}]
+    summary = service._new_summary()
+    service._insert_orders([_order('O1'), _order('O2'), _order('O2'), _order('O1', '2024-01-02 03:04:05')], summary)
+
+    select_sql, params = service.cursor.statements[0]
+    assert 'payment_time IS NULL FOR UPDATE' in select_sql
+    assert params == ('O1', 'O2')
+    inserted = next(rows for sql, rows in service.cursor.statements if sql.startswith(f'INSERT INTO {service.table}'))
+    assert [(row[0], row[3]) for row in inserted] == [('O2', None), ('O1', '2024-01-02 03:04:05')]
+    assert summary['success'] == 2
+    assert summary['error'] == 2
+
+
+def test_insert_without_null_payment_skips_query(service):
+    summary = service._new_summary()
+    service._insert_orders([_order('O1', '2024-01-02 03:04:05')], summary)
+    assert not any('FOR UPDATE' in sql for sql, _ in service.cursor.statements)
+    assert summary['success'] == 1
+
+
+def test_upsert_deletes_null_payment_rows_first(service):
+    service._write_upserts([_order('O1'), _order('O2', '2024-01-02 03:04:05')], [], ['payment_time'])
+    delete_sql, params = service.cursor.statements[0]
+    assert delete_sql.startswith(f'DELETE FROM {service.table}')
+    assert delete_sql.endswith('AND payment_time IS NULL')
+    assert params == ('O1', 'A', 'pop')
@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+from app.aliexpress.services import mabang_order_partition_service as partition_module
+from app.aliexpress.services.mabang_order_partition_service import MabangOrderPartitionService
+from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+
+@pytest.mark.parametrize('description, expected', [
+    (None, None),
+    ('MAXVALUE', None),
+    ('1', date.min),
+    ('366', date.min),
+    (str(date(2024, 2, 1).toordinal() + 365), date(2024, 2, 1)),
+    (str(date(2000, 3, 1).toordinal() + 365), date(2000, 3, 1)),
+])
+def test_to_date(description, expected):
+    assert MabangOrderPartitionService._to_date(description) == expected
+
+
+def test_add_months():
+    assert MabangOrderPartitionService._add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert MabangOrderPartitionService._add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_archive_cutoff(monkeypatch):
+    service = MabangOrderPartitionService()
+    monkeypatch.setattr(partition_module.db, 'execute_sql', lambda sql: (True, [{'last_time': datetime(2023, 5, 31, 23, 59)}]))
+    assert service.get_archive_cutoff() == (True, date(2023, 6, 1))
+    monkeypatch.setattr(partition_module.db, 'execute_sql', lambda sql: (True, [{'last_time': None}]))
+    assert service.get_archive_cutoff() == (True, None)
+
+
+def test_skip_archived():
+    service = MabangOrderService()
+    summary = service._new_summary()
+    orders = [
+        {'order_id': 'old', 'payment_time': '2023-05-31 10:00:00'},
+        {'order_id': 'new', 'payment_time': '2023-06-01 00:00:00'},
+        {'order_id': 'unpaid', 'payment_time': None},
+    ]
+    kept = service._skip_archived(orders, summary, date(2023, 6, 1))
+    assert [order['order_id'] for order in kept] == ['new', 'unpaid']
+    assert summary['archived_skipped'] == 1
+    assert service._skip_archived(orders, summary, None) is orders
+
+
+class FakeCursor:
+    def __init__(self, missing=0):
+        self.statements = []
+        self.missing = missing
+        self.result = None
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        if sql.startswith('SELECT MAX(id)'):
+            self.result = {'upper_id': None}
+        elif sql.startswith('SELECT COUNT(*)'):
+            self.result = {'total': 5, 'missing': self.missing}
+
+    def fetchone(self):
+        return self.result
+
+
+@pytest.mark.parametrize('missing', [0, 2])
+def test_archive_verifies_and_drops_under_lock(monkeypatch, missing):
+    cursor = FakeCursor(missing)
+
+    @contextmanager
+    def transaction():
+        yield cursor
+
+    monkeypatch.setattr(partition_module.db, 'transaction', transaction)
+    success, result = MabangOrderPartitionService()._archive_partition('p202301')
+    statements = [sql.split()[0] + ' ' + sql.split()[1] for sql in cursor.statements]
+    lock = statements.index('LOCK TABLES')
+    assert statements[lock + 1:lock + 3] == ['INSERT IGNORE', 'SELECT COUNT(*)']
+    assert statements[-1] == 'UNLOCK TABLES'
+    assert 'o.payment_time' in cursor.statements[lock + 1]
+    if missing:
+        assert not success
+        assert 'ALTER TABLE' not in statements
+    else:
+        assert (success, result) == (True, 5)
+        assert statements[-2] == 'ALTER TABLE'
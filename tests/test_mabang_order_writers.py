@@ -0,0 +1,41 @@
+import threading
+import time
+
+from app.aliexpress.services import mabang_order_service as service_module
+from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+
+def test_concurrent_imports_share_write_slots(monkeypatch):
+    monkeypatch.setattr(service_module.db, 'pool_size', 3)
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def insert_orders(self, chunk, summary):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        summary['success'] += len(chunk)
+
+    monkeypatch.setattr(MabangOrderService, '_insert_orders', insert_orders)
+    # 模拟同时执行的多个导入任务，每个任务各有 _get_db_writers() 个写入线程
+    services = [MabangOrderService() for _ in range(3)]
+    writers = services[0]._get_db_writers()
+    assert writers == 2
+    summaries = []
+    threads = []
+    for service in services:
+        for _ in range(writers):
+            summary = service._new_summary()
+            summaries.append(summary)
+            threads.append(threading.Thread(
+                target=service._save_orders, args=([{'order_id': str(i)} for i in range(10)], 2, summary)
+            ))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == writers
+    assert sum(summary['success'] for summary in summaries) == 10 * len(threads)
@@ -0,0 +1,25 @@
+import time
+
+from app.core.services import metrics as metrics_module
+from app.core.services.metrics import StageTimer
+
+
+def test_peak_memory_inside_stage(monkeypatch):
+    memory = [100.0]
+    monkeypatch.setattr(metrics_module, 'get_memory_mb', lambda: memory[0])
+    timer = StageTimer(sample_interval=0.01)
+    with timer.stage('process', rows=10):
+        memory[0] = 500.0
+        time.sleep(0.1)
+        memory[0] = 100.0
+    result = timer.result(10)
+    assert result['peak_memory_mb'] == 500.0
+    assert result['stages']['process']['rows'] == 10
+
+
+def test_stop_ends_sampler():
+    timer = StageTimer(sample_interval=0.01)
+    sampler = timer._sampler
+    timer.stop()
+    timer.stop()
+    assert not sampler.is_alive()
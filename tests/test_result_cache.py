@@ -0,0 +1,200 @@
+import fnmatch
+
+import pytest
+
+from app.core.services import result_cache as result_cache_module
+from app.core.services.result_cache import MemoryResultCache, RedisResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+class FakeRedisError(Exception):
+    pass
+
+
+class FakeRedis:
+    """RedisResultCache 用到的 Redis 命令，键按 px 过期"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def _alive(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self.clock.now:
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._alive(key)
+        return None if entry is None else entry[0]
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, px=None):
+        self.data[key] = (value, None if px is None else self.clock.now + px / 1000)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = (str(value).encode(), None)
+        return value
+
+    def pipeline(self, transaction=True):
+        client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.commands = []
+
+            def incr(self, key):
+                self.commands.append(key)
+
+            def execute(self):
+                return [client.incr(key) for key in self.commands]
+
+        return Pipeline()
+
+    def scan_iter(self, match=None, count=None):
+        return [key for key in list(self.data) if match is None or fnmatch.fnmatch(key, match)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache_module, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def manager(request, fake_mysql, clock, monkeypatch):
+    """启用结果缓存的数据库单例，查询真正发送到数据库时才返回 add_result 添加的结果"""
+    if request.param == 'memory':
+        cache = MemoryResultCache(ttl=60)
+    else:
+        fake_redis = FakeRedis(clock)
+        monkeypatch.setattr(result_cache_module, 'redis', type('redis', (), {
+            'Redis': type('Redis', (), {'from_url': staticmethod(lambda url: fake_redis)}),
+            'RedisError': FakeRedisError
+        }))
+        cache = RedisResultCache('redis://fake', ttl=60)
+    monkeypatch.setattr(fake_mysql.manager, 'result_cache', cache)
+    return fake_mysql.manager
+
+
+def _selects(fake_mysql):
+    return [query for sock in fake_mysql.sockets for query in sock.queries if query.startswith('SELECT')]
+
+
+def _read_order(manager):
+    success, rows = manager.query().select('id', 'name').from_table('orders').where(id=1).cached().execute()
+    assert success
+    return rows
+
+
+def _read_store(manager):
+    success, rows = manager.query().select('id', 'name').from_table('stores').where(id=1).cached().execute()
+    assert success
+    return rows
+
+
+def test_cached_read_hits_without_query(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    assert len(_selects(fake_mysql)) == 1
+    assert manager.result_cache.snapshot()['hits'] == 1
+
+
+def test_transaction_write_refreshes_read(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'b']])
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    with manager.transaction() as cursor:
+        cursor.execute("UPDATE orders SET name = %s WHERE id = %s", ('b', 1))
+    assert _read_order(manager) == [{'id': '1', 'name': 'b'}]
+    assert len(_selects(fake_mysql)) == 2
+
+
+def test_batch_create_refreshes_read(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'a'], [2, 'b']])
+    assert len(_read_order(manager)) == 1
+    assert manager.batch_create('orders', [{'id': 2, 'name': 'b'}])
+    assert len(_read_order(manager)) == 2
+    assert len(_selects(fake_mysql)) == 2
+
+
+def test_batch_create_in_transaction_refreshes_read(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'a'], [2, 'b']])
+    assert len(_read_order(manager)) == 1
+    with manager.transaction() as cursor:
+        manager.batch_create('orders', [{'id': 2, 'name': 'b'}], cursor=cursor)
+    assert len(_read_order(manager)) == 2
+    assert len(_selects(fake_mysql)) == 2
+
+
+def test_rolled_back_transaction_keeps_cache(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    with pytest.raises(ValueError):
+        with manager.transaction() as cursor:
+            cursor.execute("UPDATE orders SET name = %s WHERE id = %s", ('b', 1))
+            raise ValueError('boom')
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    assert len(_selects(fake_mysql)) == 1
+
+
+def test_expired_ttl_queries_again(manager, fake_mysql, clock):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'b']])
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    clock.now += 59
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    clock.now += 2
+    assert _read_order(manager) == [{'id': '1', 'name': 'b'}]
+    assert len(_selects(fake_mysql)) == 2
+
+
+def test_write_to_other_table_keeps_cache(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'order']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'store']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'store-b']])
+    assert _read_order(manager) == [{'id': '1', 'name': 'order'}]
+    assert _read_store(manager) == [{'id': '1', 'name': 'store'}]
+    with manager.transaction() as cursor:
+        cursor.execute("UPDATE stores SET name = %s WHERE id = %s", ('store-b', 1))
+    # 只有 stores 的缓存失效
+    assert _read_order(manager) == [{'id': '1', 'name': 'order'}]
+    assert _read_store(manager) == [{'id': '1', 'name': 'store-b'}]
+    assert len(_selects(fake_mysql)) == 3
+
+
+def test_unrecognised_write_clears_cache(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    fake_mysql.add_result(['id', 'name'], [[1, 'b']])
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
+    with manager.transaction() as cursor:
+        cursor.execute("CALL rename_order(%s)", (1,))
+    assert _read_order(manager) == [{'id': '1', 'name': 'b'}]
+
+
+def test_cached_result_is_a_copy(manager, fake_mysql):
+    fake_mysql.add_result(['id', 'name'], [[1, 'a']])
+    _read_order(manager)[0]['name'] = 'changed'
+    assert _read_order(manager) == [{'id': '1', 'name': 'a'}]
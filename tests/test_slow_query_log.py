@@ -0,0 +1,106 @@
+import pytest
+
+from app.core.services.database_manager import DatabaseManager, _PooledConnection
+from app.core.services.slow_query_log import SlowQueryLog, fingerprint
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a'", 'select * from t where id in (...) and name = ?'),
+    ('select *\n  from T where id = 42 -- comment', 'select * from t where id = ?'),
+    ("SELECT /* hint */ a FROM t WHERE b = 'it''s' AND c = \"x\"", 'select a from t where b = ? and c = ?'),
+    ('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)', 'insert into t (a, b) values (...)'),
+    ('UPDATE t SET a = %(a)s WHERE id = -1.5', 'update t set a = ? where id = ?'),
+])
+def test_fingerprint(sql, expected):
+    assert fingerprint(sql) == expected
+
+
+def test_fingerprint_keeps_identifiers_with_digits():
+    assert fingerprint('SELECT col1 FROM t2 WHERE x = 3') == 'select col1 from t2 where x = ?'
+
+
+def test_record_and_report():
+    log = SlowQueryLog(threshold_ms=100)
+    log.record('SELECT * FROM t WHERE id = %s', (1,), 0.01, rows=1)
+    log.record('SELECT * FROM t WHERE id = %s', (2,), 0.2, rows=0)
+    report = log.report()
+    assert len(report) == 1
+    assert report[0]['fingerprint'] == 'select * from t where id = ?'
+    assert report[0]['count'] == 2
+    assert report[0]['slow_count'] == 1
+    assert log.recent()[0]['elapsed_ms'] == 200.0
+
+
+def test_explain_throttled_per_fingerprint():
+    log = SlowQueryLog(threshold_ms=0, explain_interval=300)
+    calls = []
+
+    def explain(sql, params):
+        calls.append(sql)
+        return [{'type': 'ALL'}]
+
+    log.record('SELECT * FROM t WHERE id = %s', (1,), 0.5, explain=explain)
+    log.record('SELECT * FROM t WHERE id = %s', (2,), 0.5, explain=explain)
+    log.record('UPDATE t SET a = 1', None, 0.5, explain=explain)
+    assert len(calls) == 1
+    assert log.report()[0]['explain'] == [{'type': 'ALL'}]
+
+
+def test_max_fingerprints_overflow():
+    log = SlowQueryLog(max_fingerprints=1)
+    log.record('SELECT a FROM t', None, 0.001)
+    log.record('SELECT b FROM t', None, 0.001)
+    assert {item['fingerprint'] for item in log.report()} == {'select a from t', SlowQueryLog.other}
+
+
+def test_fingerprint_signed_numbers_and_arithmetic():
+    assert fingerprint('SELECT * FROM t WHERE id = -1') == fingerprint('SELECT * FROM t WHERE id = 1')
+    assert fingerprint('SELECT a-1 FROM t') == 'select a-? from t'
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, args=None):
+        self.connection.statements.append(query)
+        return 1
+
+    def fetchall(self):
+        return [{'type': 'ALL'}]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+def test_explain_runs_on_statement_connection(monkeypatch):
+    manager = DatabaseManager()
+    monkeypatch.setattr(manager, 'slow_query_log', SlowQueryLog(threshold_ms=0, explain_interval=300))
+
+    def get_connection():
+        raise AssertionError('EXPLAIN 不应另取连接')
+
+    monkeypatch.setattr(manager, 'get_connection', get_connection)
+    connection = FakeConnection()
+    conn = _PooledConnection(connection, lambda: None, 0.0, manager._wrap_cursor)
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT * FROM t WHERE id = %s', (1,))
+    assert connection.statements == ['SELECT * FROM t WHERE id = %s', 'EXPLAIN SELECT * FROM t WHERE id = %s']
+    assert manager.slow_query_log.report()[0]['explain'] == [{'type': 'ALL'}]
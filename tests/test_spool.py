@@ -0,0 +1,123 @@
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.core.services.database_manager import DatabaseManager, DatabaseUnavailableError
+from app.core.services.spool import ReplayWorker, Spool
+
+
+def test_append_ack_finish(tmp_path):
+    spool = Spool.create(str(tmp_path), {'mode': 'insert'})
+    first = spool.append([{'order_id': 'A'}])
+    second = spool.append([{'order_id': 'B'}])
+    spool.ack(first)
+    assert spool.finish() is False
+
+    reopened = Spool.open(spool.path)
+    assert reopened.meta == {'mode': 'insert'}
+    assert reopened.pending_count == 1
+    assert list(reopened.pending()) == [(second, [{'order_id': 'B'}])]
+    reopened.ack(second)
+    assert reopened.finish() is True
+    assert Spool.list(str(tmp_path)) == []
+
+
+def test_round_trip_types(tmp_path):
+    row = {'amount': Decimal('12.30'), 'payment_time': datetime(2024, 1, 2, 3, 4, 5), 'store': None}
+    spool = Spool.create(str(tmp_path))
+    spool.append([row])
+    spool.close()
+    reopened = Spool.open(spool.path)
+    assert [rows for _, rows in reopened.pending()] == [[row]]
+    reopened.close()
+
+
+def test_skips_truncated_record(tmp_path):
+    spool = Spool.create(str(tmp_path))
+    spool.append([{'order_id': 'A'}])
+    spool.close()
+    with open(spool.path, 'a', encoding='utf-8') as f:
+        f.write('{"type":"batch","seq":1,"rows":[{"order')
+    reopened = Spool.open(spool.path)
+    assert [seq for seq, _ in reopened.pending()] == [0]
+    reopened.close()
+
+
+def test_open_in_use_returns_none(tmp_path):
+    spool = Spool.create(str(tmp_path))
+    assert Spool.open(spool.path) is None
+    spool.close()
+
+
+def test_save_orders_acks_batch_on_unexpected_error(tmp_path, monkeypatch):
+    from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+    service = MabangOrderService()
+    spool = Spool.create(str(tmp_path))
+
+    def fail(chunk, summary, mode, rollup_slices=None):
+        raise ValueError('boom')
+
+    monkeypatch.setattr(service, '_write_chunk', fail)
+    with pytest.raises(ValueError):
+        service._save_orders([{'order_id': 'A'}], 10, service._new_summary(), spool=spool)
+    assert spool.pending_count == 0
+    assert spool.finish() is True
+
+
+def test_save_orders_spools_when_database_unavailable(tmp_path, monkeypatch):
+    from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+    service = MabangOrderService()
+    spool = Spool.create(str(tmp_path))
+
+    def unavailable(chunk, summary, mode, rollup_slices=None):
+        raise DatabaseUnavailableError('down')
+
+    monkeypatch.setattr(service, '_write_chunk', unavailable)
+    summary = service._new_summary()
+    service._save_orders([{'order_id': 'A'}, {'order_id': 'B'}], 1, summary, spool=spool)
+    assert summary['spooled'] == 2
+    assert spool.held
+    assert spool.finish() is False
+
+
+def test_replay_worker_starts_once():
+    called = threading.Event()
+    worker = ReplayWorker(lambda: (called.set(), (True, None))[1], interval=0.01)
+    threads = [threading.Thread(target=worker.start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert called.wait(1)
+    assert sum(thread.name == 'spool-replay' for thread in threading.enumerate()) == 1
+    worker.stop()
+
+
+def test_pool_exhausted_is_not_an_outage(tmp_path, monkeypatch, fake_mysql):
+    from app.aliexpress.services.mabang_order_service import MabangOrderService
+
+    manager = fake_mysql.manager
+    # 连接池名额全部借出，取连接按真实流程等待超时；ping 使用独立连接，数据库本身可用
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(manager, 'get_connection', DatabaseManager.get_connection.__get__(manager))
+    monkeypatch.setattr(manager, '_get_pool', lambda: object())
+    monkeypatch.setattr(manager, '_slots', slots)
+    monkeypatch.setattr(manager, 'pool_timeout', 0.01)
+    fake_mysql.add_result(['1'], [[1]])
+    assert manager.ping()
+    assert fake_mysql.sockets[0].closed
+
+    service = MabangOrderService()
+    spool = Spool.create(str(tmp_path))
+    summary = service._new_summary()
+    orders = [{'order_id': 'A', 'sku': 'S', 'category': 'c'}, {'order_id': 'B', 'sku': 'S', 'category': 'c'}]
+    service._save_orders(orders, 1, summary, spool=spool)
+    assert summary['error'] == 2 and summary['success'] == 0
+    assert 'spooled' not in summary
+    assert not spool.held
+    assert spool.finish() is True
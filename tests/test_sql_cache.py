@@ -0,0 +1,77 @@
+import threading
+
+from app.core.services.database_manager import QueryBuilder
+from app.core.services.sql_cache import SQLTemplateCache, sql_templates
+
+
+def test_hit_and_miss():
+    cache = SQLTemplateCache()
+    calls = []
+
+    def compile_sql():
+        calls.append(1)
+        return 'SELECT 1'
+
+    assert cache.get('k', compile_sql) == 'SELECT 1'
+    assert cache.get('k', compile_sql) == 'SELECT 1'
+    assert len(calls) == 1
+    assert cache.snapshot() == {'size': 1, 'maxsize': 512, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_lru_eviction():
+    cache = SQLTemplateCache(maxsize=2)
+    cache.get('a', lambda: 'A')
+    cache.get('b', lambda: 'B')
+    cache.get('a', lambda: 'A')
+    cache.get('c', lambda: 'C')
+    # b 最久未使用，被淘汰
+    assert cache.get('b', lambda: 'B2') == 'B2'
+    assert cache.get('a', lambda: 'A2') == 'A2'
+    assert cache.snapshot()['size'] == 2
+
+
+def test_maxsize_zero_disables_cache():
+    cache = SQLTemplateCache(maxsize=0)
+    cache.get('k', lambda: 'A')
+    assert cache.get('k', lambda: 'B') == 'B'
+    assert cache.snapshot()['size'] == 0
+
+
+def test_clear_resets_counters():
+    cache = SQLTemplateCache()
+    cache.get('k', lambda: 'A')
+    cache.clear()
+    assert cache.snapshot() == {'size': 0, 'maxsize': 512, 'hits': 0, 'misses': 0, 'hit_rate': None}
+
+
+def test_concurrent_get():
+    cache = SQLTemplateCache(maxsize=8)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(2000):
+                key = (offset + i) % 16
+                assert cache.get(key, lambda: f'SQL {key}') == f'SQL {key}'
+        except AssertionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    snapshot = cache.snapshot()
+    assert snapshot['size'] <= 8
+    assert snapshot['hits'] + snapshot['misses'] == 8000
+
+
+def test_query_builder_reuses_template_by_shape():
+    sql_templates.clear()
+    first = QueryBuilder(None).from_table('orders').where(store='a').order_by('id', desc=True).limit(10, 20).build()
+    second = QueryBuilder(None).from_table('orders').where(store='b').order_by('id', desc=True).limit(5, 0).build()
+    assert first[0] == second[0] == 'SELECT * FROM orders WHERE store = %s ORDER BY id DESC LIMIT %s OFFSET %s'
+    assert first[1] == ('a', 10, 20)
+    assert second[1] == ('b', 5, 0)
+    assert sql_templates.snapshot()['hits'] == 1
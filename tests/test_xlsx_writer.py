@@ -0,0 +1,40 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+from openpyxl import load_workbook
+
+from app.core.services.xlsx_writer import XlsxStreamWriter
+
+
+def _write(writer, rows):
+    chunks = [writer.read()]
+    for row in rows:
+        writer.append(row)
+        chunks.append(writer.read())
+    chunks.append(writer.close())
+    return load_workbook(io.BytesIO(b''.join(chunks)))
+
+
+def test_cell_types():
+    writer = XlsxStreamWriter('订单', ['编号', '名称', '付款时间', '日期', '金额', '空'])
+    workbook = _write(writer, [[1, 'a<&>"b\x01', datetime(2024, 1, 2, 3, 4, 5), date(2024, 1, 2), Decimal('1.50'), None]])
+    rows = list(workbook['订单'].iter_rows(values_only=True))
+    assert rows[0] == ('编号', '名称', '付款时间', '日期', '金额', '空')
+    assert rows[1] == (1, 'a<&>"b', datetime(2024, 1, 2, 3, 4, 5), datetime(2024, 1, 2), 1.5, None)
+
+
+def test_split_sheets_at_row_limit(monkeypatch):
+    monkeypatch.setattr(XlsxStreamWriter, 'max_rows', 3)
+    workbook = _write(XlsxStreamWriter('订单', ['编号']), [[i] for i in range(5)])
+    assert workbook.sheetnames == ['订单', '订单_2', '订单_3']
+    values = [list(sheet.iter_rows(values_only=True)) for sheet in workbook]
+    assert values == [[('编号',), (0,), (1,)], [('编号',), (2,), (3,)], [('编号',), (4,)]]
+
+
+def test_output_before_close():
+    writer = XlsxStreamWriter('订单', ['编号'])
+    assert writer.read()
+    for i in range(20000):
+        writer.append([i, 'x' * 20])
+    assert writer.read()